@@ -1,48 +1,513 @@
 import pandas as pd
 import time
+import argparse
 import logging
 import threading
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, Future
 from run_program import get_user_input, build_search_url, scrape_store_details
-from function import Scrap_data, opened_link_chroome
-from database import DatabaseHandler
-from config import MAX_WORKERS, THREAD_DELAY
+from function import Scrap_data, Scrap_data_stream
+from database import DatabaseHandler, normalize_phone
+from membership import KnownStores
+from place_key import canonical_place_key
+from checkpoint import CrawlCheckpoint
+from job_planner import JobPlanner
+from geo_tiles import QuadtreeSearch, resolve_bounds, build_tile_url, BBOX_PREFIX
+from detail_cache import DetailCache
+from db_writer import BatchWriter
+from driver_pool import DriverPool
+from detail_tabs import MultiTabDetailScraper
+from resource_blocker import collect_blocking_stats
+from waits import wait_stats
+from pipeline import CrawlPipeline
+from fetchers import get_http_fetcher, SeleniumFetcher
+from config import MAX_WORKERS, THREAD_DELAY, DRIVER_POOL_SIZE, DETAIL_TABS, STORE_DELAY, LIST_STREAMING
+from config import FAST_PATH_REQUIRED_FIELDS, LIST_FETCHER, DETAIL_FETCHER, PIPELINE_MODE, PRECHECK_KNOWN_STORES
+from config import REFRESH_TTL, JOB_PLANNER, GEO_TILING, GEO_MAX_SCROLLS
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+_NOT_STALE = object()  # Cửa hàng không nằm trong danh sách quá hạn chờ scrape lại
+
 class BatchCrawler:
     """Crawler batch cho nhiều từ khóa và địa điểm - Hỗ trợ đa luồng"""
     
-    def __init__(self):
+    def __init__(self, incremental=False, tiled=GEO_TILING):
         self.db = DatabaseHandler()
+        # Tiled: job có khung tọa độ (thành phố đã biết / bbox:...) tìm theo tile thay vì 'keyword in location'
+        self.tiled = tiled
+        # Incremental: cửa hàng đã có chỉ được scrape lại khi quá REFRESH_TTL
+        self.incremental = incremental
+        self.refresh_hashes = {}  # {place_key: content_hash cũ} của cửa hàng quá hạn đang chờ scrape lại
+        self.db_writer = BatchWriter(self.db)  # Group commit cửa hàng từ mọi luồng
+        # Cửa hàng đã có trong database (nạp lúc khởi động) - trùng thì không cần ghi
+        self.known_stores = KnownStores()
+        self.known_stores.load(self.db)
+        # Chrome driver dùng lại giữa các job (pipeline giữ driver riêng cho stage search và detail)
+        pool_size = max(DRIVER_POOL_SIZE, CrawlPipeline.required_drivers()) if PIPELINE_MODE else DRIVER_POOL_SIZE
+        self.driver_pool = DriverPool(size=pool_size)
+        self.pipeline = None
+        self.checkpoint = None  # Checkpoint của crawl session đang chạy (tạo trong run_batch_crawl)
+        # Fetcher HTTP (không cần browser) cho từng giai đoạn, None = dùng driver Selenium
+        self.list_fetcher = get_http_fetcher() if LIST_FETCHER == 'http' else None
+        self.detail_fetcher = get_http_fetcher() if DETAIL_FETCHER == 'http' else None
         self.stats = {
             'total_jobs': 0,
             'completed_jobs': 0,
             'total_stores': 0,
             'new_stores': 0,
             'duplicate_stores': 0,
+            'skipped_stores': 0,  # Không có số điện thoại, không lưu
             'cached_stores': 0,  # Thêm thống kê cache
+            'blocked_requests': 0,  # Request bị chặn qua DevTools
+            'bytes_saved': 0,  # Ước tính bytes tiết kiệm nhờ chặn tài nguyên
+            'detail_loads_avoided': 0,  # Cửa hàng đủ dữ liệu từ trang kết quả, không load trang chi tiết
+            'precheck_skipped': 0,  # Cửa hàng đã có trong database (pre-check theo place key), không load trang chi tiết
+            'stale_stores': 0,  # Incremental: cửa hàng đã có nhưng quá hạn, scrape lại trang chi tiết
+            'refreshed_stores': 0,  # Incremental: scrape lại và nội dung đã đổi
+            'unchanged_stores': 0,  # Incremental: scrape lại nhưng nội dung không đổi (chỉ cập nhật thời điểm)
+            'resumed_jobs': 0,  # Resume: job đã xong ở lần chạy trước
+            'resumed_stores': 0,  # Resume: cửa hàng đã xử lý ở lần chạy trước
+            'geo_tiles': 0,  # Tiled: số tile đã tìm kiếm
             'start_time': None,
             'end_time': None
         }
         self.stats_lock = threading.Lock()  # Thread lock cho stats
         
-        # Cache RAM để tránh scrape lại cửa hàng đã tìm thấy
-        self.store_cache = {}  # {store_link: store_data}
-        self.cache_lock = threading.Lock()  # Thread lock cho cache
+        # Cache chi tiết trên đĩa để tránh scrape lại cửa hàng đã tìm thấy (kể cả ở lần chạy trước)
+        self.detail_cache = DetailCache()
     
-    def get_cached_store(self, store_link):
-        """Lấy cửa hàng từ cache nếu có"""
-        with self.cache_lock:
-            return self.store_cache.get(store_link)
+    def get_cached_store(self, cache_key):
+        """Lấy cửa hàng từ cache nếu có (chưa hết hạn)"""
+        return self.detail_cache.get(cache_key)
     
-    def cache_store(self, store_link, store_data):
+    def cache_store(self, cache_key, store_data):
         """Lưu cửa hàng vào cache"""
-        with self.cache_lock:
-            self.store_cache[store_link] = store_data
+        self.detail_cache.put(cache_key, store_data)
+    
+    @staticmethod
+    def _place_key(row):
+        """Place key của cửa hàng (định danh ổn định giữa các job), link gốc nếu không rút được key"""
+        return row.get('place_key') or canonical_place_key(row['link']) or row['link']
+    
+    def _has_listing_details(self, row):
+        """Cửa hàng đã có đủ FAST_PATH_REQUIRED_FIELDS từ trang kết quả tìm kiếm chưa"""
+        if not FAST_PATH_REQUIRED_FIELDS:
+            return False
+        for field in FAST_PATH_REQUIRED_FIELDS:
+            value = row.get(field)
+            if not isinstance(value, str) or value in ('Not Found', 'Error', ''):
+                return False
+        return True
+    
+    def _skip_processed_rows(self, rows, job):
+        """Resume: bỏ cửa hàng đã xử lý xong ở lần chạy trước của job này"""
+        processed_keys = job.get('processed_keys') if job is not None else None
+        if not processed_keys:
+            return rows
+        remaining = [row for row in rows if self._place_key(row) not in processed_keys]
+        skipped = len(rows) - len(remaining)
+        if skipped:
+            with self.stats_lock:
+                self.stats['resumed_stores'] += skipped
+            logger.info(f"⏯️ Job {job['id']}: bỏ qua {skipped} cửa hàng đã xử lý ở lần chạy trước")
+        return remaining
+    
+    def _track_progress(self, job, row, future):
+        """Ghi checkpoint khi cửa hàng đã lưu xong (ghi lỗi thì không, lần resume sẽ xử lý lại)"""
+        if self.checkpoint is None:
+            return
+        place_key = self._place_key(row)
+        
+        def on_done(done):
+            if self._write_outcome(done) is not None:
+                self.checkpoint.store_done(job, place_key)
+        future.add_done_callback(on_done)
+    
+    def _job_started(self, job):
+        if self.checkpoint is not None:
+            self.checkpoint.job_started(job)
+    
+    def _job_finished(self, job):
+        if self.checkpoint is not None:
+            self.checkpoint.job_finished(job)
+    
+    def _split_known_rows(self, rows, job=None):
+        """
+        Chia danh sách cửa hàng của một job thành (chưa có, đã có, đã có nhưng quá hạn) theo place key
+        Membership filter loại trước key chắc chắn mới, key còn lại hỏi database bằng một câu query
+        Cửa hàng quá hạn (chỉ ở chế độ incremental) cần scrape lại trang chi tiết
+        """
+        if not (PRECHECK_KNOWN_STORES or self.incremental) or not rows:
+            return rows, [], []
+        
+        keys_by_index = {}
+        for index, row in enumerate(rows):
+            place_key = row.get('place_key') or canonical_place_key(row['link'])
+            if place_key and self.known_stores.might_exist(place_key, None):
+                keys_by_index[index] = place_key
+        if not keys_by_index:
+            return rows, [], []
+        
+        candidates = set(keys_by_index.values())
+        stale_keys = set()
+        if self.incremental:
+            # Cần thời điểm scrape gần nhất nên luôn hỏi database, kể cả khi filter chính xác
+            freshness = self.db.get_place_key_freshness(candidates)
+            known_keys = set(freshness)
+            stale_keys = self._collect_stale_keys(freshness)
+        elif self.known_stores.exact:
+            known_keys = candidates
+        else:
+            known_keys = self.db.find_known_place_keys(candidates)
+        if self.known_stores.enabled and not self.known_stores.exact:
+            for place_key in candidates:
+                self.known_stores.record_confirmation(place_key in known_keys)
+        
+        unknown_rows, known_rows, stale_rows = [], [], []
+        for index, row in enumerate(rows):
+            place_key = keys_by_index.get(index)
+            if place_key in stale_keys:
+                stale_rows.append(row)
+            elif place_key in known_keys:
+                known_rows.append(row)
+            else:
+                unknown_rows.append(row)
+        
+        if known_rows or stale_rows:
+            with self.stats_lock:
+                self.stats['precheck_skipped'] += len(known_rows)
+                self.stats['stale_stores'] += len(stale_rows)
+            if job is not None:
+                job['precheck_skipped'] = job.get('precheck_skipped', 0) + len(known_rows)
+                job['stale_stores'] = job.get('stale_stores', 0) + len(stale_rows)
+            logger.info(f"🔎 Pre-check: {len(known_rows)}/{len(rows)} cửa hàng đã có trong database, bỏ qua trang chi tiết"
+                        + (f", {len(stale_rows)} quá hạn cần scrape lại" if stale_rows else ""))
+        return unknown_rows, known_rows, stale_rows
+    
+    def _collect_stale_keys(self, freshness):
+        """
+        Place key quá REFRESH_TTL kể từ lần scrape thành công gần nhất
+        Ghi lại content_hash cũ để lúc lưu biết nội dung có đổi không
+        """
+        stale_keys = set()
+        with self.stats_lock:
+            for place_key, (age, previous_hash) in freshness.items():
+                if age is not None and age < REFRESH_TTL:
+                    continue
+                stale_keys.add(place_key)
+                self.refresh_hashes[place_key] = previous_hash
+        return stale_keys
+    
+    def _resolve_without_detail(self, row):
+        """
+        Lấy chi tiết cửa hàng không cần load trang chi tiết: từ cache hoặc từ trang kết quả
+        Trả về (details, source) với source 'cache' | 'list', None nếu phải scrape trang chi tiết
+        """
+        cached_store = self.get_cached_store(self._place_key(row))
+        if cached_store:
+            logger.info(f"💾 Sử dụng cache cho: {row['nama'][:30]}...")
+            details = {
+                'phone': cached_store.get('phone', 'Not Found'),
+                'address': cached_store.get('address', 'Not Found'),
+                'website': cached_store.get('website', 'Not Found'),
+                'plus_code': cached_store.get('plus_code', 'Not Found')
+            }
+            # Cập nhật thống kê cache
+            with self.stats_lock:
+                self.stats['cached_stores'] += 1
+            return details, 'cache'
+        
+        if self._has_listing_details(row):
+            # Fast path (bật bằng FAST_PATH_REQUIRED_FIELDS): card kết quả không có website / plus code,
+            # địa chỉ là bản rút gọn - lưu như vậy và không có bước nào điền lại sau
+            logger.info(f"⚡ Đủ dữ liệu từ trang kết quả, bỏ qua trang chi tiết: {row['nama'][:30]}...")
+            details = {
+                'phone': row.get('phone', 'Not Found'),
+                'address': row.get('address', 'Not Found'),
+                'website': 'Not Found',
+                'plus_code': 'Not Found'
+            }
+            with self.stats_lock:
+                self.stats['detail_loads_avoided'] += 1
+            return details, 'list'
+        
+        return None
+    
+    def _iter_store_details(self, driver, rows, detail_scraper=None, job=None):
+        """
+        Generator: yield (row, details, source) cho từng cửa hàng (DataFrame hoặc list dict)
+        source: 'known' (đã có trong database và còn hạn, details None), 'cache' (cache chi tiết),
+        'list' (đủ field từ trang kết quả), 'detail' (scrape trang chi tiết)
+        Cửa hàng đã có, có trong cache hoặc đủ dữ liệu từ trang kết quả được trả trước, phần còn lại
+        scrape bằng detail_scraper, song song nhiều tab (DETAIL_TABS > 1) hoặc tuần tự
+        """
+        if isinstance(rows, pd.DataFrame):
+            rows = [row for _, row in rows.iterrows()]
+        
+        rows = self._skip_processed_rows(rows, job)
+        rows, known_rows, stale_rows = self._split_known_rows(rows, job)
+        for row in known_rows:
+            yield row, None, 'known'
+        
+        # Cửa hàng quá hạn phải load lại trang chi tiết (không dùng cache hay dữ liệu trang kết quả)
+        rows_to_scrape = list(stale_rows)
+        for row in rows:
+            resolved = self._resolve_without_detail(row)
+            if resolved:
+                details, source = resolved
+                yield row, details, source
+            else:
+                rows_to_scrape.append(row)
+        
+        if not rows_to_scrape:
+            return
+        
+        if detail_scraper is not None or (DETAIL_TABS > 1 and self.detail_fetcher is None):
+            # Pipeline load trang chi tiết trên nhiều tab của cùng driver, mỗi địa điểm chỉ load một lần
+            rows_by_link = {}
+            links_by_key = {}
+            for row in rows_to_scrape:
+                store_link = links_by_key.setdefault(self._place_key(row), row['link'])
+                rows_by_link.setdefault(store_link, []).append(row)
+            
+            if detail_scraper is None:
+                with MultiTabDetailScraper(driver, tabs=DETAIL_TABS) as scraper:
+                    for store_link, details in scraper.scrape(list(rows_by_link)):
+                        for row in rows_by_link[store_link]:
+                            yield row, details, 'detail'
+            else:
+                for store_link, details in detail_scraper.scrape(list(rows_by_link)):
+                    for row in rows_by_link[store_link]:
+                        yield row, details, 'detail'
+            return
+        
+        for row in rows_to_scrape:
+            # Scrape chi tiết nếu chưa có trong cache
+            try:
+                details = scrape_store_details(driver, row['link'], fetcher=self.detail_fetcher)
+            except Exception as scrape_error:
+                logger.warning(f"⚠️ Lỗi scrape chi tiết: {scrape_error}")
+                details = {
+                    'phone': 'Error',
+                    'address': 'Error',
+                    'website': 'Error',
+                    'plus_code': 'Error'
+                }
+            yield row, details, 'detail'
+            
+            # Delay tùy chọn giữa các cửa hàng (trang chi tiết đã được chờ theo trạng thái)
+            if STORE_DELAY > 0:
+                time.sleep(STORE_DELAY)
+    
+    def _save_store(self, row, details, source, job, batch_session):
+        """
+        Lưu một cửa hàng (cache + database), trả về Future với kết quả 'new' | 'duplicate' | 'skipped'
+        hoặc 'refreshed' | 'unchanged' với cửa hàng quá hạn được scrape lại (incremental)
+        """
+        if source == 'known':
+            # Pre-check đã xác nhận cửa hàng có trong database: không có chi tiết mới để ghi
+            future = Future()
+            future.set_result('duplicate')
+            with self.stats_lock:
+                self.stats['duplicate_stores'] += 1
+            logger.info(f"⏭️ Cửa hàng đã có trong database: {row['nama'][:30]}...")
+            return future
+        
+        place_key = self._place_key(row)
+        
+        # Tạo dữ liệu cửa hàng
+        store_data = {
+            'id': row['id'],
+            'nama': row['nama'],
+            'rating': row['rating'],
+            'link': row['link'],
+            'place_key': place_key if place_key != row['link'] else None,
+            'phone': details['phone'],
+            'address': details['address'],
+            'website': details['website'],
+            'plus_code': details['plus_code'],
+            'search_keyword': job['keyword'],
+            'search_location': job['location'],
+            'crawl_session': batch_session
+        }
+        
+        # Lưu vào cache chi tiết vừa scrape, chỉ khi có số điện thoại hợp lệ: kết quả lỗi / trang chưa tải xong
+        # (Not Found) mà cache thì cửa hàng bị bỏ qua suốt DETAIL_CACHE_TTL dù lần sau có thể scrape được
+        if source == 'detail' and normalize_phone(details['phone']):
+            self.cache_store(place_key, {
+                'phone': details['phone'],
+                'address': details['address'],
+                'website': details['website'],
+                'plus_code': details['plus_code']
+            })
+        
+        # Incremental: cửa hàng quá hạn vừa scrape lại - cập nhật dòng cũ thay vì insert
+        with self.stats_lock:
+            previous_hash = self.refresh_hashes.pop(store_data['place_key'], _NOT_STALE)
+        if previous_hash is not _NOT_STALE:
+            return self._refresh_store(store_data, previous_hash)
+        
+        # Cửa hàng đã có trong database: tra membership filter, chỉ hỏi database khi có thể trùng
+        phone_normalized = normalize_phone(store_data['phone'])
+        if phone_normalized and self._is_known_store(store_data['place_key'], phone_normalized):
+            future = Future()
+            future.set_result('duplicate')
+            self._on_store_written(store_data, future)
+            return future
+        
+        # Đưa vào batch writer - ghi theo nhóm (group commit) cùng cửa hàng từ các luồng khác
+        logger.info(f"💾 Đang lưu cửa hàng vào database: {row['nama'][:30]}...")
+        future = self.db_writer.submit(store_data)
+        future.add_done_callback(lambda done: self._on_store_written(store_data, done))
+        return future
+    
+    def _refresh_store(self, store_data, previous_hash):
+        """Cập nhật cửa hàng quá hạn vừa scrape lại, nội dung không đổi thì chỉ cập nhật thời điểm scrape"""
+        future = Future()
+        if store_data['phone'] == 'Error':
+            # Scrape lỗi: giữ dữ liệu và thời điểm scrape cũ để lần sau thử lại
+            logger.warning(f"⚠️ Scrape lại lỗi, giữ dữ liệu cũ: {store_data['nama'][:30]}...")
+            future.set_exception(Exception("Scrape lại trang chi tiết lỗi"))
+            return future
+        
+        outcome = self.db.refresh_store(store_data, previous_hash)
+        if outcome is None:
+            future.set_exception(Exception("Lỗi cập nhật cửa hàng quá hạn"))
+            return future
+        
+        with self.stats_lock:
+            self.stats[f'{outcome}_stores'] += 1
+        if outcome == 'refreshed':
+            logger.info(f"♻️ Đã cập nhật cửa hàng (nội dung thay đổi): {store_data['nama'][:30]}...")
+        else:
+            logger.info(f"🕒 Cửa hàng không đổi, chỉ cập nhật thời điểm scrape: {store_data['nama'][:30]}...")
+        future.set_result(outcome)
+        return future
+    
+    def _on_store_written(self, store_data, future):
+        """Cập nhật thống kê khi nhóm chứa cửa hàng đã được ghi (chạy trong luồng writer)"""
+        try:
+            outcome = future.result()
+        except Exception as db_error:
+            logger.error(f"❌ Lỗi lưu database: {db_error}")
+            logger.error(f"   Store data: {store_data}")
+            return
+        
+        if outcome == 'new':
+            self.known_stores.add(store_data['place_key'], normalize_phone(store_data['phone']))
+            with self.stats_lock:
+                self.stats['new_stores'] += 1
+            logger.info(f"✅ Cửa hàng mới: {store_data['nama'][:30]}...")
+        elif outcome == 'duplicate':
+            with self.stats_lock:
+                self.stats['duplicate_stores'] += 1
+            logger.info(f"⏭️ Cửa hàng bị skip (trùng địa điểm hoặc số điện thoại): {store_data['nama'][:30]}...")
+        else:
+            with self.stats_lock:
+                self.stats['skipped_stores'] += 1
+            logger.info(f"⏭️ Cửa hàng bị skip (không có số điện thoại): {store_data['nama'][:30]}...")
+    
+    def _is_known_store(self, place_key, phone_normalized):
+        """Cửa hàng đã có trong database chưa - filter trả lời 'chắc chắn chưa' thì không hỏi database"""
+        if not self.known_stores.enabled or not self.known_stores.might_exist(place_key, phone_normalized):
+            return False
+        exists = True if self.known_stores.exact else self.db.store_is_known(place_key, phone_normalized)
+        self.known_stores.record_confirmation(exists)
+        return exists
+    
+    @staticmethod
+    def _write_outcome(future):
+        """Kết quả ghi của một cửa hàng: 'new' | 'duplicate' | 'skipped', None nếu lỗi"""
+        try:
+            return future.result()
+        except Exception:
+            return None
+    
+    def _process_stores(self, driver, rows, job, batch_session, detail_scraper=None, offset=0, total=None):
+        """Scrape chi tiết + lưu danh sách cửa hàng, trả về (số mới, số trùng lặp), số bỏ qua ghi vào job['skipped_stores']"""
+        new_stores = 0
+        duplicate_stores = 0
+        writes = []
+        total = len(rows) if total is None else total
+        
+        store_details = self._iter_store_details(driver, rows, detail_scraper, job)
+        for position, (row, details, source) in enumerate(store_details, start=offset + 1):
+            try:
+                logger.info(f"📝 Đang xử lý cửa hàng {position}/{total}: {row['nama'][:30]}...")
+                if source == 'list':
+                    job['detail_loads_avoided'] = job.get('detail_loads_avoided', 0) + 1
+                future = self._save_store(row, details, source, job, batch_session)
+                self._track_progress(job, row, future)
+                writes.append(future)
+            except Exception as e:
+                logger.warning(f"⚠️ Lỗi xử lý cửa hàng: {e}")
+                continue
+        
+        # Browser không chờ database: chỉ đợi kết quả ghi khi đã xử lý xong danh sách
+        for future in writes:
+            outcome = self._write_outcome(future)
+            if outcome == 'new':
+                new_stores += 1
+            elif outcome == 'duplicate':
+                duplicate_stores += 1
+            elif outcome == 'skipped':
+                job['skipped_stores'] = job.get('skipped_stores', 0) + 1
+            elif outcome in ('refreshed', 'unchanged'):
+                job[f'{outcome}_stores'] = job.get(f'{outcome}_stores', 0) + 1
+        
+        return new_stores, duplicate_stores
+    
+    def _process_job_streaming(self, driver, job, batch_session, list_fetcher):
+        """
+        Xử lý job ở chế độ streaming: cửa hàng mới xuất hiện sau mỗi lần scroll
+        được scrape chi tiết (ở tab riêng) và lưu ngay, không chờ scroll xong
+        """
+        logger.info("📋 Đang scrape danh sách cửa hàng (streaming)...")
+        stores_found = 0
+        job_new_stores = 0
+        job_duplicate_stores = 0
+        max_stores = job['max_stores']
+        
+        # Tab kết quả tìm kiếm phải giữ nguyên để scroll tiếp nên chi tiết luôn load ở tab riêng
+        with MultiTabDetailScraper(driver, tabs=max(1, DETAIL_TABS)) as detail_scraper:
+            for batch in Scrap_data_stream(driver, fetcher=list_fetcher):
+                if max_stores > 0:
+                    batch = batch[:max_stores - stores_found]
+                if not batch:
+                    break
+                
+                new_stores, duplicate_stores = self._process_stores(
+                    driver, batch, job, batch_session, detail_scraper,
+                    offset=stores_found, total=max_stores or None
+                )
+                stores_found += len(batch)
+                job_new_stores += new_stores
+                job_duplicate_stores += duplicate_stores
+                
+                if max_stores > 0 and stores_found >= max_stores:
+                    logger.info(f"🔢 Giới hạn: {max_stores} cửa hàng")
+                    break
+        
+        if stores_found == 0:
+            logger.warning(f"⚠️ Không tìm thấy cửa hàng nào cho '{job['keyword']}' tại '{job['location']}'")
+            job['status'] = 'no_results'
+            return job
+        
+        job['status'] = 'completed'
+        job['stores_found'] = stores_found
+        job['new_stores'] = job_new_stores
+        job['duplicate_stores'] = job_duplicate_stores
+        
+        with self.stats_lock:
+            self.stats['completed_jobs'] += 1
+            self.stats['total_stores'] += stores_found
+        
+        logger.info(f"✅ Hoàn thành job {job['id']}: {job_new_stores} mới, {job_duplicate_stores} trùng lặp, "
+                    f"{job.get('detail_loads_avoided', 0) + job.get('precheck_skipped', 0)} trang chi tiết không cần load")
+        return job
     
     def load_jobs_from_txt(self, file_path):
         """Load danh sách job từ file TXT - format: keyword|location|max_stores"""
@@ -58,14 +523,23 @@ class BatchCrawler:
                 
                 parts = line.split('|')
                 if len(parts) >= 2:
+                    max_stores_text = parts[2].strip() if len(parts) > 2 else ''
+                    if max_stores_text.isdigit():
+                        max_stores = int(max_stores_text)  # 0 = không giới hạn
+                    else:
+                        max_stores = 50
+                        if max_stores_text:
+                            logger.warning(f"⚠️ Dòng {i+1}: max_stores '{max_stores_text}' không hợp lệ, dùng mặc định 50")
                     job = {
                         'id': len(jobs) + 1,
                         'keyword': parts[0].strip(),
                         'location': parts[1].strip(),
-                        'max_stores': int(parts[2].strip()) if len(parts) > 2 and parts[2].strip().isdigit() else 50,
+                        'max_stores': max_stores,
                         'status': 'pending'
                     }
                     jobs.append(job)
+                else:
+                    logger.warning(f"⚠️ Dòng {i+1}: thiếu location, bỏ qua: {line}")
             
             logger.info(f"✅ Đã load {len(jobs)} jobs từ file TXT")
             return jobs
@@ -74,32 +548,140 @@ class BatchCrawler:
             logger.error(f"❌ Lỗi load file TXT: {e}")
             return []
     
+    def _release_job_driver(self, job, driver, driver_broken=False):
+        """Thống kê tài nguyên đã chặn trong job và trả driver về pool (driver lỗi sẽ bị đóng)"""
+        block_stats = collect_blocking_stats(driver)
+        job['blocked_requests'] = job.get('blocked_requests', 0) + block_stats['blocked_requests']
+        job['bytes_saved'] = job.get('bytes_saved', 0) + block_stats['bytes_saved']
+        with self.stats_lock:
+            self.stats['blocked_requests'] += block_stats['blocked_requests']
+            self.stats['bytes_saved'] += block_stats['bytes_saved']
+        logger.info(f"🚫 Job {job['id']}: chặn {block_stats['blocked_requests']} request, "
+                    f"tiết kiệm ~{block_stats['bytes_saved'] / 1024:.0f} KB "
+                    f"(đã tải {block_stats['transferred_bytes'] / 1024:.0f} KB)")
+        
+        self.driver_pool.release(driver, broken=driver_broken)
+        logger.info(f"🔚 Đã trả driver về pool cho job {job['id']}")
+    
+    def _tile_bounds(self, job):
+        """Khung tọa độ nếu job chạy theo tile, None nếu tìm kiếm văn bản thông thường"""
+        if not self.tiled and not job['location'].strip().lower().startswith(BBOX_PREFIX):
+            return None
+        return resolve_bounds(job['location'])
+    
+    def _process_job_tiled(self, driver, list_fetcher, job, batch_session, bounds):
+        """
+        Xử lý job theo tile: tìm theo viewport từng tile, chia tư tile chạm trần kết quả
+        Tile chỉ trả về địa điểm đã có trong database từ trước khi job bắt đầu thì không chia tiếp
+        (địa điểm đã gặp ở tile cha trong cùng job vẫn tính là chưa biết - tile con chứa lõi dày đặc
+        của tile cha sẽ trả lại đúng các địa điểm đó nhưng vẫn cần chia tiếp)
+        """
+        search = QuadtreeSearch(bounds)
+        seen_keys = set()
+        known_before_job = set()  # Place key đã có trong database trước khi job lưu gì
+        stores_found = 0
+        job_new_stores = 0
+        job_duplicate_stores = 0
+        max_stores = job['max_stores']
+        
+        while True:
+            tile = search.next_tile()
+            if tile is None:
+                break
+            tile_url = build_tile_url(job['keyword'], tile)
+            logger.info(f"🧭 Tile {tile.label()} (độ sâu {tile.depth}, zoom {tile.zoom}): {tile_url}")
+            
+            df = Scrap_data(driver, fetcher=list_fetcher, url_search=tile_url, max_scrolls=GEO_MAX_SCROLLS)
+            
+            tile_keys = [self._place_key(row) for _, row in df.iterrows()]
+            # Lần đầu gặp trong job: hỏi database trước khi xử lý, nên kết quả là trạng thái trước job
+            first_seen = {place_key for place_key in tile_keys if place_key not in seen_keys}
+            known_before_job |= self.db.find_known_place_keys(first_seen)
+            unknown = sum(1 for place_key in set(tile_keys) if place_key not in known_before_job)
+            
+            # Chỉ xử lý địa điểm chưa gặp ở tile trước (các tile kề nhau trả về kết quả chồng lấn)
+            rows = []
+            for (_, row), place_key in zip(df.iterrows(), tile_keys):
+                if place_key not in seen_keys:
+                    seen_keys.add(place_key)
+                    rows.append(row)
+            if max_stores > 0:
+                rows = rows[:max_stores - stores_found]
+            
+            new_stores, duplicate_stores = 0, 0
+            if rows:
+                new_stores, duplicate_stores = self._process_stores(
+                    driver, rows, job, batch_session, offset=stores_found, total=max_stores or None
+                )
+            search.report(tile, len(df), unknown)
+            
+            stores_found += len(rows)
+            job_new_stores += new_stores
+            job_duplicate_stores += duplicate_stores
+            
+            if max_stores > 0 and stores_found >= max_stores:
+                logger.info(f"🔢 Giới hạn: {max_stores} cửa hàng")
+                break
+        
+        logger.info(f"🧭 Job {job['id']}: {search.summary()}")
+        with self.stats_lock:
+            self.stats['geo_tiles'] += search.stats['tiles']
+        
+        if stores_found == 0:
+            logger.warning(f"⚠️ Không tìm thấy cửa hàng nào cho '{job['keyword']}' tại '{job['location']}'")
+            job['status'] = 'no_results'
+            return job
+        
+        job['status'] = 'completed'
+        job['stores_found'] = stores_found
+        job['new_stores'] = job_new_stores
+        job['duplicate_stores'] = job_duplicate_stores
+        job['geo_tiles'] = search.stats['tiles']
+        
+        with self.stats_lock:
+            self.stats['completed_jobs'] += 1
+            self.stats['total_stores'] += stores_found
+        
+        logger.info(f"✅ Hoàn thành job {job['id']}: {job_new_stores} mới, {job_duplicate_stores} trùng lặp, "
+                    f"{job.get('detail_loads_avoided', 0) + job.get('precheck_skipped', 0)} trang chi tiết không cần load")
+        return job
+    
     def process_single_job(self, job, batch_session):
         """Xử lý một job đơn lẻ - Thread Safe"""
         try:
             logger.info(f"📋 === JOB {job['id']}: '{job['keyword']}' tại '{job['location']}' ===")
+            self._job_started(job)
             
-            # Tạo URL
-            search_url = build_search_url(job['keyword'], job['location'])
-            logger.info(f"🌐 URL: {search_url}")
+            # Job theo tile tự mở URL từng tile, driver lấy từ pool với trang trống
+            tile_bounds = self._tile_bounds(job)
+            search_url = None
+            if tile_bounds is None:
+                # Tạo URL
+                search_url = build_search_url(job['keyword'], job['location'])
+                logger.info(f"🌐 URL: {search_url}")
             
-            # Khởi tạo driver - thử không proxy trước
-            try:
-                logger.info("🔄 Thử khởi tạo driver không proxy trước...")
-                driver = opened_link_chroome(search_url, use_proxy=False)
-            except Exception as driver_error:
-                logger.warning(f"⚠️ Lỗi khởi tạo driver không proxy: {driver_error}")
-                logger.info("🔄 Thử khởi tạo driver với proxy...")
-                try:
-                    driver = opened_link_chroome(search_url, use_proxy=True)
-                except Exception as proxy_error:
-                    logger.error(f"❌ Lỗi khởi tạo driver với proxy: {proxy_error}")
-                    raise
+            # Lấy driver từ pool (tự khởi tạo lại nếu driver lỗi), không cần nếu cả hai giai đoạn đều dùng HTTP
+            # Pool mở sẵn URL tìm kiếm cho Selenium (driver lỗi khi mở URL được khởi tạo lại),
+            # list fetcher Selenium scroll trang đang mở, HTTP tự tải URL
+            driver = None
+            if self.list_fetcher is None:
+                driver = self.driver_pool.acquire(search_url)
+            elif self.detail_fetcher is None:
+                driver = self.driver_pool.acquire(None)
+            list_fetcher = self.list_fetcher or SeleniumFetcher(driver)
+            list_url = search_url if self.list_fetcher is not None else None
+            driver_broken = False
             
             try:
+                if tile_bounds is not None:
+                    return self._process_job_tiled(driver, list_fetcher, job, batch_session, tile_bounds)
+                
+                if LIST_STREAMING and self.list_fetcher is None:
+                    return self._process_job_streaming(driver, job, batch_session, list_fetcher)
+                
                 # Scrape danh sách cửa hàng
                 logger.info("📋 Đang scrape danh sách cửa hàng...")
-                df = Scrap_data(driver)
+                df = Scrap_data(driver, fetcher=list_fetcher, url_search=list_url)
                 
                 if df.empty:
                     logger.warning(f"⚠️ Không tìm thấy cửa hàng nào cho '{job['keyword']}' tại '{job['location']}'")
@@ -114,98 +696,7 @@ class BatchCrawler:
                     logger.info(f"🔢 Giới hạn: {job['max_stores']} cửa hàng")
                 
                 # Xử lý từng cửa hàng
-                job_new_stores = 0
-                job_duplicate_stores = 0
-                
-                for index, row in df.iterrows():
-                    try:
-                        logger.info(f"📝 Đang xử lý cửa hàng {index+1}/{len(df)}: {row['nama'][:30]}...")
-                        
-                        # Kiểm tra cache trước
-                        store_link = row['link']
-                        cached_store = self.get_cached_store(store_link)
-                        
-                        if cached_store:
-                            logger.info(f"💾 Sử dụng cache cho: {row['nama'][:30]}...")
-                            details = {
-                                'phone': cached_store.get('phone', 'Not Found'),
-                                'address': cached_store.get('address', 'Not Found'),
-                                'website': cached_store.get('website', 'Not Found'),
-                                'plus_code': cached_store.get('plus_code', 'Not Found')
-                            }
-                            # Cập nhật thống kê cache
-                            with self.stats_lock:
-                                self.stats['cached_stores'] += 1
-                        else:
-                            # Scrape chi tiết nếu chưa có trong cache
-                            try:
-                                details = scrape_store_details(driver, row['link'])
-                            except Exception as scrape_error:
-                                logger.warning(f"⚠️ Lỗi scrape chi tiết: {scrape_error}")
-                                details = {
-                                    'phone': 'Error',
-                                    'address': 'Error',
-                                    'website': 'Error',
-                                    'plus_code': 'Error'
-                                }
-                        
-                        # Tạo dữ liệu cửa hàng
-                        store_data = {
-                            'id': row['id'],
-                            'nama': row['nama'],
-                            'rating': row['rating'],
-                            'link': row['link'],
-                            'phone': details['phone'],
-                            'address': details['address'],
-                            'website': details['website'],
-                            'plus_code': details['plus_code'],
-                            'search_keyword': job['keyword'],
-                            'search_location': job['location'],
-                            'crawl_session': batch_session
-                        }
-                        
-                        # Lưu vào cache nếu chưa có
-                        if not cached_store:
-                            self.cache_store(store_link, {
-                                'phone': details['phone'],
-                                'address': details['address'],
-                                'website': details['website'],
-                                'plus_code': details['plus_code']
-                            })
-                        
-                        # Lưu vào database
-                        try:
-                            logger.info(f"💾 Đang lưu cửa hàng vào database: {row['nama'][:30]}...")
-                            logger.info(f"🔍 DEBUG store_data keys: {list(store_data.keys())}")
-                            logger.info(f"🔍 DEBUG store_data phone: '{store_data.get('phone', 'N/A')}'")
-                            logger.info(f"🔍 DEBUG store_data nama: '{store_data.get('nama', 'N/A')}'")
-                            
-                            success = self.db.insert_store(store_data)
-                            
-                            logger.info(f"🔍 DEBUG insert_store returned: {success}")
-                            
-                            if success:
-                                job_new_stores += 1
-                                with self.stats_lock:
-                                    self.stats['new_stores'] += 1
-                                logger.info(f"✅ Cửa hàng mới: {row['nama'][:30]}...")
-                            else:
-                                job_duplicate_stores += 1
-                                with self.stats_lock:
-                                    self.stats['duplicate_stores'] += 1
-                                logger.info(f"⏭️ Cửa hàng bị skip (trùng số điện thoại hoặc không có số điện thoại): {row['nama'][:30]}...")
-                        except Exception as db_error:
-                            logger.error(f"❌ Lỗi lưu database: {db_error}")
-                            logger.error(f"   Store data: {store_data}")
-                            import traceback
-                            logger.error(f"   Traceback: {traceback.format_exc()}")
-                        
-                        # Nghỉ một chút giữa các cửa hàng để tránh bị chặn
-                        time.sleep(1.0)  # Tăng lên 1s để tránh bị chặn
-                        
-                    except Exception as e:
-                        logger.warning(f"⚠️ Lỗi xử lý cửa hàng: {e}")
-                        continue
+                job_new_stores, job_duplicate_stores = self._process_stores(driver, df, job, batch_session)
                 
                 # Cập nhật kết quả job
                 job['status'] = 'completed'
@@ -217,15 +708,15 @@ class BatchCrawler:
                     self.stats['completed_jobs'] += 1
                     self.stats['total_stores'] += len(df)
                 
-                logger.info(f"✅ Hoàn thành job {job['id']}: {job_new_stores} mới, {job_duplicate_stores} trùng lặp")
+                logger.info(f"✅ Hoàn thành job {job['id']}: {job_new_stores} mới, {job_duplicate_stores} trùng lặp, "
+                            f"{job.get('detail_loads_avoided', 0) + job.get('precheck_skipped', 0)} trang chi tiết không cần load")
                 
+            except Exception:
+                driver_broken = True
+                raise
             finally:
-                # Đóng driver
-                try:
-                    driver.quit()
-                    logger.info(f"🔚 Đã đóng driver cho job {job['id']}")
-                except:
-                    pass
+                if driver is not None:
+                    self._release_job_driver(job, driver, driver_broken)
             
             return job
             
@@ -235,53 +726,99 @@ class BatchCrawler:
             job['error'] = str(job_error)
             return job
     
-    def run_batch_crawl(self, jobs):
-        """Chạy batch crawl cho tất cả jobs - Hỗ trợ đa luồng"""
-        self.stats['total_jobs'] = len(jobs)
+    def _run_jobs_threaded(self, jobs, batch_session):
+        """Mỗi luồng chạy trọn một job (list → chi tiết → lưu)"""
+        # Sử dụng ThreadPoolExecutor để chạy đa luồng
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            # Submit tất cả jobs
+            future_to_job = {
+                executor.submit(self.process_single_job, job, batch_session): job 
+                for job in jobs
+            }
+            
+            # Xử lý kết quả khi hoàn thành
+            for future in as_completed(future_to_job):
+                job = future_to_job[future]
+                try:
+                    result = future.result()
+                    logger.info(f"✅ Job {result['id']} hoàn thành: {result['status']}")
+                    self._job_finished(result)
+                    
+                    # Thêm delay giữa các job để tránh bị chặn
+                    if MAX_WORKERS == 1:  # Chỉ delay khi chạy 1 luồng
+                        logger.info(f"⏳ Chờ {THREAD_DELAY}s trước job tiếp theo...")
+                        time.sleep(THREAD_DELAY)
+                        
+                except Exception as exc:
+                    logger.error(f"❌ Job {job['id']} lỗi: {exc}")
+                    job['status'] = 'error'
+                    job['error'] = str(exc)
+                    self._job_finished(job)
+    
+    def run_batch_crawl(self, jobs, resume_session=None):
+        """
+        Chạy batch crawl cho tất cả jobs - Hỗ trợ đa luồng
+        resume_session: chạy tiếp session cũ - bỏ job đã xong, job dở dang bỏ cửa hàng đã xử lý
+        """
+        all_jobs = jobs
         self.stats['start_time'] = datetime.now()
         
+        # Tạo session ID duy nhất cho batch này (hoặc dùng lại session cần resume)
+        batch_session = resume_session or f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.checkpoint = CrawlCheckpoint(self.db, batch_session)
+        jobs = self.checkpoint.start(all_jobs, resume=resume_session is not None)
+        self.stats['resumed_jobs'] = len(all_jobs) - len(jobs)
+        self.stats['total_jobs'] = len(jobs)
+        
         logger.info(f"🚀 Bắt đầu batch crawl {len(jobs)} jobs với {MAX_WORKERS} luồng...")
+        logger.info(f"🔖 Crawl session: {batch_session} (chạy tiếp nếu bị dừng: --resume {batch_session})")
         
-        # Tạo session ID duy nhất cho batch này
-        batch_session = f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        if LIST_STREAMING and self.list_fetcher is not None:
+            logger.warning("⚠️ LIST_STREAMING cần scroll bằng browser, bỏ qua khi LIST_FETCHER=http")
         
         try:
-            # Sử dụng ThreadPoolExecutor để chạy đa luồng
-            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-                # Submit tất cả jobs
-                future_to_job = {
-                    executor.submit(self.process_single_job, job, batch_session): job 
-                    for job in jobs
-                }
-                
-                # Xử lý kết quả khi hoàn thành
-                for future in as_completed(future_to_job):
-                    job = future_to_job[future]
-                    try:
-                        result = future.result()
-                        logger.info(f"✅ Job {result['id']} hoàn thành: {result['status']}")
-                        
-                        # Thêm delay giữa các job để tránh bị chặn
-                        if MAX_WORKERS == 1:  # Chỉ delay khi chạy 1 luồng
-                            logger.info(f"⏳ Chờ {THREAD_DELAY}s trước job tiếp theo...")
-                            time.sleep(THREAD_DELAY)
-                            
-                    except Exception as exc:
-                        logger.error(f"❌ Job {job['id']} lỗi: {exc}")
-                        job['status'] = 'error'
-                        job['error'] = str(exc)
+            # Khởi tạo sẵn driver pool trước khi chạy job (không cần nếu chỉ dùng HTTP)
+            if self.list_fetcher is None or self.detail_fetcher is None:
+                self.driver_pool.warm_up()
+            
+            if PIPELINE_MODE:
+                # Pipeline theo stage: browser, parser và database chạy song song qua queue giới hạn
+                # Job theo tile cần nhiều lượt tìm kiếm nối tiếp nhau nên chạy theo luồng sau pipeline
+                tiled_jobs, pipeline_jobs = [], []
+                for job in jobs:
+                    (tiled_jobs if self._tile_bounds(job) is not None else pipeline_jobs).append(job)
+                logger.info("🔗 Chạy batch crawl theo pipeline search → list → detail → parse → persist")
+                self.pipeline = CrawlPipeline(self, batch_session)
+                self.pipeline.run(pipeline_jobs)
+                for job in pipeline_jobs:
+                    logger.info(f"✅ Job {job['id']} hoàn thành: {job['status']}")
+                    if job['status'] != 'completed':
+                        self._job_finished(job)  # Job completed đã được checkpoint lúc hoàn thành
+                if tiled_jobs:
+                    logger.info(f"🧭 Chạy {len(tiled_jobs)} job theo tile")
+                    self._run_jobs_threaded(tiled_jobs, batch_session)
+            else:
+                self._run_jobs_threaded(jobs, batch_session)
         
         except KeyboardInterrupt:
             logger.info("⏹️ Người dùng dừng chương trình")
-            return jobs
+            logger.info(f"⏯️ Chạy tiếp phần còn lại: python batch_crawler.py --resume {batch_session}")
+            return all_jobs
         except Exception as e:
             logger.error(f"❌ Lỗi nghiêm trọng trong batch crawl: {e}")
+        finally:
+            # Đóng tất cả driver trong pool
+            self.driver_pool.close()
+            # Ghi nốt các cửa hàng còn chờ trong batch writer, rồi tiến độ của chúng
+            self.db_writer.close()
+            self.checkpoint.flush()
+            self.detail_cache.close()
         
         # Kết thúc
         self.stats['end_time'] = datetime.now()
         self._print_final_stats()
         
-        return jobs
+        return all_jobs
     
     def _print_final_stats(self):
         """In thống kê cuối cùng"""
@@ -290,21 +827,64 @@ class BatchCrawler:
         print(f"\n🎉 === KẾT QUẢ BATCH CRAWL ===")
         print(f"⏱️ Thời gian: {duration}")
         print(f"📋 Jobs hoàn thành: {self.stats['completed_jobs']}/{self.stats['total_jobs']}")
+        if self.stats['resumed_jobs'] or self.stats['resumed_stores']:
+            print(f"⏯️ Resume: {self.stats['resumed_jobs']} job đã xong và {self.stats['resumed_stores']} cửa hàng "
+                  f"đã xử lý ở lần chạy trước được bỏ qua")
         print(f"🏪 Tổng cửa hàng tìm thấy: {self.stats['total_stores']}")
         print(f"🆕 Cửa hàng mới: {self.stats['new_stores']}")
         print(f"🔄 Cửa hàng trùng lặp: {self.stats['duplicate_stores']}")
+        print(f"⏭️ Cửa hàng bỏ qua (không có số điện thoại): {self.stats['skipped_stores']}")
         print(f"💾 Cửa hàng từ cache: {self.stats['cached_stores']}")
-        print(f"📊 Cache size: {len(self.store_cache)} cửa hàng")
+        print(f"⚡ Trang chi tiết không cần load (đủ dữ liệu từ trang kết quả): {self.stats['detail_loads_avoided']}")
+        print(f"🔎 Trang chi tiết không cần load (đã có trong database): {self.stats['precheck_skipped']}")
+        if self.stats['geo_tiles']:
+            print(f"🧭 Tile đã tìm kiếm (tìm theo viewport): {self.stats['geo_tiles']}")
+        if self.incremental:
+            self._print_incremental_report()
+        self.detail_cache.print_summary()
+        wait_stats.print_summary()
+        self.db_writer.print_summary()
+        self.db.pool.print_summary()
+        self.known_stores.print_summary()
+        if self.pipeline is not None:
+            self.pipeline.print_summary()
+        print(f"🚫 Request bị chặn: {self.stats['blocked_requests']} (~{self.stats['bytes_saved'] / (1024 * 1024):.1f} MB tiết kiệm)")
         
         # Thống kê database
         total_in_db = self.db.get_store_count()
         print(f"🗄️ Tổng cửa hàng trong database: {total_in_db}")
 
+    def _print_incremental_report(self):
+        """Báo cáo chế độ incremental: bao nhiêu việc được bỏ qua nhờ cửa hàng còn hạn"""
+        with self.stats_lock:
+            stats = dict(self.stats)
+        known = stats['precheck_skipped'] + stats['stale_stores']
+        skipped_loads = stats['precheck_skipped'] + stats['cached_stores'] + stats['detail_loads_avoided']
+        total = stats['total_stores']
+        
+        print(f"\n♻️ === INCREMENTAL ===")
+        print(f"🔎 Cửa hàng đã có trong database: {known} "
+              f"({stats['precheck_skipped']} còn hạn - bỏ qua, {stats['stale_stores']} quá hạn - scrape lại)")
+        print(f"♻️ Nội dung thay đổi: {stats['refreshed_stores']}, không đổi (chỉ cập nhật thời điểm): {stats['unchanged_stores']}")
+        if total:
+            print(f"💡 Trang chi tiết không cần load: {skipped_loads}/{total} cửa hàng ({skipped_loads / total:.1%} công việc được bỏ qua)")
+
 def main():
     """Hàm main cho batch crawler"""
-    crawler = BatchCrawler()
+    parser = argparse.ArgumentParser(description="Batch crawler Google Maps theo list_jobs.txt")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Chỉ scrape lại chi tiết cửa hàng đã có khi quá hạn REFRESH_TTL")
+    parser.add_argument('--tiled', action='store_true', default=GEO_TILING,
+                        help="Job tại thành phố đã biết khung tọa độ tìm theo tile (@lat,lng,zoom), chia nhỏ tile chạm trần kết quả")
+    parser.add_argument('--resume', metavar='SESSION',
+                        help="Chạy tiếp crawl session đã dừng (bỏ job đã xong, tiếp tục job dở dang)")
+    args = parser.parse_args()
+    
+    crawler = BatchCrawler(incremental=args.incremental, tiled=args.tiled)
     
     print("🔍 === BATCH CRAWLER ===")
+    if args.incremental:
+        print("♻️ Chế độ incremental: bỏ qua cửa hàng đã có còn hạn")
     print("🚀 Tự động chạy với list_jobs.txt...")
     
     # Load jobs từ file mặc định
@@ -315,15 +895,21 @@ def main():
         print("❌ Không có job nào để crawl")
         return
     
-    # Hiển thị danh sách jobs
-    print(f"\n📋 Danh sách {len(jobs)} jobs:")
-    for job in jobs:
-        print(f"  {job['id']}. '{job['keyword']}' tại '{job['location']}' (tối đa {job['max_stores']})")
+    if JOB_PLANNER:
+        # Gộp job trùng / gần trùng, job nhiều cửa hàng mới chạy trước
+        planner = JobPlanner(crawler.db)
+        jobs = planner.plan(jobs)
+        planner.print_plan(jobs)
+    else:
+        # Hiển thị danh sách jobs
+        print(f"\n📋 Danh sách {len(jobs)} jobs:")
+        for job in jobs:
+            print(f"  {job['id']}. '{job['keyword']}' tại '{job['location']}' (tối đa {job['max_stores']})")
     
     print(f"\n🚀 Bắt đầu crawl {len(jobs)} jobs...")
     
     # Chạy batch crawl
-    results = crawler.run_batch_crawl(jobs)
+    results = crawler.run_batch_crawl(jobs, resume_session=args.resume)
     
     print(f"\n🎉 Hoàn thành batch crawl!")
 
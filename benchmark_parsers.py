@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark parser trang kết quả tìm kiếm Google Maps
+
+So sánh:
+- legacy: cách Scrap_data cũ (BeautifulSoup html.parser, find_all lặp lại 5 lần)
+- bs4: list_parser một lượt với BeautifulSoup html.parser
+- lxml: list_parser một lượt với lxml + XPath biên dịch sẵn
+
+Chạy: python benchmark_parsers.py [--cards 120] [--repeat 20] [--html saved_page.html]
+
+Chế độ --scaling: parse --pages trang bằng N thread (bị GIL tuần tự hóa) và N process
+(ProcessPoolExecutor như parse_pool) với N = 1, 2, 4... tới số core, in throughput theo số core
+"""
+
+import os
+import argparse
+import time
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from bs4 import BeautifulSoup
+from list_parser import parse_list_html, parse_store_card, CARD_CLASSES, HAS_LXML
+
+CARD_TEMPLATE = """
+<div class="Nv2PK THOPZb CpccDe">
+  <a class="hfpxzc" aria-label="Shop hoa {i}" href="https://www.google.com/maps/place/Shop+hoa+{i}/data=!4m7!3m6!1s0x31752f{i:04x}:0x{i:08x}!8m2!3d10.77{i:03d}!4d106.69{i:03d}!16s%2Fg%2F11{i:05d}?authuser=0&hl=vi&rclk=1"></a>
+  <div class="bfdHYd Ppzolf OFBs3e">
+    <div class="lI9IFe"><div class="y7PRA"><div class="Lui3od"><div class="UaQhfb fontBodyMedium">
+      <div class="NrDZNb"><div class="qBF1Pd fontHeadlineSmall">Shop hoa {i}</div></div>
+      <div class="W4Efsd"><div class="AJB7ye"><span class="ZkP5Je" role="img" aria-label="4,{r} sao">
+        <span class="MW4etd">4,{r}</span><span class="UY7F9">({i})</span></span></div></div>
+      <div class="W4Efsd">
+        <div class="W4Efsd"><span><span>Cửa hàng hoa</span></span><span> · </span><span>{i} Lê Lợi, Phường Bến Nghé, Quận 1</span></div>
+        <div class="W4Efsd"><span><span style="font-weight: 400;">Mở cửa</span></span><span> · </span><span class="UsdlK">090 {i:03d} {r}567</span></div>
+      </div>
+    </div></div></div></div>
+  </div>
+</div>
+"""
+
+def build_sample_page(cards):
+    """Tạo trang kết quả giả lập với số card cho trước"""
+    body = "".join(CARD_TEMPLATE.format(i=i, r=i % 10) for i in range(cards))
+    return (
+        "<html><head><title>Google Maps</title></head><body>"
+        "<div role='main'><div role='feed'>" + body + "</div></div></body></html>"
+    )
+
+def parse_legacy(html):
+    """Tái hiện vòng lặp cũ của Scrap_data: find_all chạy lại cho mỗi container selector"""
+    data = BeautifulSoup(html, 'html.parser')
+    res = []
+    for _ in range(5):
+        containers = data.find_all('div', class_=lambda x: x and any(cls in x for cls in CARD_CLASSES))
+        for i, area in enumerate(containers):
+            store = parse_store_card(area, i)
+            if store:
+                res.append(store)
+    return res
+
+def run(name, func, html, repeat):
+    func(html)  # warm up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        records = func(html)
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"{name:<8} {elapsed * 1000:9.2f} ms/trang   {len(records):5d} records")
+    return elapsed
+
+def _count_records(html, engine):
+    # Cấp module để gửi được sang process con
+    return len(parse_list_html(html, engine=engine))
+
+def run_scaling(html, pages, max_workers, engine):
+    """Throughput parse (trang/giây) theo số worker: thread vs process"""
+    counts = []
+    workers = 1
+    while workers < max_workers:
+        counts.append(workers)
+        workers *= 2
+    counts.append(max_workers)
+
+    print(f"🧮 Scaling: {pages} trang/lượt, engine {engine}, {os.cpu_count()} core")
+    print(f"{'workers':>7} {'thread':>14} {'process':>14} {'speedup':>8}")
+    baseline = None
+    for workers in counts:
+        results = {}
+        for kind, executor_class, extra in (
+            ('thread', ThreadPoolExecutor, {}),
+            ('process', ProcessPoolExecutor, {'mp_context': multiprocessing.get_context('spawn')}),
+        ):
+            with executor_class(max_workers=workers, **extra) as executor:
+                list(executor.map(_count_records, [html] * workers, [engine] * workers))  # warm up
+                started = time.perf_counter()
+                list(executor.map(_count_records, [html] * pages, [engine] * pages))
+                results[kind] = pages / (time.perf_counter() - started)
+        baseline = baseline or results['process']
+        print(f"{workers:>7} {results['thread']:>10.1f} p/s {results['process']:>10.1f} p/s "
+              f"{results['process'] / baseline:>7.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parser trang kết quả Google Maps")
+    parser.add_argument('--cards', type=int, default=120, help="Số card trong trang giả lập")
+    parser.add_argument('--repeat', type=int, default=20, help="Số lần parse mỗi engine")
+    parser.add_argument('--html', help="File HTML trang kết quả đã lưu (thay cho trang giả lập)")
+    parser.add_argument('--scaling', action='store_true', help="Đo throughput parse theo số thread/process")
+    parser.add_argument('--pages', type=int, default=64, help="Số trang parse mỗi lượt ở chế độ --scaling")
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1, help="Số worker tối đa ở chế độ --scaling")
+    args = parser.parse_args()
+
+    if args.html:
+        with open(args.html, 'r', encoding='utf-8') as f:
+            html = f.read()
+    else:
+        html = build_sample_page(args.cards)
+    print(f"📄 HTML: {len(html) / 1024:.0f} KB")
+
+    if args.scaling:
+        run_scaling(html, args.pages, args.max_workers, 'lxml' if HAS_LXML else 'bs4')
+        return
+
+    baseline = run('legacy', parse_legacy, html, args.repeat)
+    run('bs4', lambda h: parse_list_html(h, engine='bs4'), html, args.repeat)
+    if HAS_LXML:
+        elapsed = run('lxml', lambda h: parse_list_html(h, engine='lxml'), html, args.repeat)
+        print(f"🚀 lxml nhanh hơn legacy {baseline / elapsed:.1f}x")
+    else:
+        print("⚠️ Chưa cài lxml, bỏ qua engine lxml")
+
+if __name__ == "__main__":
+    main()
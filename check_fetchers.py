@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Kiểm tra fetcher với server giả lập trên máy (http.server), không cần Google Maps hay browser
+
+- HttpFetcher.fetch_list + parse_pool.parse_list trên trang kết quả giả lập (card như benchmark_parsers)
+- Scrap_data / Scrap_data_stream đi qua list fetcher HTTP
+- HttpFetcher.fetch + parse_pool.parse_details trên trang chi tiết giả lập
+
+Chạy: python check_fetchers.py [--cards 40]
+Thoát với mã 1 nếu số cửa hàng / chi tiết parse được không khớp với trang giả lập
+"""
+
+import sys
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from benchmark_parsers import build_sample_page
+from fetchers import HttpFetcher
+from parse_pool import parse_pool
+from function import Scrap_data, Scrap_data_stream
+
+DETAIL_PAGE = """
+<html><body><div role='main'>
+  <h1 class="DUwDvf">Shop hoa 1</h1>
+  <button data-item-id="address"><div class="Io6YTe">1 Lê Lợi, Phường Bến Nghé, Quận 1, Hồ Chí Minh</div></button>
+  <button data-item-id="phone:tel:0901234567"><div class="Io6YTe">090 123 4567</div></button>
+  <a data-item-id="authority" href="https://shophoa.example"><div class="Io6YTe">shophoa.example</div></a>
+  <button data-item-id="oloc"><div class="Io6YTe">QJ7X+2V Quận 1</div></button>
+</div></body></html>
+"""
+EXPECTED_DETAILS = {
+    'phone': '090 123 4567',
+    'address': '1 Lê Lợi, Phường Bến Nghé, Quận 1, Hồ Chí Minh',
+    'website': 'https://shophoa.example',
+    'plus_code': 'QJ7X+2V Quận 1'
+}
+
+def start_server(pages):
+    """Server HTTP trên cổng ngẫu nhiên trả về pages[path], trả về (server, base_url)"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = pages.get(self.path.split('?')[0])
+            if body is None:
+                self.send_error(404)
+                return
+            payload = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def check(name, actual, expected):
+    ok = actual == expected
+    print(f"{'✅' if ok else '❌'} {name}: {actual}" + ("" if ok else f" (cần {expected})"))
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Kiểm tra fetcher với server giả lập trên máy")
+    parser.add_argument('--cards', type=int, default=40, help="Số card trong trang kết quả giả lập")
+    args = parser.parse_args()
+
+    server, base_url = start_server({'/search': build_sample_page(args.cards), '/place': DETAIL_PAGE})
+    fetcher = HttpFetcher(use_proxy=False)
+    results = []
+    try:
+        records = parse_pool.parse_list(fetcher.fetch_list(f"{base_url}/search"))
+        results.append(check("fetch_list + parse_list", len(records), args.cards))
+        results.append(check("place key đủ cho mọi card", sum(1 for record in records if record['place_key']), args.cards))
+
+        df = Scrap_data(None, fetcher=fetcher, url_search=f"{base_url}/search")
+        results.append(check("Scrap_data qua HTTP fetcher", len(df), args.cards))
+
+        streamed = sum(len(batch) for batch in Scrap_data_stream(None, fetcher=fetcher, url_search=f"{base_url}/search"))
+        results.append(check("Scrap_data_stream qua HTTP fetcher", streamed, args.cards))
+
+        details = parse_pool.parse_details(fetcher.fetch(f"{base_url}/place"))
+        results.append(check("fetch + parse_details", {field: details.get(field) for field in EXPECTED_DETAILS}, EXPECTED_DETAILS))
+    finally:
+        fetcher.close()
+        server.shutdown()
+        parse_pool.close()
+
+    sys.exit(0 if all(results) else 1)
+
+if __name__ == '__main__':
+    main()
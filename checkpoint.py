@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Checkpoint cho batch crawl
+Lưu trạng thái từng job và cửa hàng đã xử lý xong theo crawl session (bảng crawl_jobs, crawl_progress)
+để chạy lại bằng --resume <session>: bỏ qua job đã xong, job dở dang tiếp tục từ cửa hàng chưa xử lý
+"""
+
+import logging
+import threading
+from config import CHECKPOINT_FLUSH_STORES
+
+logger = logging.getLogger(__name__)
+
+# Trạng thái job không cần chạy lại khi resume
+FINISHED_STATUSES = ('completed', 'no_results')
+
+def job_key(job):
+    """Định danh job trong session, không phụ thuộc thứ tự dòng trong list_jobs.txt"""
+    return f"{job['keyword'].strip().lower()}|{job['location'].strip().lower()}|{job['max_stores']}"
+
+class CrawlCheckpoint:
+    """Checkpoint một crawl session - Thread Safe
+
+    Cửa hàng đã lưu xong được gom lại, ghi xuống database mỗi flush_every cửa hàng
+    (crash chỉ mất tối đa flush_every cửa hàng, chạy lại sẽ thành trùng lặp)
+    """
+
+    def __init__(self, db, crawl_session, flush_every=CHECKPOINT_FLUSH_STORES):
+        self.db = db
+        self.crawl_session = crawl_session
+        self.flush_every = max(1, flush_every)
+        self.pending = []  # [(job_key, place_key)] chưa ghi
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()  # Một luồng ghi tại một thời điểm, không giữ self.lock khi ghi
+
+    def start(self, jobs, resume=False):
+        """
+        Ghi danh sách job của session, trả về các job cần chạy
+        resume=True: bỏ job đã xong, gắn job['processed_keys'] cho job dở dang
+        """
+        for job in jobs:
+            job['job_key'] = job_key(job)
+
+        statuses, progress = self.db.load_crawl_session(self.crawl_session) if resume else ({}, {})
+        if resume and not statuses:
+            logger.warning(f"⚠️ Không tìm thấy checkpoint của session {self.crawl_session}, chạy từ đầu")
+        self.db.save_crawl_jobs(self.crawl_session, jobs)
+
+        pending_jobs = []
+        for job in jobs:
+            if statuses.get(job['job_key']) in FINISHED_STATUSES:
+                job['status'] = statuses[job['job_key']]
+                job['resumed'] = True
+                continue
+            processed_keys = progress.get(job['job_key'])
+            if processed_keys:
+                job['processed_keys'] = processed_keys
+            pending_jobs.append(job)
+
+        if resume and statuses:
+            partial = sum(1 for job in pending_jobs if job.get('processed_keys'))
+            logger.info(f"⏯️ Resume session {self.crawl_session}: bỏ qua {len(jobs) - len(pending_jobs)} job đã xong, "
+                        f"{partial} job tiếp tục dở dang, {len(pending_jobs) - partial} job chưa chạy")
+        return pending_jobs
+
+    def job_started(self, job):
+        job['status'] = 'running'
+        self.db.update_crawl_job(self.crawl_session, job)
+
+    def store_done(self, job, place_key):
+        """Cửa hàng đã lưu xong (hoặc xác nhận trùng) - gọi từ luồng crawler hoặc luồng writer"""
+        with self.lock:
+            self.pending.append((job['job_key'], place_key))
+            should_flush = len(self.pending) >= self.flush_every
+        if should_flush:
+            self.flush()
+
+    def job_finished(self, job):
+        """Ghi nốt cửa hàng của job rồi lưu trạng thái cuối của job"""
+        self.flush()
+        self.db.update_crawl_job(self.crawl_session, job)
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                entries, self.pending = self.pending, []
+            if not entries:
+                return
+            try:
+                self.db.insert_crawl_progress(self.crawl_session, entries)
+            except Exception as e:
+                logger.error(f"❌ Lỗi ghi checkpoint {len(entries)} cửa hàng: {e}")
+                with self.lock:
+                    self.pending = entries + self.pending
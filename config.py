@@ -15,6 +15,8 @@ DB_SSL_MODE = os.getenv("DB_SSL_MODE")
 DB_MAX_OPEN_CONNS = int(os.getenv("DB_MAX_OPEN_CONNS", "100"))
 DB_MAX_IDLE_CONNS = int(os.getenv("DB_MAX_IDLE_CONNS", "10"))
 DB_CONN_MAX_LIFETIME = int(os.getenv("DB_CONN_MAX_LIFETIME", "3600"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # Thời gian chờ tối đa để mượn connection database (giây)
+DB_HEALTH_CHECK_IDLE = float(os.getenv("DB_HEALTH_CHECK_IDLE", "30"))  # Ping connection idle lâu hơn số giây này trước khi dùng lại
 
 # Validate required database variables
 if not all([DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME]):
@@ -48,4 +50,79 @@ if not all([PROXY_HOST, PROXY_PORT, PROXY_USERNAME, PROXY_PASSWORD]):
 # Threading Configuration
 MAX_WORKERS = int(os.getenv("MAX_WORKERS", "1"))  # Số luồng tối đa
 THREAD_DELAY = float(os.getenv("THREAD_DELAY", "3.0"))  # Delay giữa các request (giây)
-PROXY_RETRY_COUNT = int(os.getenv("PROXY_RETRY_COUNT", "3"))  # Số lần retry khi proxy fail
\ No newline at end of file
+PROXY_RETRY_COUNT = int(os.getenv("PROXY_RETRY_COUNT", "3"))  # Số lần retry khi proxy fail
+# Driver Pool Configuration
+DRIVER_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", str(MAX_WORKERS)))  # Số Chrome driver giữ sẵn, mặc định = MAX_WORKERS
+
+# ChromeDriver Configuration
+CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH")  # Đường dẫn chromedriver có sẵn (bỏ qua webdriver-manager)
+CHROMEDRIVER_OFFLINE = os.getenv("CHROMEDRIVER_OFFLINE", "false").lower() in ("1", "true", "yes")  # Không tải chromedriver qua mạng
+
+# Detail Scraping Configuration
+DETAIL_TABS = int(os.getenv("DETAIL_TABS", "1"))  # Số tab load song song trang chi tiết trong 1 browser (1 = tuần tự)
+
+# Resource Blocking Configuration (qua Chrome DevTools)
+BLOCK_RESOURCES = os.getenv("BLOCK_RESOURCES", "true").lower() in ("1", "true", "yes")  # Chặn tài nguyên nặng (ảnh, font, tile bản đồ...)
+BLOCKED_RESOURCE_TYPES = [t.strip() for t in os.getenv("BLOCKED_RESOURCE_TYPES", "Image,Font,Media").split(",") if t.strip()]  # Loại tài nguyên bị chặn
+BLOCKED_URL_PATTERNS = [p.strip() for p in os.getenv("BLOCKED_URL_PATTERNS", "").split(",") if p.strip()]  # URL pattern chặn thêm (wildcard *)
+
+# Wait Configuration - chờ theo trạng thái trang thay vì sleep cố định (giây)
+WAIT_TIMEOUT_SEARCH = float(os.getenv("WAIT_TIMEOUT_SEARCH", "15"))  # Chờ trang kết quả tìm kiếm
+WAIT_TIMEOUT_SCROLL = float(os.getenv("WAIT_TIMEOUT_SCROLL", "4"))  # Chờ kết quả mới sau mỗi lần scroll
+WAIT_TIMEOUT_DETAIL = float(os.getenv("WAIT_TIMEOUT_DETAIL", "10"))  # Chờ panel chi tiết cửa hàng
+STORE_DELAY = float(os.getenv("STORE_DELAY", "0"))  # Delay thêm giữa các cửa hàng để tránh bị chặn (0 = không delay)
+LIST_STREAMING = os.getenv("LIST_STREAMING", "false").lower() in ("1", "true", "yes")  # Xử lý cửa hàng ngay trong lúc scroll danh sách
+FAST_PATH_REQUIRED_FIELDS = [f.strip() for f in os.getenv("FAST_PATH_REQUIRED_FIELDS", "").split(",") if f.strip()]  # Đủ các field này từ trang kết quả thì bỏ qua trang chi tiết (rỗng = luôn mở chi tiết). Bật là chấp nhận mất website, plus code và địa chỉ đầy đủ
+
+# Fetcher Configuration - cách tải trang cho từng giai đoạn: selenium (browser) hoặc http (không cần browser)
+LIST_FETCHER = os.getenv("LIST_FETCHER", "selenium").lower()  # Trang kết quả tìm kiếm
+DETAIL_FETCHER = os.getenv("DETAIL_FETCHER", "selenium").lower()  # Trang chi tiết cửa hàng
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", str(max(MAX_WORKERS, 4))))  # Số kết nối keep-alive mỗi host
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))  # Timeout mỗi request HTTP (giây)
+HTTP_USE_PROXY = os.getenv("HTTP_USE_PROXY", "true").lower() in ("1", "true", "yes")  # Đi qua proxy khi fetch bằng HTTP
+
+# Pipeline Configuration - batch crawl theo stage (search → list → detail → parse → persist) nối bằng queue giới hạn
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "false").lower() in ("1", "true", "yes")  # Bật pipeline thay cho mỗi luồng chạy trọn một job
+PIPELINE_SEARCH_WORKERS = int(os.getenv("PIPELINE_SEARCH_WORKERS", str(MAX_WORKERS)))  # Số luồng mở trang tìm kiếm + scroll (mỗi luồng một browser)
+PIPELINE_LIST_WORKERS = int(os.getenv("PIPELINE_LIST_WORKERS", "1"))  # Số luồng parse danh sách kết quả
+PIPELINE_DETAIL_WORKERS = int(os.getenv("PIPELINE_DETAIL_WORKERS", str(MAX_WORKERS)))  # Số luồng tải trang chi tiết (mỗi luồng một browser nếu DETAIL_FETCHER=selenium)
+PIPELINE_PARSE_WORKERS = int(os.getenv("PIPELINE_PARSE_WORKERS", "1"))  # Số luồng parse trang chi tiết
+PIPELINE_PERSIST_WORKERS = int(os.getenv("PIPELINE_PERSIST_WORKERS", "1"))  # Số luồng ghi database
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "50"))  # Kích thước tối đa queue vào mỗi stage (backpressure)
+PIPELINE_MONITOR_INTERVAL = float(os.getenv("PIPELINE_MONITOR_INTERVAL", "10"))  # Chu kỳ log độ sâu queue (giây, 0 = tắt)
+
+# Parse Configuration
+PARSE_PROCESSES = int(os.getenv("PARSE_PROCESSES", "0"))  # Số process parse HTML song song (0 = parse ngay trong luồng hiện tại)
+
+# Database Write Configuration - group commit nhiều cửa hàng trong một transaction
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", "50"))  # Flush khi gom đủ số dòng này
+DB_WRITE_FLUSH_MS = int(os.getenv("DB_WRITE_FLUSH_MS", "200"))  # Hoặc khi dòng đầu tiên đã chờ quá số ms này
+
+# Phone Normalization
+PHONE_DEFAULT_COUNTRY_CODE = os.getenv("PHONE_DEFAULT_COUNTRY_CODE", "84")  # Mã quốc gia cho số nội địa bắt đầu bằng 0 khi chuẩn hóa
+
+# Membership Filter - nạp sẵn cửa hàng đã có trong database để nhận ra cửa hàng trùng không cần hỏi database
+MEMBERSHIP_FILTER = os.getenv("MEMBERSHIP_FILTER", "bloom").lower()  # bloom (ít RAM, cần xác nhận khi trùng) | set (chính xác) | off
+MEMBERSHIP_FP_RATE = float(os.getenv("MEMBERSHIP_FP_RATE", "0.001"))  # Tỉ lệ false positive mục tiêu của Bloom filter
+PRECHECK_KNOWN_STORES = os.getenv("PRECHECK_KNOWN_STORES", "true").lower() in ("1", "true", "yes")  # Lọc cửa hàng đã có (theo place key) cho cả danh sách trước khi load trang chi tiết
+
+# Detail Cache - cache chi tiết cửa hàng trên đĩa (SQLite), dùng lại giữa các lần chạy
+DETAIL_CACHE_PATH = os.getenv("DETAIL_CACHE_PATH", "cache/detail_cache.sqlite3")  # Đường dẫn file cache (rỗng = chỉ trong RAM)
+DETAIL_CACHE_TTL = int(os.getenv("DETAIL_CACHE_TTL", str(7 * 24 * 3600)))  # Thời gian sống của một entry (giây, 0 = không hết hạn)
+DETAIL_CACHE_MAX_ENTRIES = int(os.getenv("DETAIL_CACHE_MAX_ENTRIES", "200000"))  # Số cửa hàng tối đa, vượt quá thì xóa theo LRU (0 = không giới hạn)
+
+# Incremental Recrawl - chỉ scrape lại chi tiết cửa hàng đã có khi quá hạn (batch_crawler.py --incremental)
+REFRESH_TTL = int(os.getenv("REFRESH_TTL", str(30 * 24 * 3600)))  # Thời gian sống chi tiết cửa hàng (giây) kể từ lần scrape thành công gần nhất - một mốc cho mọi field
+
+# Checkpoint - lưu tiến độ batch crawl theo session để chạy tiếp bằng --resume <session>
+CHECKPOINT_FLUSH_STORES = int(os.getenv("CHECKPOINT_FLUSH_STORES", "20"))  # Ghi tiến độ xuống database sau mỗi số cửa hàng này
+
+# Job Planner - gộp job trùng / gần trùng trong list_jobs.txt và xếp job nhiều cửa hàng mới lên trước
+JOB_PLANNER = os.getenv("JOB_PLANNER", "true").lower() in ("1", "true", "yes")  # Tắt để chạy đúng thứ tự và nội dung file
+
+# Geo Tiling - tìm theo viewport từng tile (@lat,lng,zoom), chia tư tile chạm trần ~120 kết quả (batch_crawler.py --tiled)
+GEO_TILING = os.getenv("GEO_TILING", "false").lower() in ("1", "true", "yes")  # Job có location là thành phố đã biết khung tọa độ chạy theo tile (location bbox:... luôn chạy theo tile)
+GEO_SATURATION = int(os.getenv("GEO_SATURATION", "100"))  # Số kết quả coi như chạm trần danh sách, tile cần chia nhỏ
+GEO_MAX_DEPTH = int(os.getenv("GEO_MAX_DEPTH", "4"))  # Độ sâu chia tư tối đa
+GEO_MAX_TILES = int(os.getenv("GEO_MAX_TILES", "64"))  # Số tile tìm kiếm tối đa mỗi job
+GEO_MAX_SCROLLS = int(os.getenv("GEO_MAX_SCROLLS", "25"))  # Số lần scroll tối đa mỗi tile (đủ để tới ~120 kết quả)
@@ -3,29 +3,62 @@
 Database handler cho Google Maps Crawler
 """
 
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
+import re
+import hashlib
 import logging
-import threading
-from config import DATABASE_URL, DB_MAX_OPEN_CONNS, DB_MAX_IDLE_CONNS, DB_CONN_MAX_LIFETIME
+from db_pool import ConnectionPool
+from place_key import canonical_place_key
+from config import PHONE_DEFAULT_COUNTRY_CODE
 
 logger = logging.getLogger(__name__)
 
+INVALID_PHONES = ['Not Found', 'Error', '']
+
+def normalize_phone(phone, default_country_code=PHONE_DEFAULT_COUNTRY_CODE):
+    """
+    Chuẩn hóa số điện thoại để so trùng: '090 123 4567', '+84 90 123 4567', '0084901234567' -> '+84901234567'
+    Trả về None nếu không phải số điện thoại hợp lệ
+    """
+    if not phone or phone in INVALID_PHONES:
+        return None
+    digits = re.sub(r'\D', '', phone)
+    if phone.strip().startswith('+'):
+        pass
+    elif digits.startswith('00'):
+        digits = digits[2:]  # Tiền tố quốc tế 00
+    elif digits.startswith('0'):
+        digits = default_country_code + digits[1:]  # Số nội địa
+    if not 8 <= len(digits) <= 15:
+        return None
+    return '+' + digits
+
+CONTENT_FIELDS = ['nama', 'phone', 'address', 'website', 'plus_code']
+
+def content_hash(store):
+    """Hash nội dung chi tiết của cửa hàng - không đổi nghĩa là lần scrape lại chỉ cần cập nhật thời điểm"""
+    payload = '\x1f'.join(str(store.get(field, '')) for field in CONTENT_FIELDS)
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
 class DatabaseHandler:
-    """Handler để kết nối và thao tác với PostgreSQL database - Thread Safe"""
+    """Handler để kết nối và thao tác với PostgreSQL database - Thread Safe
+    
+    Mỗi thao tác mượn connection riêng từ ConnectionPool, không dùng chung cursor giữa các luồng
+    """
     
     def __init__(self):
-        self.connection = None
-        self.lock = threading.Lock()  # Thread lock cho thread safety
+        self.pool = None
         self.connect()
         self.create_tables()
     
     def connect(self):
-        """Kết nối đến database"""
+        """Tạo connection pool và kiểm tra kết nối đến database"""
         try:
-            self.connection = psycopg2.connect(DATABASE_URL, connect_timeout=10)
-            self.connection.autocommit = False  # Đảm bảo autocommit = False
-            logger.info("✅ Kết nối database thành công")
+            self.pool = ConnectionPool()
+            # Mượn thử một connection để báo lỗi cấu hình ngay lúc khởi động
+            self.pool.release(self.pool.acquire())
+            logger.info(f"✅ Kết nối database thành công (pool tối đa {self.pool.max_open} connection, "
+                        f"giữ {self.pool.max_idle} idle)")
         except Exception as e:
             logger.error(f"❌ Lỗi kết nối database: {e}")
             raise
@@ -34,283 +67,633 @@ class DatabaseHandler:
         """Tạo bảng nếu chưa tồn tại"""
         try:
             logger.info("🔧 Đang tạo bảng stores...")
-            cursor = self.connection.cursor()
-            
-            # Tạo bảng stores
-            create_table_sql = """
-            CREATE TABLE IF NOT EXISTS stores (
-                id VARCHAR(255) PRIMARY KEY,
-                name VARCHAR(500) NOT NULL,
-                rating VARCHAR(50),
-                link TEXT,
-                phone VARCHAR(100),
-                address TEXT,
-                website TEXT,
-                plus_code VARCHAR(100),
-                search_keyword TEXT,
-                search_location VARCHAR(255),
-                crawl_session VARCHAR(100),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-            """
-            
-            logger.info("🔧 Đang execute CREATE TABLE...")
-            cursor.execute(create_table_sql)
-            logger.info("✅ CREATE TABLE thành công")
-            
-            # Kiểm tra và thêm cột crawl_session nếu chưa có
-            try:
-                logger.info("🔧 Đang kiểm tra cột crawl_session...")
-                cursor.execute("ALTER TABLE stores ADD COLUMN IF NOT EXISTS crawl_session VARCHAR(100);")
-                logger.info("🔧 Đang commit...")
-                self.connection.commit()
-                logger.info("✅ Commit thành công")
-                logger.info("✅ Đã thêm cột crawl_session nếu chưa có")
-            except Exception as e:
-                logger.info(f"ℹ️ Cột crawl_session đã tồn tại hoặc lỗi: {e}")
-            
-            cursor.close()
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                
+                # Tạo bảng stores
+                create_table_sql = """
+                CREATE TABLE IF NOT EXISTS stores (
+                    id VARCHAR(255) PRIMARY KEY,
+                    name VARCHAR(500) NOT NULL,
+                    rating VARCHAR(50),
+                    link TEXT,
+                    phone VARCHAR(100),
+                    address TEXT,
+                    website TEXT,
+                    plus_code VARCHAR(100),
+                    search_keyword TEXT,
+                    search_location VARCHAR(255),
+                    crawl_session VARCHAR(100),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                """
+                
+                logger.info("🔧 Đang execute CREATE TABLE...")
+                cursor.execute(create_table_sql)
+                logger.info("✅ CREATE TABLE thành công")
+                
+                # Kiểm tra và thêm cột crawl_session nếu chưa có
+                try:
+                    logger.info("🔧 Đang kiểm tra cột crawl_session...")
+                    cursor.execute("ALTER TABLE stores ADD COLUMN IF NOT EXISTS crawl_session VARCHAR(100);")
+                    logger.info("🔧 Đang commit...")
+                    connection.commit()
+                    logger.info("✅ Commit thành công")
+                    logger.info("✅ Đã thêm cột crawl_session nếu chưa có")
+                except Exception as e:
+                    logger.info(f"ℹ️ Cột crawl_session đã tồn tại hoặc lỗi: {e}")
+                
+                # Migration chạy một lần (backfill dữ liệu cũ) được ghi lại theo tên, không quét lại bảng mỗi lần khởi động
+                cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    name VARCHAR(100) PRIMARY KEY,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                """)
+                connection.commit()
+                
+                # Migration: số điện thoại chuẩn hóa + unique index để lọc trùng ngay trong câu INSERT
+                logger.info("🔧 Đang kiểm tra cột phone_normalized...")
+                cursor.execute("ALTER TABLE stores ADD COLUMN IF NOT EXISTS phone_normalized VARCHAR(32);")
+                cursor.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS stores_phone_normalized_key
+                ON stores (phone_normalized) WHERE phone_normalized IS NOT NULL;
+                """)
+                connection.commit()
+                self._run_once(connection, 'backfill_phone_normalized', self._backfill_phone_normalized)
+                
+                # Migration: place key (CID / định danh ổn định của địa điểm) + unique index
+                logger.info("🔧 Đang kiểm tra cột place_key...")
+                cursor.execute("ALTER TABLE stores ADD COLUMN IF NOT EXISTS place_key VARCHAR(64);")
+                cursor.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS stores_place_key_key
+                ON stores (place_key) WHERE place_key IS NOT NULL;
+                """)
+                connection.commit()
+                self._run_once(connection, 'backfill_place_key', self._backfill_place_key)
+                
+                # Migration: thời điểm scrape thành công gần nhất + hash nội dung cho chế độ incremental
+                logger.info("🔧 Đang kiểm tra cột last_scraped_at, content_hash...")
+                cursor.execute("ALTER TABLE stores ADD COLUMN IF NOT EXISTS last_scraped_at TIMESTAMP;")
+                cursor.execute("ALTER TABLE stores ADD COLUMN IF NOT EXISTS content_hash VARCHAR(32);")
+                connection.commit()
+                # Dòng cũ lấy thời điểm ghi gần nhất, dòng mới mặc định thời điểm insert
+                self._run_once(connection, 'backfill_last_scraped_at', self._backfill_last_scraped_at)
+                
+                # Checkpoint batch crawl: trạng thái job + cửa hàng đã xử lý theo crawl session (--resume)
+                logger.info("🔧 Đang tạo bảng crawl_jobs, crawl_progress...")
+                cursor.execute("""
+                CREATE TABLE IF NOT EXISTS crawl_jobs (
+                    crawl_session VARCHAR(100) NOT NULL,
+                    job_key TEXT NOT NULL,
+                    job_id INTEGER,
+                    keyword TEXT,
+                    location VARCHAR(255),
+                    max_stores INTEGER,
+                    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+                    stores_found INTEGER DEFAULT 0,
+                    new_stores INTEGER DEFAULT 0,
+                    duplicate_stores INTEGER DEFAULT 0,
+                    error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (crawl_session, job_key)
+                );
+                """)
+                cursor.execute("""
+                CREATE TABLE IF NOT EXISTS crawl_progress (
+                    crawl_session VARCHAR(100) NOT NULL,
+                    job_key TEXT NOT NULL,
+                    place_key TEXT NOT NULL,
+                    processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (crawl_session, job_key, place_key)
+                );
+                """)
+                connection.commit()
+                
+                cursor.close()
             
             logger.info("✅ Bảng stores đã được tạo/kiểm tra")
-            
+        
         except Exception as e:
             logger.error(f"❌ Lỗi tạo bảng: {e}")
             raise
     
+    def _run_once(self, connection, name, migrate):
+        """Chạy migrate(connection) nếu migration chưa được ghi trong schema_migrations, rồi ghi lại"""
+        cursor = connection.cursor()
+        cursor.execute("SELECT 1 FROM schema_migrations WHERE name = %s", (name,))
+        if cursor.fetchone() is None:
+            migrate(connection)
+            cursor.execute("INSERT INTO schema_migrations (name) VALUES (%s) ON CONFLICT (name) DO NOTHING", (name,))
+            connection.commit()
+        cursor.close()
+    
+    def _backfill_last_scraped_at(self, connection):
+        cursor = connection.cursor()
+        cursor.execute("UPDATE stores SET last_scraped_at = COALESCE(updated_at, created_at) WHERE last_scraped_at IS NULL;")
+        cursor.execute("ALTER TABLE stores ALTER COLUMN last_scraped_at SET DEFAULT CURRENT_TIMESTAMP;")
+        cursor.close()
+        connection.commit()
+    
+    def _backfill_phone_normalized(self, connection, batch_size=1000):
+        """
+        Điền phone_normalized cho dòng cũ, mỗi số chỉ giữ cho dòng đầu tiên (created_at, id)
+        Dòng trùng số với dòng trước giữ phone_normalized NULL (không xóa dữ liệu) - chạy một lần qua _run_once
+        """
+        reader = connection.cursor(name='phone_backfill')  # Server-side cursor, không load cả bảng vào RAM
+        reader.itersize = batch_size
+        reader.execute("""
+        SELECT id, phone FROM stores
+        WHERE phone_normalized IS NULL AND phone IS NOT NULL AND phone NOT IN ('Not Found', 'Error', '')
+        ORDER BY created_at, id
+        """)
+        
+        writer = connection.cursor()
+        updated = 0
+        while True:
+            rows = reader.fetchmany(batch_size)
+            if not rows:
+                break
+            # Trong một lượt chỉ giữ dòng đầu tiên của mỗi số, so với dòng đã có số bằng unique index
+            values = {}
+            for store_id, phone in rows:
+                normalized = normalize_phone(phone)
+                if normalized and normalized not in values:
+                    values[normalized] = store_id
+            if not values:
+                continue
+            execute_values(writer, """
+            UPDATE stores s SET phone_normalized = v.phone_normalized
+            FROM (VALUES %s) AS v(id, phone_normalized)
+            WHERE s.id = v.id
+              AND NOT EXISTS (SELECT 1 FROM stores t WHERE t.phone_normalized = v.phone_normalized)
+            """, [(store_id, normalized) for normalized, store_id in values.items()], page_size=batch_size)
+            updated += writer.rowcount if writer.rowcount > 0 else 0
+        reader.close()
+        writer.close()
+        connection.commit()
+        if updated:
+            logger.info(f"✅ Đã chuẩn hóa số điện thoại cho {updated} cửa hàng cũ")
+    
+    def _backfill_place_key(self, connection, batch_size=1000):
+        """
+        Điền place_key từ link cho dòng cũ, mỗi địa điểm chỉ giữ cho dòng đầu tiên (created_at, id)
+        Dòng trùng địa điểm với dòng trước giữ place_key NULL (không xóa dữ liệu) - chạy một lần qua _run_once
+        """
+        reader = connection.cursor(name='place_key_backfill')
+        reader.itersize = batch_size
+        reader.execute("""
+        SELECT id, link FROM stores
+        WHERE place_key IS NULL AND link IS NOT NULL AND link <> 'Link Not Found'
+        ORDER BY created_at, id
+        """)
+        
+        writer = connection.cursor()
+        updated = 0
+        while True:
+            rows = reader.fetchmany(batch_size)
+            if not rows:
+                break
+            values = {}
+            for store_id, link in rows:
+                place_key = canonical_place_key(link)
+                if place_key and place_key not in values:
+                    values[place_key] = store_id
+            if not values:
+                continue
+            execute_values(writer, """
+            UPDATE stores s SET place_key = v.place_key
+            FROM (VALUES %s) AS v(id, place_key)
+            WHERE s.id = v.id
+              AND NOT EXISTS (SELECT 1 FROM stores t WHERE t.place_key = v.place_key)
+            """, [(store_id, place_key) for place_key, store_id in values.items()], page_size=batch_size)
+            updated += writer.rowcount if writer.rowcount > 0 else 0
+        reader.close()
+        writer.close()
+        connection.commit()
+        if updated:
+            logger.info(f"✅ Đã tạo place key cho {updated} cửa hàng cũ")
+    
     def store_exists(self, store_id):
         """Kiểm tra cửa hàng đã tồn tại chưa - Thread Safe"""
         try:
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT id FROM stores WHERE id = %s", (store_id,))
-            exists = cursor.fetchone() is not None
-            cursor.close()
-            return exists
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute("SELECT id FROM stores WHERE id = %s", (store_id,))
+                exists = cursor.fetchone() is not None
+                cursor.close()
+                return exists
         except Exception as e:
             logger.error(f"❌ Lỗi kiểm tra cửa hàng: {e}")
             return False
     
     def phone_exists(self, phone):
-        """Kiểm tra số điện thoại đã tồn tại chưa - Thread Safe với timeout"""
-        if not phone or phone in ['Not Found', 'Error', '']:
+        """Kiểm tra số điện thoại đã tồn tại chưa (so theo số chuẩn hóa, dùng unique index) - Thread Safe"""
+        if not normalize_phone(phone):
             return False
-            
-        # Không cần lock riêng cho read operation đơn giản
+        
         try:
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT id FROM stores WHERE phone = %s", (phone,))
-            exists = cursor.fetchone() is not None
-            cursor.close()
-            return exists
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                exists = self._phone_exists(cursor, phone)
+                cursor.close()
+                return exists
         except Exception as e:
             logger.error(f"❌ Lỗi kiểm tra số điện thoại: {e}")
             return False
     
+    @staticmethod
+    def _phone_exists(cursor, phone):
+        cursor.execute("SELECT id FROM stores WHERE phone_normalized = %s", (normalize_phone(phone),))
+        return cursor.fetchone() is not None
+    
     def get_store_by_phone(self, phone):
         """Lấy thông tin cửa hàng theo số điện thoại"""
         try:
-            if not phone or phone in ['Not Found', 'Error', '']:
+            if not normalize_phone(phone):
                 return None
-                
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT * FROM stores WHERE phone = %s", (phone,))
-            result = cursor.fetchone()
-            cursor.close()
             
-            if result:
-                return {
-                    'id': result[0],
-                    'name': result[1],
-                    'rating': result[2],
-                    'link': result[3],
-                    'phone': result[4],
-                    'address': result[5],
-                    'website': result[6],
-                    'plus_code': result[7],
-                    'search_keyword': result[8],
-                    'search_location': result[9],
-                    'crawl_session': result[10]
-                }
-            return None
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                store = self._get_store_by_phone(cursor, phone)
+                cursor.close()
+                return store
         except Exception as e:
             logger.error(f"❌ Lỗi lấy thông tin cửa hàng theo phone: {e}")
             return None
     
-    def insert_store(self, store_data):
-        """Thêm cửa hàng vào database (chỉ lọc theo số điện thoại) - Thread Safe với timeout"""
-        import time
+    @staticmethod
+    def _get_store_by_phone(cursor, phone):
+        cursor.execute("SELECT * FROM stores WHERE phone_normalized = %s", (normalize_phone(phone),))
+        result = cursor.fetchone()
         
-        # Thử acquire lock với timeout để tránh deadlock
-        lock_acquired = self.lock.acquire(timeout=10)  # 10 giây timeout
+        if result:
+            return {
+                'id': result[0],
+                'name': result[1],
+                'rating': result[2],
+                'link': result[3],
+                'phone': result[4],
+                'address': result[5],
+                'website': result[6],
+                'plus_code': result[7],
+                'search_keyword': result[8],
+                'search_location': result[9],
+                'crawl_session': result[10]
+            }
+        return None
+    
+    def insert_store(self, store_data):
+        """
+        Thêm cửa hàng vào database, lọc trùng theo số điện thoại chuẩn hóa - Thread Safe
+        Một câu INSERT ... ON CONFLICT DO NOTHING RETURNING: unique index quyết định trùng, không cần lock
+        """
+        # Chỉ lưu cửa hàng có số điện thoại hợp lệ
+        if not normalize_phone(store_data.get('phone', '')):
+            logger.info(f"⏭️ Bỏ qua cửa hàng không có số điện thoại: {store_data.get('nama', 'Unknown')}")
+            return False  # Không lưu cửa hàng không có số điện thoại
         
-        if not lock_acquired:
-            logger.error("❌ Không thể acquire database lock sau 10s - có thể deadlock!")
-            return False
-            
         try:
-            logger.info(f"🔒 Đã acquire database lock cho: {store_data.get('nama', 'Unknown')}")
-            
-            # Kiểm tra connection
-            if self.connection.closed:
-                logger.warning("🔄 Database connection bị đóng, reconnect...")
-                self.connect()
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                try:
+                    cursor.execute(f"""
+                    INSERT INTO stores ({self.INSERT_COLUMNS})
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT DO NOTHING
+                    RETURNING id
+                    """, self._store_values(store_data))
+                    inserted = cursor.fetchone() is not None
+                    connection.commit()
+                finally:
+                    cursor.close()
             
-            # Chỉ lưu cửa hàng có số điện thoại hợp lệ
-            phone = store_data.get('phone', '')
-            if not phone or phone in ['Not Found', 'Error', '']:
-                logger.info(f"⏭️ Bỏ qua cửa hàng không có số điện thoại: {store_data.get('nama', 'Unknown')}")
-                return False  # Không lưu cửa hàng không có số điện thoại
-            
-            # Kiểm tra trùng lặp theo số điện thoại
-            logger.info(f"🔍 Kiểm tra phone exists: {phone}")
-            if self.phone_exists(phone):
-                existing_store = self.get_store_by_phone(phone)
-                logger.info(f"📞 Số điện thoại đã tồn tại: {phone} - {existing_store['name'] if existing_store else 'Unknown'}")
+            if not inserted:
+                logger.info(f"📞 Số điện thoại đã tồn tại: {store_data['phone']} - {store_data['nama'][:30]}")
                 return False  # Không lưu để tránh trùng lặp
             
-            # Tạo ID mới để tránh conflict
-            import hashlib
-            import random
-            original_id = store_data['id']
-            unique_id = f"{original_id}_{int(time.time() * 1000)}_{random.randint(1000, 9999)}"
-            store_data['id'] = unique_id
-            
-            logger.info(f"🔄 Chuẩn bị insert với ID: {unique_id}")
-            
-            cursor = self.connection.cursor()
-            
-            # Sử dụng UPSERT để tránh lỗi duplicate key
-            insert_sql = """
-            INSERT INTO stores (id, name, rating, link, phone, address, website, plus_code, search_keyword, search_location, crawl_session)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (id) DO UPDATE SET
-                name = EXCLUDED.name,
-                rating = EXCLUDED.rating,
-                link = EXCLUDED.link,
-                phone = EXCLUDED.phone,
-                address = EXCLUDED.address,
-                website = EXCLUDED.website,
-                plus_code = EXCLUDED.plus_code,
-                search_keyword = EXCLUDED.search_keyword,
-                search_location = EXCLUDED.search_location,
-                crawl_session = EXCLUDED.crawl_session,
-                updated_at = CURRENT_TIMESTAMP
-            """
-            
-            cursor.execute(insert_sql, (
-                store_data['id'],
-                store_data['nama'],
-                store_data['rating'],
-                store_data['link'],
-                store_data['phone'],
-                store_data['address'],
-                store_data['website'],
-                store_data['plus_code'],
-                store_data.get('search_keyword', ''),
-                store_data.get('search_location', ''),
-                store_data.get('crawl_session', '')
-            ))
-            
-            logger.info(f"🔄 Đã execute SQL insert cho: {store_data['nama']}")
-            
-            self.connection.commit()
-            logger.info(f"🔄 Đã commit transaction")
-            
-            cursor.close()
-            
-            logger.info(f"✅ Đã lưu cửa hàng mới: {store_data['nama'][:30]}... (ID: {unique_id})")
+            logger.info(f"✅ Đã lưu cửa hàng mới: {store_data['nama'][:30]}... (ID: {store_data['id']})")
             return True
-            
+        
         except Exception as e:
+            # Pool tự rollback khi connection được trả về
             logger.error(f"❌ Lỗi lưu cửa hàng: {e}")
             logger.error(f"   Store data: {store_data}")
+            return False
+    
+    INSERT_COLUMNS = ("id, name, rating, link, phone, address, website, plus_code, "
+                      "search_keyword, search_location, crawl_session, content_hash, phone_normalized, place_key")
+    
+    @staticmethod
+    def _store_values(store):
+        """Tuple giá trị theo thứ tự INSERT_COLUMNS của bảng stores"""
+        return (
+            store['id'],
+            store['nama'],
+            store['rating'],
+            store['link'],
+            store['phone'],
+            store['address'],
+            store['website'],
+            store['plus_code'],
+            store.get('search_keyword', ''),
+            store.get('search_location', ''),
+            store.get('crawl_session', ''),
+            content_hash(store),
+            normalize_phone(store.get('phone', '')),
+            store.get('place_key') or canonical_place_key(store['link'])
+        )
+    
+    def insert_stores_grouped(self, stores_data):
+        """
+        Group commit: lưu nhiều cửa hàng (từ nhiều luồng) trong một transaction
+        Một câu INSERT nhiều dòng ... ON CONFLICT DO NOTHING RETURNING, lọc trùng bằng unique index
+        số điện thoại chuẩn hóa và place key
+        Trả về kết quả từng dòng theo thứ tự: 'new' | 'duplicate' | 'skipped' (không có số điện thoại)
+        """
+        outcomes = [None] * len(stores_data)
+        candidates = {}  # {id: index dòng đầu tiên}, mỗi số điện thoại/place key/id chỉ một dòng trong nhóm
+        seen_phones = set()
+        seen_keys = set()
+        for index, store in enumerate(stores_data):
+            phone = normalize_phone(store.get('phone', ''))
+            place_key = store.get('place_key') or canonical_place_key(store['link'])
+            if not phone:
+                outcomes[index] = 'skipped'
+            elif phone in seen_phones or place_key in seen_keys or store['id'] in candidates:
+                outcomes[index] = 'duplicate'  # Trùng trong cùng nhóm
+            else:
+                seen_phones.add(phone)
+                if place_key:
+                    seen_keys.add(place_key)
+                candidates[store['id']] = index
+        
+        if not candidates:
+            return outcomes
+        
+        with self.pool.connection() as connection:
+            cursor = connection.cursor()
             try:
-                self.connection.rollback()  # Rollback transaction khi có lỗi
-            except:
-                pass
-            try:
+                inserted = execute_values(cursor, f"""
+                INSERT INTO stores ({self.INSERT_COLUMNS})
+                VALUES %s
+                ON CONFLICT DO NOTHING
+                RETURNING id
+                """, [self._store_values(stores_data[index]) for index in candidates.values()],
+                    page_size=len(candidates), fetch=True)
+                connection.commit()
+            finally:
+                cursor.close()
+        
+        inserted_ids = {row[0] for row in inserted}
+        for store_id, index in candidates.items():
+            outcomes[index] = 'new' if store_id in inserted_ids else 'duplicate'
+        logger.info(f"✅ Group commit: {len(inserted_ids)} mới / {len(stores_data)} cửa hàng")
+        return outcomes
+    
+    def iter_known_store_keys(self, batch_size=10000):
+        """Yield (place_key, phone_normalized) của mọi cửa hàng - server-side cursor, không load cả bảng vào RAM"""
+        with self.pool.connection() as connection:
+            cursor = connection.cursor(name='known_store_keys')
+            cursor.itersize = batch_size
+            cursor.execute("SELECT place_key, phone_normalized FROM stores")
+            for row in cursor:
+                yield row
+            cursor.close()
+    
+    def store_is_known(self, place_key, phone_normalized):
+        """Cửa hàng đã có trong database (trùng place key hoặc số điện thoại chuẩn hóa) chưa"""
+        try:
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute(
+                    "SELECT 1 FROM stores WHERE place_key = %s OR phone_normalized = %s LIMIT 1",
+                    (place_key, phone_normalized)
+                )
+                exists = cursor.fetchone() is not None
                 cursor.close()
-            except:
-                pass
+                return exists
+        except Exception as e:
+            logger.error(f"❌ Lỗi kiểm tra cửa hàng: {e}")
             return False
-        finally:
-            # Luôn release lock trong finally
-            try:
-                self.lock.release()
-                logger.info(f"🔓 Đã release database lock cho: {store_data.get('nama', 'Unknown')}")
-            except:
-                pass
     
-    def insert_stores_batch(self, stores_data, search_keyword="", search_location=""):
-        """Thêm nhiều cửa hàng cùng lúc"""
+    def find_known_place_keys(self, place_keys):
+        """Trong danh sách place key, những key nào đã có trong database - một câu query cho cả danh sách"""
+        if not place_keys:
+            return set()
         try:
-            cursor = self.connection.cursor()
-            
-            insert_sql = """
-            INSERT INTO stores (id, name, rating, link, phone, address, website, plus_code, search_keyword, search_location)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (id) DO UPDATE SET
-                name = EXCLUDED.name,
-                rating = EXCLUDED.rating,
-                link = EXCLUDED.link,
-                phone = EXCLUDED.phone,
-                address = EXCLUDED.address,
-                website = EXCLUDED.website,
-                plus_code = EXCLUDED.plus_code,
-                search_keyword = EXCLUDED.search_keyword,
-                search_location = EXCLUDED.search_location,
-                updated_at = CURRENT_TIMESTAMP
-            """
-            
-            # Chuẩn bị dữ liệu
-            data_to_insert = []
-            for store in stores_data:
-                data_to_insert.append((
-                    store['id'],
-                    store['nama'],
-                    store['rating'],
-                    store['link'],
-                    store['phone'],
-                    store['address'],
-                    store['website'],
-                    store['plus_code'],
-                    search_keyword,
-                    search_location
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute("SELECT place_key FROM stores WHERE place_key = ANY(%s)", (list(place_keys),))
+                known = {row[0] for row in cursor.fetchall()}
+                cursor.close()
+                return known
+        except Exception as e:
+            logger.error(f"❌ Lỗi kiểm tra danh sách place key: {e}")
+            return set()
+    
+    def get_place_key_freshness(self, place_keys):
+        """
+        {place_key: (số giây từ lần scrape thành công gần nhất, content_hash)} của các place key đã có
+        Một câu query cho cả danh sách (chế độ incremental), tuổi tính bằng đồng hồ của database
+        """
+        if not place_keys:
+            return {}
+        try:
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute("""
+                SELECT place_key, EXTRACT(EPOCH FROM (LOCALTIMESTAMP - last_scraped_at)), content_hash
+                FROM stores WHERE place_key = ANY(%s)
+                """, (list(place_keys),))
+                freshness = {
+                    place_key: (float(age) if age is not None else None, previous_hash)
+                    for place_key, age, previous_hash in cursor.fetchall()
+                }
+                cursor.close()
+                return freshness
+        except Exception as e:
+            logger.error(f"❌ Lỗi lấy thời điểm scrape của danh sách place key: {e}")
+            return {}
+    
+    def refresh_store(self, store_data, previous_hash):
+        """
+        Cập nhật cửa hàng đã có (theo place key) sau khi scrape lại chi tiết
+        Nội dung không đổi: chỉ cập nhật last_scraped_at. Đổi: cập nhật các field + content_hash
+        Field không tìm thấy lần này ('Not Found') giữ giá trị cũ, số điện thoại mới đã thuộc cửa hàng khác thì giữ số cũ
+        Trả về 'refreshed' | 'unchanged', None nếu lỗi
+        """
+        new_hash = content_hash(store_data)
+        try:
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                if new_hash == previous_hash:
+                    cursor.execute(
+                        "UPDATE stores SET last_scraped_at = CURRENT_TIMESTAMP WHERE place_key = %s",
+                        (store_data['place_key'],)
+                    )
+                    outcome = 'unchanged'
+                else:
+                    phone_normalized = normalize_phone(store_data.get('phone', ''))
+                    found = {
+                        field: None if store_data.get(field) in ('Not Found', 'Error', '') else store_data[field]
+                        for field in ('address', 'website', 'plus_code')
+                    }
+                    cursor.execute("""
+                    UPDATE stores s SET
+                        name = %(name)s,
+                        rating = %(rating)s,
+                        link = %(link)s,
+                        address = COALESCE(%(address)s, s.address),
+                        website = COALESCE(%(website)s, s.website),
+                        plus_code = COALESCE(%(plus_code)s, s.plus_code),
+                        crawl_session = %(crawl_session)s,
+                        content_hash = %(content_hash)s,
+                        phone = CASE WHEN t.taken OR %(phone_normalized)s IS NULL THEN s.phone ELSE %(phone)s END,
+                        phone_normalized = COALESCE(CASE WHEN t.taken THEN NULL ELSE %(phone_normalized)s END, s.phone_normalized),
+                        last_scraped_at = CURRENT_TIMESTAMP,
+                        updated_at = CURRENT_TIMESTAMP
+                    FROM (
+                        SELECT EXISTS (
+                            SELECT 1 FROM stores WHERE phone_normalized = %(phone_normalized)s AND place_key <> %(place_key)s
+                        ) AS taken
+                    ) t
+                    WHERE s.place_key = %(place_key)s
+                    """, {
+                        'name': store_data['nama'],
+                        'rating': store_data['rating'],
+                        'link': store_data['link'],
+                        'address': found['address'],
+                        'website': found['website'],
+                        'plus_code': found['plus_code'],
+                        'crawl_session': store_data.get('crawl_session', ''),
+                        'content_hash': new_hash,
+                        'phone': store_data['phone'],
+                        'phone_normalized': phone_normalized,
+                        'place_key': store_data['place_key']
+                    })
+                    outcome = 'refreshed'
+                connection.commit()
+                cursor.close()
+            return outcome
+        except Exception as e:
+            logger.error(f"❌ Lỗi cập nhật cửa hàng: {e}")
+            logger.error(f"   Store data: {store_data}")
+            return None
+    
+    def save_crawl_jobs(self, crawl_session, jobs):
+        """Ghi danh sách job của một crawl session (job đã có giữ nguyên trạng thái) - Thread Safe"""
+        if not jobs:
+            return
+        with self.pool.connection() as connection:
+            cursor = connection.cursor()
+            execute_values(cursor, """
+            INSERT INTO crawl_jobs (crawl_session, job_key, job_id, keyword, location, max_stores)
+            VALUES %s
+            ON CONFLICT (crawl_session, job_key) DO UPDATE SET job_id = EXCLUDED.job_id
+            """, [
+                (crawl_session, job['job_key'], job['id'], job['keyword'], job['location'], job['max_stores'])
+                for job in jobs
+            ], page_size=500)
+            connection.commit()
+            cursor.close()
+    
+    def update_crawl_job(self, crawl_session, job):
+        """Cập nhật trạng thái + kết quả một job trong crawl session - Thread Safe"""
+        try:
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute("""
+                UPDATE crawl_jobs SET
+                    status = %s, stores_found = %s, new_stores = %s, duplicate_stores = %s,
+                    error = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE crawl_session = %s AND job_key = %s
+                """, (
+                    job['status'], job.get('stores_found', 0), job.get('new_stores', 0),
+                    job.get('duplicate_stores', 0), job.get('error'), crawl_session, job['job_key']
                 ))
-            
-            cursor.executemany(insert_sql, data_to_insert)
-            self.connection.commit()
+                connection.commit()
+                cursor.close()
+        except Exception as e:
+            logger.error(f"❌ Lỗi lưu trạng thái job {job['id']}: {e}")
+    
+    def insert_crawl_progress(self, crawl_session, entries):
+        """Ghi các cửa hàng đã xử lý xong [(job_key, place_key)] - một câu INSERT nhiều dòng"""
+        if not entries:
+            return
+        with self.pool.connection() as connection:
+            cursor = connection.cursor()
+            execute_values(cursor, """
+            INSERT INTO crawl_progress (crawl_session, job_key, place_key)
+            VALUES %s
+            ON CONFLICT DO NOTHING
+            """, [(crawl_session, job_key, place_key) for job_key, place_key in entries], page_size=500)
+            connection.commit()
             cursor.close()
-            
-            logger.info(f"✅ Đã lưu {len(stores_data)} cửa hàng vào database")
-            return True
-            
+    
+    def load_crawl_session(self, crawl_session):
+        """
+        Trạng thái đã lưu của một crawl session: ({job_key: status}, {job_key: set(place_key đã xử lý)})
+        Session không tồn tại trả về ({}, {})
+        """
+        with self.pool.connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT job_key, status FROM crawl_jobs WHERE crawl_session = %s", (crawl_session,))
+            statuses = dict(cursor.fetchall())
+            cursor.execute("SELECT job_key, place_key FROM crawl_progress WHERE crawl_session = %s", (crawl_session,))
+            progress = {}
+            for job_key, place_key in cursor.fetchall():
+                progress.setdefault(job_key, set()).add(place_key)
+            cursor.close()
+        return statuses, progress
+    
+    def get_job_history(self):
+        """
+        Kết quả lần chạy hoàn thành gần nhất của mỗi (keyword, location) trong crawl_jobs
+        [(keyword, location, stores_found, new_stores)] - dùng để ước lượng độ mới của job
+        """
+        try:
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute("""
+                SELECT DISTINCT ON (lower(keyword), lower(location))
+                    keyword, location, stores_found, new_stores
+                FROM crawl_jobs
+                WHERE status = 'completed' AND stores_found > 0
+                ORDER BY lower(keyword), lower(location), updated_at DESC
+                """)
+                history = cursor.fetchall()
+                cursor.close()
+                return history
         except Exception as e:
-            logger.error(f"❌ Lỗi lưu batch cửa hàng: {e}")
-            return False
+            logger.error(f"❌ Lỗi lấy lịch sử job: {e}")
+            return []
     
     def get_stores_by_search(self, search_keyword="", search_location=""):
         """Lấy danh sách cửa hàng theo từ khóa tìm kiếm"""
         try:
-            cursor = self.connection.cursor(cursor_factory=RealDictCursor)
-            
-            if search_keyword and search_location:
-                sql = """
-                SELECT * FROM stores 
-                WHERE search_keyword ILIKE %s AND search_location ILIKE %s
-                ORDER BY created_at DESC
-                """
-                cursor.execute(sql, (f"%{search_keyword}%", f"%{search_location}%"))
-            else:
-                sql = "SELECT * FROM stores ORDER BY created_at DESC LIMIT 100"
-                cursor.execute(sql)
-            
-            results = cursor.fetchall()
-            cursor.close()
+            with self.pool.connection() as connection:
+                cursor = connection.cursor(cursor_factory=RealDictCursor)
+                
+                if search_keyword and search_location:
+                    sql = """
+                    SELECT * FROM stores
+                    WHERE search_keyword ILIKE %s AND search_location ILIKE %s
+                    ORDER BY created_at DESC
+                    """
+                    cursor.execute(sql, (f"%{search_keyword}%", f"%{search_location}%"))
+                else:
+                    sql = "SELECT * FROM stores ORDER BY created_at DESC LIMIT 100"
+                    cursor.execute(sql)
+                
+                results = cursor.fetchall()
+                cursor.close()
             
             logger.info(f"✅ Lấy được {len(results)} cửa hàng từ database")
             return results
-            
+        
         except Exception as e:
             logger.error(f"❌ Lỗi lấy dữ liệu: {e}")
             return []
@@ -318,17 +701,18 @@ class DatabaseHandler:
     def get_store_count(self):
         """Đếm tổng số cửa hàng trong database"""
         try:
-            cursor = self.connection.cursor()
-            cursor.execute("SELECT COUNT(*) FROM stores")
-            count = cursor.fetchone()[0]
-            cursor.close()
-            return count
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute("SELECT COUNT(*) FROM stores")
+                count = cursor.fetchone()[0]
+                cursor.close()
+                return count
         except Exception as e:
             logger.error(f"❌ Lỗi đếm cửa hàng: {e}")
             return 0
     
     def close(self):
-        """Đóng kết nối database"""
-        if self.connection:
-            self.connection.close()
+        """Đóng các connection trong pool"""
+        if self.pool:
+            self.pool.close()
             logger.info("🔚 Đã đóng kết nối database")
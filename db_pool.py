@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Connection pool cho Google Maps Crawler
+Pool kết nối PostgreSQL theo DB_MAX_OPEN_CONNS / DB_MAX_IDLE_CONNS / DB_CONN_MAX_LIFETIME:
+mỗi thao tác mượn một connection riêng, kiểm tra sức khỏe connection idle lâu,
+thay connection quá tuổi và thống kê thời gian chờ pool
+"""
+
+import time
+import logging
+import threading
+from contextlib import contextmanager
+import psycopg2
+from config import DATABASE_URL, DB_MAX_OPEN_CONNS, DB_MAX_IDLE_CONNS, DB_CONN_MAX_LIFETIME
+from config import DB_POOL_TIMEOUT, DB_HEALTH_CHECK_IDLE
+
+logger = logging.getLogger(__name__)
+
+class ConnectionPool:
+    """Pool connection psycopg2 - Thread Safe
+
+    max_open: tổng số connection tối đa (đang dùng + idle), hết thì chờ
+    max_idle: số connection idle giữ lại, thừa thì đóng khi trả về
+    max_lifetime: tuổi tối đa của connection (giây, 0 = không giới hạn)
+    """
+
+    def __init__(self, dsn=DATABASE_URL, max_open=DB_MAX_OPEN_CONNS, max_idle=DB_MAX_IDLE_CONNS,
+                 max_lifetime=DB_CONN_MAX_LIFETIME, timeout=DB_POOL_TIMEOUT, health_check_idle=DB_HEALTH_CHECK_IDLE):
+        self.dsn = dsn
+        self.max_open = max(1, max_open)
+        self.max_idle = max(0, min(max_idle, self.max_open))
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.health_check_idle = health_check_idle
+        self.idle = []  # [(connection, thời điểm trả về pool)], lấy từ cuối (LIFO)
+        self.created_at = {}  # {connection: thời điểm tạo}
+        self.open_count = 0
+        self.condition = threading.Condition()
+        self.closed = False
+        self.stats = {
+            'acquired': 0,
+            'created': 0,
+            'recycled': 0,  # Đóng do quá tuổi hoặc thừa idle
+            'broken': 0,  # Đóng do lỗi / health check fail
+            'waits': 0,
+            'wait_time': 0.0,
+            'max_wait': 0.0,
+            'timeouts': 0
+        }
+
+    def _connect(self):
+        connection = psycopg2.connect(self.dsn, connect_timeout=10)
+        connection.autocommit = False
+        return connection
+
+    def _expired(self, connection, now):
+        return self.max_lifetime > 0 and now - self.created_at.get(connection, now) >= self.max_lifetime
+
+    def _healthy(self, connection, idle_since, now):
+        """Connection còn dùng được: chưa đóng, và ping được nếu đã idle lâu"""
+        if connection.closed:
+            return False
+        if now - idle_since < self.health_check_idle:
+            return True
+        try:
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            connection.rollback()
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Connection database không phản hồi, bỏ đi: {e}")
+            return False
+
+    def _discard(self, connection, stat):
+        """Đóng connection và giải phóng chỗ trong pool (gọi khi đang giữ condition)"""
+        try:
+            connection.close()
+        except:
+            pass
+        self.created_at.pop(connection, None)
+        self.open_count -= 1
+        self.stats[stat] += 1
+        self.condition.notify()
+
+    def acquire(self, timeout=None):
+        """Mượn một connection, chờ tối đa timeout giây nếu pool đã đủ max_open"""
+        timeout = self.timeout if timeout is None else timeout
+        started_at = time.monotonic()
+        waited = False
+
+        while True:
+            candidate = None
+            with self.condition:
+                while True:
+                    if self.closed:
+                        raise Exception("❌ Connection pool đã đóng")
+                    if self.idle:
+                        candidate = self.idle.pop()
+                        break
+                    if self.open_count < self.max_open:
+                        # Giữ chỗ trước, kết nối ngoài lock để luồng khác không phải chờ
+                        self.open_count += 1
+                        break
+
+                    remaining = timeout - (time.monotonic() - started_at)
+                    if remaining <= 0:
+                        self.stats['timeouts'] += 1
+                        raise Exception(f"❌ Hết thời gian chờ connection database sau {timeout}s "
+                                        f"({self.open_count}/{self.max_open} đang mở)")
+                    waited = True
+                    self.condition.wait(remaining)
+
+            if candidate is None:
+                break
+
+            # Kiểm tra tuổi + sức khỏe ngoài lock (ping có thể mất thời gian)
+            connection, idle_since = candidate
+            now = time.monotonic()
+            if self._expired(connection, now):
+                with self.condition:
+                    self._discard(connection, 'recycled')
+            elif not self._healthy(connection, idle_since, now):
+                with self.condition:
+                    self._discard(connection, 'broken')
+            else:
+                with self.condition:
+                    self._record_acquire(started_at, waited)
+                return connection
+
+        try:
+            connection = self._connect()
+        except Exception:
+            with self.condition:
+                self.open_count -= 1
+                self.condition.notify()
+            raise
+
+        with self.condition:
+            self.created_at[connection] = time.monotonic()
+            self.stats['created'] += 1
+            self._record_acquire(started_at, waited)
+        return connection
+
+    def _record_acquire(self, started_at, waited):
+        self.stats['acquired'] += 1
+        if waited:
+            wait_time = time.monotonic() - started_at
+            self.stats['waits'] += 1
+            self.stats['wait_time'] += wait_time
+            self.stats['max_wait'] = max(self.stats['max_wait'], wait_time)
+
+    def release(self, connection, broken=False):
+        """Trả connection về pool; connection lỗi, quá tuổi hoặc thừa idle sẽ bị đóng"""
+        if not broken and not connection.closed:
+            try:
+                connection.rollback()  # Không để transaction dở dang cho lần mượn sau
+            except Exception:
+                broken = True
+
+        with self.condition:
+            now = time.monotonic()
+            if broken or connection.closed:
+                self._discard(connection, 'broken')
+            elif self.closed or self._expired(connection, now) or len(self.idle) >= self.max_idle:
+                self._discard(connection, 'recycled')
+            else:
+                self.idle.append((connection, now))
+                self.condition.notify()
+
+    @contextmanager
+    def connection(self):
+        """Mượn connection cho một thao tác: with pool.connection() as conn: ..."""
+        connection = self.acquire()
+        broken = False
+        try:
+            yield connection
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.release(connection, broken=broken)
+
+    def close(self):
+        """Đóng mọi connection idle, connection đang dùng sẽ bị đóng khi trả về"""
+        with self.condition:
+            self.closed = True
+            while self.idle:
+                connection, _ = self.idle.pop()
+                self._discard(connection, 'recycled')
+            self.condition.notify_all()
+
+    def summary(self):
+        with self.condition:
+            return dict(self.stats, open=self.open_count, idle=len(self.idle),
+                        avg_wait=self.stats['wait_time'] / self.stats['waits'] if self.stats['waits'] else 0.0)
+
+    def print_summary(self):
+        stats = self.summary()
+        print(f"🔌 DB pool: {stats['acquired']} lần mượn, {stats['created']} connection tạo mới, "
+              f"{stats['recycled']} thay mới, {stats['broken']} lỗi, {stats['waits']} lần chờ "
+              f"(TB {stats['avg_wait'] * 1000:.0f} ms, max {stats['max_wait'] * 1000:.0f} ms), {stats['timeouts']} timeout")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Batch writer cho Google Maps Crawler
+Gom cửa hàng từ mọi luồng crawler, flush mỗi N dòng hoặc T ms bằng một câu INSERT
+nhiều dòng trong một transaction (group commit), trả kết quả từng dòng qua Future
+"""
+
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from config import DB_WRITE_BATCH_SIZE, DB_WRITE_FLUSH_MS
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()  # Sentinel báo writer dừng
+
+class BatchWriter:
+    """Writer nền ghi cửa hàng theo nhóm - Thread Safe
+
+    submit(store_data) trả về Future với kết quả 'new' | 'duplicate' | 'skipped',
+    hoặc exception nếu cả nhóm ghi lỗi
+    """
+
+    def __init__(self, db, batch_size=DB_WRITE_BATCH_SIZE, flush_interval_ms=DB_WRITE_FLUSH_MS):
+        self.db = db
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0, flush_interval_ms) / 1000
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.closed = False
+        self.stats = {
+            'batches': 0,
+            'rows': 0,
+            'new': 0,
+            'duplicate': 0,
+            'skipped': 0,
+            'errors': 0,
+            'flush_time': 0.0
+        }
+        self.thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self.thread.start()
+
+    def submit(self, store_data):
+        """Đưa cửa hàng vào nhóm chờ ghi, trả về Future"""
+        future = Future()
+        with self.lock:
+            if self.closed:
+                raise Exception("❌ Batch writer đã đóng")
+            self.queue.put((store_data, future))
+        return future
+
+    def write(self, store_data, timeout=None):
+        """Ghi một cửa hàng và chờ kết quả của nhóm chứa nó"""
+        return self.submit(store_data).result(timeout=timeout)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+
+            # Gom thêm tới khi đủ batch_size hoặc dòng đầu tiên đã chờ quá flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+
+    def _flush(self, batch):
+        stores = [store_data for store_data, _ in batch]
+        started_at = time.monotonic()
+        try:
+            outcomes = self.db.insert_stores_grouped(stores)
+        except Exception as e:
+            logger.error(f"❌ Lỗi group commit {len(batch)} cửa hàng: {e}")
+            with self.lock:
+                self.stats['errors'] += len(batch)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        with self.lock:
+            self.stats['batches'] += 1
+            self.stats['rows'] += len(batch)
+            self.stats['flush_time'] += time.monotonic() - started_at
+            for outcome in outcomes:
+                self.stats[outcome] += 1
+        for (_, future), outcome in zip(batch, outcomes):
+            future.set_result(outcome)
+
+    def close(self):
+        """Flush các dòng còn chờ và dừng writer"""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.queue.put(_STOP)
+        self.thread.join()
+
+    def print_summary(self):
+        with self.lock:
+            stats = dict(self.stats)
+        avg_batch = stats['rows'] / stats['batches'] if stats['batches'] else 0
+        avg_flush = stats['flush_time'] / stats['batches'] * 1000 if stats['batches'] else 0
+        print(f"🗃️ Group commit: {stats['batches']} lần ghi, {stats['rows']} dòng (TB {avg_batch:.1f} dòng/lần, "
+              f"{avg_flush:.0f} ms/lần), {stats['new']} mới, {stats['duplicate']} trùng, "
+              f"{stats['skipped']} bỏ qua, {stats['errors']} lỗi")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Detail cache cho Google Maps Crawler
+Cache chi tiết cửa hàng (phone/address/website/plus code) trên đĩa bằng SQLite:
+giữ qua các lần chạy, hết hạn theo TTL, giới hạn số entry bằng LRU
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from config import DETAIL_CACHE_PATH, DETAIL_CACHE_TTL, DETAIL_CACHE_MAX_ENTRIES
+
+logger = logging.getLogger(__name__)
+
+class DetailCache:
+    """Cache chi tiết cửa hàng theo key (link cửa hàng) - Thread Safe
+
+    ttl: số giây một entry còn hiệu lực (0 = không hết hạn)
+    max_entries: số entry tối đa, vượt quá thì xóa entry lâu không dùng nhất (0 = không giới hạn)
+    """
+
+    def __init__(self, path=DETAIL_CACHE_PATH, ttl=DETAIL_CACHE_TTL, max_entries=DETAIL_CACHE_MAX_ENTRIES):
+        self.path = path or ':memory:'
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'writes': 0, 'evictions': 0}
+
+        if self.path != ':memory:' and os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Một connection dùng chung, mọi truy cập đi qua self.lock
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("""
+        CREATE TABLE IF NOT EXISTS detail_cache (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS detail_cache_accessed_at ON detail_cache (accessed_at)")
+        self.connection.commit()
+        self.entries = self.connection.execute("SELECT COUNT(*) FROM detail_cache").fetchone()[0]
+
+        self.purge_expired()
+        logger.info(f"💾 Detail cache: {self.entries} entry tại {self.path} (TTL {self.ttl}s, tối đa {self.max_entries})")
+
+    def _expired(self, created_at, now):
+        return self.ttl > 0 and now - created_at >= self.ttl
+
+    def get(self, key):
+        """Lấy chi tiết đã cache, None nếu không có hoặc đã hết hạn"""
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value, created_at FROM detail_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            value, created_at = row
+            if self._expired(created_at, now):
+                self.connection.execute("DELETE FROM detail_cache WHERE key = ?", (key,))
+                self.connection.commit()
+                self.entries -= 1
+                self.stats['expired'] += 1
+                self.stats['misses'] += 1
+                return None
+            # Cập nhật thời điểm dùng gần nhất cho LRU
+            self.connection.execute("UPDATE detail_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.connection.commit()
+            self.stats['hits'] += 1
+        return json.loads(value)
+
+    def put(self, key, value):
+        """Lưu chi tiết vào cache, xóa entry lâu không dùng nhất nếu vượt max_entries"""
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False)
+        with self.lock:
+            existed = self.connection.execute("SELECT 1 FROM detail_cache WHERE key = ?", (key,)).fetchone()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO detail_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, now, now)
+            )
+            if not existed:
+                self.entries += 1
+            self.stats['writes'] += 1
+
+            if self.max_entries > 0 and self.entries > self.max_entries:
+                evict = self.entries - self.max_entries
+                self.connection.execute("""
+                DELETE FROM detail_cache WHERE key IN (
+                    SELECT key FROM detail_cache ORDER BY accessed_at LIMIT ?
+                )
+                """, (evict,))
+                self.entries -= evict
+                self.stats['evictions'] += evict
+            self.connection.commit()
+
+    def purge_expired(self):
+        """Xóa toàn bộ entry đã hết hạn"""
+        if self.ttl <= 0:
+            return 0
+        with self.lock:
+            deleted = self.connection.execute(
+                "DELETE FROM detail_cache WHERE created_at <= ?", (time.time() - self.ttl,)
+            ).rowcount
+            self.connection.commit()
+            self.entries -= deleted
+            self.stats['expired'] += deleted
+        return deleted
+
+    def size(self):
+        with self.lock:
+            return self.entries
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    def print_summary(self):
+        with self.lock:
+            stats = dict(self.stats, size=self.entries)
+        lookups = stats['hits'] + stats['misses']
+        hit_rate = stats['hits'] / lookups if lookups else 0.0
+        print(f"📊 Detail cache: {stats['size']} cửa hàng, {stats['hits']} hit / {stats['misses']} miss "
+              f"({hit_rate:.1%}), {stats['expired']} hết hạn, {stats['evictions']} bị xóa (LRU), {stats['writes']} lần ghi")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Detail parser cho Google Maps Crawler
+Trích xuất phone/address/website/plus code từ trang chi tiết trong một lượt duyệt:
+ưu tiên thuộc tính có cấu trúc của Google (data-item-id), fallback regex trên text
+"""
+
+import re
+import logging
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import html as lxml_html
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+logger = logging.getLogger(__name__)
+
+# Class của các phần tử text trong panel chi tiết dùng cho fallback regex
+TEXT_CLASSES = ('Io6YTe', 'fontBodyMedium', 'fontBodySmall')
+MAX_TEXT_LENGTH = 200
+
+class FieldRule:
+    """Luật trích xuất một field: thuộc tính data-item-id có cấu trúc + regex fallback
+
+    item_id_prefix: data-item-id bắt đầu bằng chuỗi này (ví dụ 'phone:tel:', 'address')
+    source: lấy giá trị từ 'text' (text hiển thị), 'href' hoặc 'item_id' (phần sau prefix)
+    fallback_patterns: regex (biên dịch một lần) áp lên text khi không có thuộc tính có cấu trúc
+    fallback_filter: hàm cấp module (không dùng lambda) - luật được pickle sang process của parse pool
+    """
+
+    def __init__(self, field, item_id_prefix=None, source='text', fallback_patterns=None, fallback_filter=None):
+        self.field = field
+        self.item_id_prefix = item_id_prefix
+        self.source = source
+        self.fallback_patterns = [re.compile(pattern) for pattern in (fallback_patterns or [])]
+        self.fallback_filter = fallback_filter
+
+    def match_item_id(self, item_id):
+        return bool(self.item_id_prefix) and item_id.startswith(self.item_id_prefix)
+
+    def structured_value(self, item_id, text, href):
+        if self.source == 'href':
+            return href
+        if self.source == 'item_id':
+            return item_id[len(self.item_id_prefix):] or None
+        # Text hiển thị, không có thì lấy phần sau prefix (ví dụ 'phone:tel:0901234567')
+        return text or item_id[len(self.item_id_prefix):] or None
+
+    def fallback_value(self, text):
+        if self.fallback_filter and not self.fallback_filter(text):
+            return None
+        for pattern in self.fallback_patterns:
+            if pattern.search(text):
+                return text
+        return None
+
+ADDRESS_KEYWORDS = re.compile(
+    r'(Đường|Phường|Quận|Huyện|Xã|Thị trấn|Thành phố|TP\.?\s|Tp\.?\s|P\.\s?\d|Q\.\s?\d|Hẻm|Ngõ|Ngách|Street|Road|Avenue|Jl\.)'
+)
+
+def _looks_like_phone(text):
+    return 5 < len(text) < 25
+
+def _looks_like_plus_code(text):
+    return len(text) < 60
+
+def _looks_like_address(text):
+    return (20 < len(text) < MAX_TEXT_LENGTH and ',' in text and
+            not text.startswith(('Phone', 'Website', 'Hours', 'Reviews', 'Rating', 'Điện thoại', 'Trang web', 'Giờ')))
+
+FIELD_RULES = [
+    FieldRule('phone', 'phone:tel:', fallback_patterns=[
+        r'^(?:\+84|0)\d{1,3}[\s.\-]?\d{3,4}[\s.\-]?\d{3,4}$',  # 090 123 4567, +84 90 123 4567
+        r'\+\d{1,3}[\s\-]?\d{1,4}[\s\-]?\d{1,4}[\s\-]?\d{1,4}',  # +62 123 456 789
+        r'^\d{3,4}[\s\-]?\d{3,4}[\s\-]?\d{3,4}$',  # 123 456 789
+        r'\(\d{3,4}\)[\s\-]?\d{3,4}[\s\-]?\d{3,4}',  # (123) 456 789
+    ], fallback_filter=_looks_like_phone),
+    FieldRule('address', 'address', fallback_patterns=[ADDRESS_KEYWORDS.pattern],
+              fallback_filter=_looks_like_address),
+    FieldRule('website', 'authority', source='href'),
+    FieldRule('plus_code', 'oloc', fallback_patterns=[
+        r'^[23456789CFGHJMPQRVWX]{4,8}\+[23456789CFGHJMPQRVWX]{2,3}\b',  # QJ7X+2V Quận 1
+    ], fallback_filter=_looks_like_plus_code),
+]
+
+def register_field_rule(rule, replace=True):
+    """
+    Thêm luật trích xuất (hoặc thay luật cùng field), áp dụng cho cả process
+    Process con của parse pool nhận luật qua pickle (pool được tạo lại khi luật đổi) nên luật phải pickle được
+    """
+    if replace:
+        FIELD_RULES[:] = [existing for existing in FIELD_RULES if existing.field != rule.field]
+    FIELD_RULES.append(rule)
+
+def _iter_elements(html):
+    """Yield (data-item-id, class, text_getter, href) của mọi phần tử trong một lượt duyệt"""
+    if HAS_LXML:
+        root = lxml_html.fromstring(html)
+        for elem in root.iter():
+            if not isinstance(elem.tag, str):
+                continue  # comment, processing instruction
+            yield elem.get('data-item-id'), elem.get('class') or '', elem.text_content, elem.get('href')
+    else:
+        for elem in BeautifulSoup(html, 'html.parser').find_all(True):
+            css_class = elem.get('class') or []
+            yield elem.get('data-item-id'), ' '.join(css_class), elem.get_text, elem.get('href')
+
+def _item_text(get_text):
+    """Text hiển thị của nút data-item-id (bỏ icon font và khoảng trắng thừa)"""
+    text = ' '.join(get_text().split())
+    # Bỏ ký tự icon (Private Use Area) Google chèn vào đầu nút
+    return ''.join(char for char in text if not '\ue000' <= char <= '\uf8ff').strip()
+
+def extract_store_details(html, rules=None):
+    """Trích xuất thông tin chi tiết cửa hàng trong một lượt duyệt HTML"""
+    rules = FIELD_RULES if rules is None else rules
+    structured = {}
+    fallback = {}
+
+    for item_id, css_class, get_text, href in _iter_elements(html):
+        if item_id:
+            for rule in rules:
+                if rule.field not in structured and rule.match_item_id(item_id):
+                    value = rule.structured_value(item_id, _item_text(get_text), href)
+                    if value:
+                        structured[rule.field] = value
+                    break
+            continue
+
+        if not any(cls in css_class for cls in TEXT_CLASSES):
+            continue
+
+        pending = [rule for rule in rules
+                   if rule.fallback_patterns and rule.field not in structured and rule.field not in fallback]
+        if not pending:
+            continue
+
+        text = get_text().strip()
+        if not text or len(text) >= MAX_TEXT_LENGTH:
+            continue
+        for rule in pending:
+            value = rule.fallback_value(text)
+            if value:
+                fallback[rule.field] = value
+
+    details = {}
+    for rule in rules:
+        value = structured.get(rule.field) or fallback.get(rule.field)
+        details[rule.field] = value or 'Not Found'
+        if value:
+            source = 'data-item-id' if rule.field in structured else 'regex'
+            logger.info(f"🔎 Tìm thấy {rule.field} ({source}): {value}")
+
+    return details
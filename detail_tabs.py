@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Multi-tab detail scraper cho Google Maps Crawler
+Load song song nhiều trang chi tiết trong một browser bằng nhiều tab
+"""
+
+import time
+import logging
+from collections import deque
+from run_program import parse_store_details
+from resource_blocker import apply_resource_blocking
+from waits import wait_stats, DETAIL_READY_JS
+from config import DETAIL_TABS, WAIT_TIMEOUT_DETAIL
+
+logger = logging.getLogger(__name__)
+
+# Đánh dấu document cũ trước khi điều hướng: document mới load xong sẽ không còn cờ này
+START_NAVIGATION_JS = """
+window.__detailPending = true;
+var target = arguments[0];
+window.setTimeout(function () { window.location.href = target; }, 0);
+"""
+
+# Tab sẵn sàng khi document mới đã thay document cũ và panel chi tiết đã render
+PAGE_READY_JS = """
+if (window.__detailPending || document.readyState === 'loading') return false;
+""" + DETAIL_READY_JS
+
+ERROR_DETAILS = {
+    'phone': 'Error',
+    'address': 'Error',
+    'website': 'Error',
+    'plus_code': 'Error'
+}
+
+class MultiTabDetailScraper:
+    """Giữ K tab trong một driver và pipeline việc load/parse trang chi tiết
+
+    Tab đầu tiên (trang kết quả tìm kiếm) không bị động tới, các trang chi tiết
+    được load trong các tab riêng: trong lúc parse một tab thì các tab khác vẫn đang load.
+    """
+
+    def __init__(self, driver, tabs=DETAIL_TABS, page_timeout=WAIT_TIMEOUT_DETAIL, poll_interval=0.2):
+        self.driver = driver
+        self.tabs = max(1, tabs)
+        self.page_timeout = page_timeout
+        self.poll_interval = poll_interval
+        self.origin_handle = None
+        self.tab_handles = []
+
+    def open(self):
+        """Mở K tab trống cho trang chi tiết"""
+        self.origin_handle = self.driver.current_window_handle
+        for _ in range(self.tabs):
+            self.driver.switch_to.new_window('tab')
+            # Danh sách chặn của DevTools áp dụng theo từng tab
+            apply_resource_blocking(self.driver)
+            self.tab_handles.append(self.driver.current_window_handle)
+        self.driver.switch_to.window(self.origin_handle)
+        logger.info(f"🗂️ Đã mở {len(self.tab_handles)} tab cho scrape chi tiết")
+        return self
+
+    def close(self):
+        """Đóng các tab chi tiết và quay lại tab kết quả tìm kiếm"""
+        for handle in self.tab_handles:
+            try:
+                self.driver.switch_to.window(handle)
+                self.driver.close()
+            except Exception:
+                pass
+        self.tab_handles = []
+        if self.origin_handle:
+            self.driver.switch_to.window(self.origin_handle)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _start_load(self, handle, store_link):
+        """Bắt đầu điều hướng tab tới trang chi tiết mà không chờ load xong"""
+        self.driver.switch_to.window(handle)
+        self.driver.execute_script(START_NAVIGATION_JS, store_link)
+
+    def _is_ready(self, handle):
+        self.driver.switch_to.window(handle)
+        return self.driver.execute_script(PAGE_READY_JS)
+
+    def scrape(self, store_links):
+        """
+        Generator: yield (store_link, details) theo thứ tự trang nào load xong trước
+        """
+        pending = deque(store_links)
+        active = {}  # {handle: (store_link, started_at)}
+
+        def assign(handle):
+            """Giao link tiếp theo cho tab, trả về các link mở lỗi"""
+            failed = []
+            while pending:
+                store_link = pending.popleft()
+                try:
+                    self._start_load(handle, store_link)
+                    active[handle] = (store_link, time.time())
+                    logger.info(f"🔍 Đang load chi tiết (tab {self.tab_handles.index(handle) + 1}): {store_link[:50]}...")
+                    break
+                except Exception as e:
+                    logger.warning(f"⚠️ Lỗi mở trang chi tiết: {e}")
+                    failed.append((store_link, dict(ERROR_DETAILS)))
+            return failed
+
+        for handle in self.tab_handles:
+            yield from assign(handle)
+
+        while active:
+            progressed = False
+            for handle in list(active):
+                store_link, started_at = active[handle]
+                try:
+                    ready = self._is_ready(handle)
+                    timed_out = time.time() - started_at > self.page_timeout
+                    if not ready and not timed_out:
+                        continue
+
+                    wait_stats.record('detail', time.time() - started_at, timed_out=not ready)
+                    if not ready:
+                        logger.warning(f"⏰ Trang chi tiết load quá {self.page_timeout}s, parse phần đã có: {store_link[:50]}...")
+
+                    details = parse_store_details(self.driver.page_source)
+                    logger.info(f"✅ Hoàn thành scrape chi tiết: {details}")
+                except Exception as e:
+                    logger.warning(f"⚠️ Lỗi khi scrape chi tiết: {e}")
+                    details = dict(ERROR_DETAILS)
+
+                del active[handle]
+                progressed = True
+
+                # Giao link tiếp theo cho tab vừa rảnh trước khi trả kết quả
+                failed = assign(handle)
+                yield store_link, details
+                yield from failed
+
+            if not progressed:
+                time.sleep(self.poll_interval)
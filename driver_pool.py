@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Driver Pool cho Google Maps Crawler
+Giữ sẵn N Chrome driver và tái sử dụng giữa các job
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from function import opened_link_chroome, resolve_chromedriver_path
+from fetchers import load_search_page
+
+logger = logging.getLogger(__name__)
+
+class DriverPool:
+    """Pool Chrome driver dùng chung giữa các job - Thread Safe
+
+    Driver chỉ được khởi tạo lại khi bị lỗi, các job khác nhau chỉ cần
+    điều hướng driver có sẵn tới URL tìm kiếm mới.
+    """
+
+    def __init__(self, size=1):
+        self.size = max(1, size)
+        self.idle_drivers = deque()
+        self.created_count = 0  # Số driver đang sống (idle + đang dùng)
+        self.lock = threading.Lock()
+        # Báo cho luồng đang chờ khi có driver được trả về hoặc chỗ trống (driver lỗi bị đóng)
+        self.condition = threading.Condition(self.lock)
+        self.closed = False
+        self.stats = {
+            'launched': 0,
+            'reused': 0,
+            'discarded': 0
+        }
+
+    def _launch_driver(self):
+        """Khởi tạo driver mới - thử không proxy trước, lỗi thì dùng proxy"""
+        try:
+            logger.info("🔄 Thử khởi tạo driver không proxy trước...")
+            driver = opened_link_chroome(None, use_proxy=False)
+        except Exception as driver_error:
+            logger.warning(f"⚠️ Lỗi khởi tạo driver không proxy: {driver_error}")
+            logger.info("🔄 Thử khởi tạo driver với proxy...")
+            driver = opened_link_chroome(None, use_proxy=True)
+
+        with self.lock:
+            self.stats['launched'] += 1
+        return driver
+
+    def _reserve_slot(self):
+        """Giữ chỗ cho một driver mới nếu pool chưa đầy"""
+        with self.lock:
+            if self.created_count < self.size:
+                self.created_count += 1
+                return True
+            return False
+
+    def _release_slot(self):
+        with self.condition:
+            self.created_count -= 1
+            self.condition.notify()
+
+    def warm_up(self):
+        """Khởi tạo trước các driver để job đầu tiên không phải chờ"""
+        # Resolve chromedriver lúc khởi động thay vì trong từng lần tạo driver
+        resolve_chromedriver_path()
+        
+        logger.info(f"🔥 Đang khởi tạo {self.size} driver cho pool...")
+        while self._reserve_slot():
+            try:
+                driver = self._launch_driver()
+                with self.condition:
+                    self.idle_drivers.append(driver)
+                    self.condition.notify()
+            except Exception as e:
+                self._release_slot()
+                logger.error(f"❌ Lỗi khởi tạo driver cho pool: {e}")
+                break
+        logger.info(f"✅ Driver pool sẵn sàng: {len(self.idle_drivers)}/{self.size} driver")
+
+    def acquire(self, url_search, timeout=None):
+        """
+        Lấy driver từ pool và điều hướng tới URL tìm kiếm (None: driver trống, chỉ dùng cho trang chi tiết)
+        Pool đã đầy thì chờ tới khi có driver được trả về hoặc chỗ trống (tối đa timeout giây, None = chờ mãi)
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        driver = None
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise Exception("❌ Driver pool đã đóng")
+                if self.idle_drivers:
+                    driver = self.idle_drivers.popleft()
+                    reused = True
+                    break
+                if self.created_count < self.size:
+                    # Giữ chỗ, khởi tạo driver ngoài lock
+                    self.created_count += 1
+                    reused = False
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise Exception(f"❌ Hết thời gian chờ driver sau {timeout}s")
+                self.condition.wait(remaining)
+
+        if driver is None:
+            try:
+                driver = self._launch_driver()
+            except Exception:
+                self._release_slot()
+                raise
+
+        try:
+            load_search_page(driver, url_search)
+        except Exception as e:
+            # Driver hỏng - bỏ đi và khởi tạo lại một lần
+            logger.warning(f"⚠️ Driver lỗi khi mở URL, khởi tạo lại: {e}")
+            self._discard(driver)
+            if not self._reserve_slot():
+                raise
+            try:
+                driver = self._launch_driver()
+            except Exception:
+                self._release_slot()
+                raise
+            try:
+                load_search_page(driver, url_search)
+            except Exception:
+                self._discard(driver)
+                raise
+            reused = False
+
+        if reused:
+            with self.lock:
+                self.stats['reused'] += 1
+        return driver
+
+    def _reset_driver(self, driver):
+        """Dọn trạng thái driver giữa các job: tab phụ, cookies, storage"""
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.delete_all_cookies()
+        driver.execute_script("try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}")
+        driver.get("about:blank")
+
+    def _discard(self, driver):
+        """Đóng driver hỏng và giải phóng chỗ trong pool"""
+        try:
+            driver.quit()
+        except:
+            pass
+        self._release_slot()
+        with self.lock:
+            self.stats['discarded'] += 1
+
+    def release(self, driver, broken=False):
+        """Trả driver về pool, driver lỗi sẽ bị đóng để khởi tạo lại sau"""
+        if driver is None:
+            return
+
+        if not broken and not self.closed:
+            try:
+                self._reset_driver(driver)
+                with self.condition:
+                    if not self.closed:
+                        self.idle_drivers.append(driver)
+                        self.condition.notify()
+                        return
+            except Exception as e:
+                logger.warning(f"⚠️ Lỗi reset driver, bỏ driver này: {e}")
+
+        self._discard(driver)
+
+    def close(self):
+        """Đóng tất cả driver đang rảnh trong pool"""
+        with self.condition:
+            self.closed = True
+            drivers = list(self.idle_drivers)
+            self.idle_drivers.clear()
+            self.condition.notify_all()
+        closed_count = 0
+        for driver in drivers:
+            try:
+                driver.quit()
+            except:
+                pass
+            self._release_slot()
+            closed_count += 1
+        logger.info(f"🔚 Đã đóng {closed_count} driver trong pool "
+                    f"(khởi tạo: {self.stats['launched']}, tái sử dụng: {self.stats['reused']}, lỗi: {self.stats['discarded']})")
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Fetcher cho Google Maps Crawler
+Interface chung để tải HTML một trang và danh sách kết quả tìm kiếm:
+Selenium (render JS, scroll được danh sách) hoặc HTTP thuần (không cần browser)
+"""
+
+import logging
+import threading
+import requests
+from abc import ABC, abstractmethod
+from urllib.parse import quote
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from proxy_manager import proxy_manager
+from list_parser import parse_card_html
+from place_key import canonical_place_key, store_id_for
+from parse_pool import parse_pool
+from waits import wait_until, wait_stats, detail_panel_ready, search_results_ready
+from config import HTTP_POOL_SIZE, HTTP_TIMEOUT, HTTP_USE_PROXY, WAIT_TIMEOUT_SCROLL
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+def load_search_page(driver, url_search):
+    """Điều hướng driver đã mở tới URL tìm kiếm và chờ trang load (url_search=None: giữ trang trống)"""
+    if not url_search:
+        return
+    logger.info(f"🌐 Đang mở URL: {url_search}")
+    driver.get(url_search)
+    
+    # Chờ tới khi có feed kết quả (hoặc trang cửa hàng) thay vì sleep cố định
+    if not wait_until(driver, 'search', search_results_ready):
+        logger.warning("⚠️ Trang kết quả chưa sẵn sàng sau thời gian chờ, vẫn tiếp tục")
+    
+    # Debug: Kiểm tra title và URL
+    try:
+        title = driver.title
+        current_url = driver.current_url
+        logger.info(f"📄 Page title: {title}")
+        logger.info(f"🔗 Current URL: {current_url}")
+        
+        # Kiểm tra xem có bị chặn không
+        if "blocked" in title.lower() or "access denied" in title.lower() or "captcha" in title.lower():
+            logger.warning("⚠️ Có thể bị chặn bởi Google Maps")
+    except Exception as debug_error:
+        logger.warning(f"⚠️ Lỗi debug: {debug_error}")
+
+# Các selectors mới cho Google Maps hiện tại
+STORE_SELECTORS = [
+    "a.hfpxzc",  # Link cửa hàng chính
+    "a[aria-label*='·']",  # Cửa hàng có dấu ·
+    "div[role='main'] a[jsaction]",  # Link trong main area
+    "div[data-value] a[href*='/place/']",  # Link đến place
+    "a[jslog*='track:click']",  # Có jslog track click
+    "div[class*='Nv2PK'] a",  # Link trong container Nv2PK
+    "div[class*='Q2HXcd'] a",  # Link trong container Q2HXcd
+    "a[href*='/maps/place/']",  # Link trực tiếp đến place
+    "div[class*='THOPZb'] a",  # Link trong container THOPZb
+    "div[class*='VkpGBb'] a",  # Link trong container VkpGBb
+    "a[data-value]",  # Link có data-value
+    "div[jsaction] a",  # Link trong div có jsaction
+]
+
+# Scroll + chờ + đếm kết quả trong một lần gọi script (1 round trip WebDriver mỗi bước)
+# arguments: selector, số pixel scroll, số kết quả trước đó, timeout (ms), có lấy HTML card mới không, callback
+SCROLL_PROBE_JS = """
+var selector = arguments[0], scrollBy = arguments[1], previousCount = arguments[2],
+    timeoutMs = arguments[3], collectCards = arguments[4], done = arguments[arguments.length - 1];
+var started = Date.now();
+
+function snapshot() {
+    var elements = document.querySelectorAll(selector);
+    var seen = {}, hrefs = [];
+    for (var i = 0; i < elements.length; i++) {
+        var href = elements[i].href;
+        if (href && href.indexOf('/maps/place/') !== -1 && !seen[href]) {
+            seen[href] = true;
+            hrefs.push(href);
+        }
+    }
+    return {
+        count: elements.length,
+        hrefs: hrefs,
+        end_reached: !!document.querySelector('span.HlvSq'),
+        waited_ms: Date.now() - started
+    };
+}
+
+function scrollContainer() {
+    var feed = document.querySelector("div[role='feed']");
+    if (feed) return feed;
+    var elements = document.querySelectorAll(selector);
+    var node = elements.length ? elements[elements.length - 1].parentElement : null;
+    while (node && node !== document.body) {
+        if (node.scrollHeight > node.clientHeight + 10) return node;
+        node = node.parentElement;
+    }
+    return null;
+}
+
+if (scrollBy > 0) {
+    var container = scrollContainer();
+    if (container) {
+        container.scrollTop = container.scrollTop + scrollBy;
+    } else {
+        window.scrollTo(0, document.body.scrollHeight);
+    }
+}
+
+// HTML của các card chưa từng trả về (nhớ trong window để không gửi lại lần sau)
+function newCards() {
+    window.__emittedCards = window.__emittedCards || {};
+    var anchors = document.querySelectorAll("a[href*='/maps/place/']");
+    var cards = [];
+    for (var i = 0; i < anchors.length; i++) {
+        var href = anchors[i].href;
+        if (!href || window.__emittedCards[href]) continue;
+        window.__emittedCards[href] = true;
+        var card = anchors[i].closest("div[class*='Nv2PK'], div[class*='Q2HXcd'], div[class*='THOPZb']") || anchors[i].parentElement;
+        cards.push({href: href, html: card.outerHTML});
+    }
+    return cards;
+}
+
+(function poll() {
+    var state = snapshot();
+    if (state.count > previousCount || state.end_reached || Date.now() - started >= timeoutMs) {
+        if (collectCards) state.cards = newCards();
+        done(state);
+    } else {
+        setTimeout(poll, 100);
+    }
+})();
+"""
+
+def probe_scroll_results(driver, scroll_by=0, previous_count=-1, timeout=0, collect_cards=False):
+    """
+    Scroll danh sách kết quả và chờ kết quả mới ngay trong browser,
+    trả về {'count', 'hrefs', 'end_reached', 'waited_ms'} sau một round trip
+    collect_cards=True: thêm 'cards' = [{'href', 'html'}] của các card chưa trả về lần nào
+    """
+    return driver.execute_async_script(
+        SCROLL_PROBE_JS, ", ".join(STORE_SELECTORS), scroll_by, previous_count, int(timeout * 1000), collect_cards
+    )
+
+def scroll_result_list(driver, max_scrolls=10):
+    """Scroll danh sách kết quả tới hết (hoặc max_scrolls lần), trả về HTML trang để parse"""
+    # Script async cần timeout dài hơn thời gian chờ mỗi bước scroll
+    driver.set_script_timeout(WAIT_TIMEOUT_SCROLL + 10)
+    
+    # Đếm kết quả ban đầu (không scroll, không chờ)
+    state = probe_scroll_results(driver)
+    logger.info(f"✅ Tìm thấy {state['count']} elements, {len(state['hrefs'])} link cửa hàng")
+    
+    scroll_count = 0
+    
+    while scroll_count < max_scrolls and not state['end_reached']:
+        try:
+            logger.info(f"📜 Scroll lần {scroll_count + 1}/{max_scrolls}")
+            
+            # Scroll, chờ kết quả mới (hoặc hết danh sách) và đếm lại trong cùng một lần gọi
+            new_state = probe_scroll_results(driver, scroll_by=1000, previous_count=state['count'], timeout=WAIT_TIMEOUT_SCROLL)
+            grew = new_state['count'] > state['count']
+            wait_stats.record('scroll', new_state['waited_ms'] / 1000, timed_out=not grew and not new_state['end_reached'])
+            
+            if grew:
+                state = new_state
+                logger.info(f"🔄 Tìm thấy thêm elements, tổng: {state['count']} ({len(state['hrefs'])} link cửa hàng)")
+            else:
+                logger.info("✅ Không có thêm elements mới, dừng scroll")
+                break
+            
+            if state['end_reached']:
+                logger.info("✅ Đã tới cuối danh sách kết quả")
+                
+            scroll_count += 1
+            
+        except Exception as e:
+            logger.warning(f"⚠️ Lỗi khi scroll: {e}")
+            break
+    
+    return driver.page_source
+
+def stream_result_list(driver, max_scrolls=10):
+    """
+    Generator: sau mỗi bước scroll yield list các cửa hàng mới xuất hiện
+    Mỗi cửa hàng chỉ được yield một lần (định danh theo place key)
+    Có thể dùng driver cho việc khác giữa các lần yield (ví dụ load chi tiết ở tab khác)
+    """
+    driver.set_script_timeout(WAIT_TIMEOUT_SCROLL + 10)
+    list_handle = driver.current_window_handle
+    seen_keys = set()
+    total = 0
+    
+    def parse_new_cards(state):
+        stores = []
+        for card in state.get('cards', []):
+            try:
+                store = parse_card_html(card['html'], total + len(stores))
+            except Exception as e:
+                logger.warning(f"⚠️ Lỗi khi parse cửa hàng: {e}")
+                continue
+            if not store:
+                continue
+            if store['link'] == "Link Not Found" and card['href']:
+                store['link'] = card['href']
+                store['place_key'] = canonical_place_key(store['link'])
+                store['id'] = store_id_for(store['place_key'])
+            key = store['place_key'] or store['link']
+            if key in seen_keys:
+                continue
+            seen_keys.add(key)
+            stores.append(store)
+        return stores
+    
+    state = probe_scroll_results(driver, collect_cards=True)
+    batch = parse_new_cards(state)
+    if batch:
+        total += len(batch)
+        logger.info(f"📦 {len(batch)} cửa hàng ban đầu")
+        yield batch
+    
+    scroll_count = 0
+    while scroll_count < max_scrolls and not state['end_reached']:
+        try:
+            logger.info(f"📜 Scroll lần {scroll_count + 1}/{max_scrolls}")
+            
+            # Consumer có thể đã chuyển sang tab khác giữa hai lần yield
+            driver.switch_to.window(list_handle)
+            new_state = probe_scroll_results(driver, scroll_by=1000, previous_count=state['count'],
+                                             timeout=WAIT_TIMEOUT_SCROLL, collect_cards=True)
+            grew = new_state['count'] > state['count']
+            wait_stats.record('scroll', new_state['waited_ms'] / 1000, timed_out=not grew and not new_state['end_reached'])
+            
+            batch = parse_new_cards(new_state)
+            if batch:
+                total += len(batch)
+                logger.info(f"📦 {len(batch)} cửa hàng mới, tổng: {total}")
+                yield batch
+            
+            if not grew:
+                logger.info("✅ Không có thêm elements mới, dừng scroll")
+                break
+            
+            state = new_state
+            scroll_count += 1
+            
+        except Exception as e:
+            logger.warning(f"⚠️ Lỗi khi scroll: {e}")
+            break
+
+class Fetcher(ABC):
+    """Interface: fetch(url) trả về HTML của trang, fetch_list / stream_list cho trang kết quả tìm kiếm"""
+
+    name = 'base'
+    renders_js = False  # True nếu HTML trả về đã chạy JavaScript (cần cho scroll danh sách)
+
+    @abstractmethod
+    def fetch(self, url):
+        pass
+
+    def fetch_list(self, url, max_scrolls=10):
+        """HTML trang kết quả tìm kiếm - mặc định tải url một lần (không scroll được, chỉ có phần kết quả đầu)"""
+        return self.fetch(url)
+
+    def stream_list(self, url, max_scrolls=10):
+        """Generator: list cửa hàng mới sau mỗi bước tải danh sách - mặc định một bước cho cả trang"""
+        yield parse_pool.parse_list(self.fetch_list(url, max_scrolls))
+
+    def close(self):
+        pass
+
+class SeleniumFetcher(Fetcher):
+    """Tải trang bằng Chrome driver có sẵn, chờ theo trạng thái trang trước khi lấy HTML"""
+
+    name = 'selenium'
+    renders_js = True
+
+    def __init__(self, driver, stage='detail', ready_condition=detail_panel_ready):
+        self.driver = driver
+        self.stage = stage
+        self.ready_condition = ready_condition
+
+    def fetch(self, url):
+        self.driver.get(url)
+        if self.ready_condition:
+            wait_until(self.driver, self.stage, self.ready_condition)
+        return self.driver.page_source
+
+    def fetch_list(self, url, max_scrolls=10):
+        """Mở url (None: dùng trang driver đang mở) rồi scroll danh sách kết quả tới hết hoặc max_scrolls lần"""
+        load_search_page(self.driver, url)
+        return scroll_result_list(self.driver, max_scrolls=max_scrolls)
+
+    def stream_list(self, url, max_scrolls=10):
+        load_search_page(self.driver, url)
+        yield from stream_result_list(self.driver, max_scrolls=max_scrolls)
+
+class HttpFetcher(Fetcher):
+    """Tải trang bằng HTTP client dùng chung connection pool (keep-alive), hỗ trợ proxy - Thread Safe"""
+
+    name = 'http'
+    renders_js = False
+
+    def __init__(self, pool_size=HTTP_POOL_SIZE, timeout=HTTP_TIMEOUT, use_proxy=HTTP_USE_PROXY):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'User-Agent': USER_AGENT,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'vi-VN,vi;q=0.9,en-US;q=0.8,en;q=0.7'
+        })
+        # Bỏ qua trang xác nhận cookie của Google
+        self.session.cookies.set('CONSENT', 'YES+', domain='.google.com')
+
+        if use_proxy:
+            proxy = proxy_manager.get_current_proxy()
+            if proxy:
+                credentials = f"{quote(proxy['username'], safe='')}:{quote(proxy['password'], safe='')}"
+                proxy_url = f"http://{credentials}@{proxy_manager.get_proxy_string(proxy)}"
+                self.session.proxies.update({'http': proxy_url, 'https': proxy_url})
+
+    def fetch(self, url):
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.text
+
+    def close(self):
+        self.session.close()
+
+_http_fetcher = None
+_http_fetcher_lock = threading.Lock()
+
+def get_http_fetcher():
+    """HttpFetcher dùng chung cho cả process (connection pool được chia sẻ giữa các luồng)"""
+    global _http_fetcher
+    with _http_fetcher_lock:
+        if _http_fetcher is None:
+            _http_fetcher = HttpFetcher()
+            logger.info("🌐 Đã khởi tạo HTTP fetcher (keep-alive pool)")
+        return _http_fetcher
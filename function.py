@@ -1,30 +1,127 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver import ActionChains
-from selenium.webdriver.common.actions.wheel_input import ScrollOrigin
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.proxy import Proxy, ProxyType
 import time
-import datetime
-import numpy as np
+import re
 import pandas as pd
-from bs4 import BeautifulSoup
 import logging
 import threading
 import os
+import glob
+import shutil
+import atexit
+import hashlib
 import zipfile
 import tempfile
-from config import PROXY_HOST, PROXY_PORT, PROXY_USERNAME, PROXY_PASSWORD, PROXY_RETRY_COUNT
+import subprocess
+from config import PROXY_HOST, PROXY_PORT, PROXY_RETRY_COUNT
+from config import CHROMEDRIVER_PATH, CHROMEDRIVER_OFFLINE
 from proxy_manager import proxy_manager
+from resource_blocker import configure_blocking_options, apply_resource_blocking
+from parse_pool import parse_pool
+from fetchers import SeleniumFetcher, load_search_page
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def create_proxy_auth_extension(proxy_auth):
+# Đường dẫn chromedriver đã resolve - dùng chung cho cả process
+_chromedriver_path = None
+_chromedriver_lock = threading.Lock()
+
+# Tên lệnh của Chrome / Chromium để đọc phiên bản trình duyệt
+CHROME_BINARIES = ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome')
+
+def _major_version(binary):
+    """Phiên bản chính từ '<binary> --version' ('Google Chrome 126.0.6478.126' -> 126), None nếu không đọc được"""
+    try:
+        output = subprocess.run([binary, '--version'], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    version = re.search(r'(\d+)\.\d+', output)
+    return int(version.group(1)) if version else None
+
+def _chrome_major_version():
+    for name in CHROME_BINARIES:
+        binary = shutil.which(name)
+        if binary:
+            version = _major_version(binary)
+            if version:
+                return version
+    return None
+
+def _find_local_chromedriver(allow_mismatch=False):
+    """
+    Tìm chromedriver có sẵn trên máy: thư mục hiện tại, PATH, cache của webdriver-manager
+    Bỏ qua bản khác phiên bản chính với Chrome (driver cũ sau khi Chrome tự cập nhật sẽ không khởi động được),
+    trừ khi allow_mismatch=True; không đọc được phiên bản Chrome thì nhận bản đầu tiên tìm thấy
+    """
+    binary_name = 'chromedriver.exe' if os.name == 'nt' else 'chromedriver'
+    
+    candidates = []
+    local_path = os.path.join(os.getcwd(), binary_name)
+    if os.path.isfile(local_path):
+        candidates.append(local_path)
+    
+    path_binary = shutil.which(binary_name)
+    if path_binary:
+        candidates.append(path_binary)
+    
+    # Bản đã tải trước đó bởi webdriver-manager (~/.wdm), mới nhất trước
+    cached = glob.glob(os.path.join(os.path.expanduser('~'), '.wdm', 'drivers', 'chromedriver', '**', binary_name), recursive=True)
+    candidates.extend(sorted(cached, key=os.path.getmtime, reverse=True))
+    
+    if not candidates:
+        return None
+    chrome_version = _chrome_major_version()
+    if chrome_version is None or allow_mismatch:
+        return candidates[0]
+    
+    for candidate in candidates:
+        driver_version = _major_version(candidate)
+        if driver_version == chrome_version:
+            return candidate
+        logger.warning(f"⚠️ Bỏ qua chromedriver {candidate} (phiên bản {driver_version}, Chrome {chrome_version})")
+    return None
+
+def resolve_chromedriver_path():
+    """
+    Resolve chromedriver một lần cho cả process:
+    CHROMEDRIVER_PATH -> chromedriver có sẵn trên máy cùng phiên bản chính với Chrome
+    -> tải bằng webdriver-manager (trừ khi offline)
+    """
+    global _chromedriver_path
+    
+    if _chromedriver_path:
+        return _chromedriver_path
+    
+    with _chromedriver_lock:
+        if _chromedriver_path:
+            return _chromedriver_path
+        
+        if CHROMEDRIVER_PATH:
+            if not os.path.isfile(CHROMEDRIVER_PATH):
+                raise Exception(f"❌ CHROMEDRIVER_PATH không tồn tại: {CHROMEDRIVER_PATH}")
+            path = CHROMEDRIVER_PATH
+            logger.info(f"📌 Dùng chromedriver từ CHROMEDRIVER_PATH: {path}")
+        else:
+            path = _find_local_chromedriver()
+            if path:
+                logger.info(f"📌 Dùng chromedriver có sẵn: {path}")
+            elif CHROMEDRIVER_OFFLINE:
+                # Không tải được bản khớp: thử bản có sẵn dù khác phiên bản Chrome
+                path = _find_local_chromedriver(allow_mismatch=True)
+                if not path:
+                    raise Exception("❌ CHROMEDRIVER_OFFLINE bật nhưng không tìm thấy chromedriver - hãy đặt CHROMEDRIVER_PATH")
+                logger.warning(f"⚠️ CHROMEDRIVER_OFFLINE: dùng chromedriver khác phiên bản Chrome: {path}")
+            else:
+                logger.info("📥 Đang tải ChromeDriver (một lần cho cả process)...")
+                path = ChromeDriverManager().install()
+        
+        _chromedriver_path = path
+        return _chromedriver_path
+
+def create_proxy_auth_extension(proxy_auth, proxy_host=PROXY_HOST, proxy_port=PROXY_PORT, pluginfile=None):
     """Tạo Chrome extension để xử lý proxy authentication"""
     if not proxy_auth:
         return None
@@ -60,8 +157,8 @@ def create_proxy_auth_extension(proxy_auth):
         rules: {{
             singleProxy: {{
                 scheme: "http",
-                host: "{PROXY_HOST}",
-                port: parseInt({PROXY_PORT})
+                host: "{proxy_host}",
+                port: parseInt({proxy_port})
             }},
             bypassList: ["localhost"]
         }}
@@ -86,7 +183,8 @@ def create_proxy_auth_extension(proxy_auth):
     """
     
     # Tạo extension zip file
-    pluginfile = os.path.join(tempfile.gettempdir(), 'proxy_auth_plugin.zip')
+    if pluginfile is None:
+        pluginfile = os.path.join(tempfile.gettempdir(), 'proxy_auth_plugin.zip')
     
     with zipfile.ZipFile(pluginfile, 'w') as zp:
         zp.writestr("manifest.json", manifest_json)
@@ -94,10 +192,57 @@ def create_proxy_auth_extension(proxy_auth):
     
     return pluginfile
 
+# Cache extension proxy theo thông tin proxy: {hash: đường dẫn zip}
+_proxy_extension_cache = {}
+_proxy_extension_lock = threading.Lock()
+_proxy_extension_dir = None
+
+def _cleanup_proxy_extensions():
+    """Xóa thư mục chứa các extension proxy khi thoát chương trình"""
+    if _proxy_extension_dir:
+        shutil.rmtree(_proxy_extension_dir, ignore_errors=True)
+
+def get_proxy_auth_extension(proxy):
+    """
+    Lấy extension proxy auth từ cache, chỉ build zip một lần cho mỗi bộ proxy
+    Mỗi bộ proxy có file riêng (tên theo hash) nên các luồng không ghi đè lên nhau
+    """
+    global _proxy_extension_dir
+    
+    if not proxy:
+        return None
+    
+    proxy_auth = proxy_manager.get_proxy_auth(proxy)
+    cache_key = hashlib.sha256(
+        f"{proxy['host']}|{proxy['port']}|{proxy_auth}".encode()
+    ).hexdigest()[:16]
+    
+    with _proxy_extension_lock:
+        cached_path = _proxy_extension_cache.get(cache_key)
+        if cached_path and os.path.isfile(cached_path):
+            return cached_path
+        
+        if _proxy_extension_dir is None:
+            _proxy_extension_dir = tempfile.mkdtemp(prefix='proxy_auth_')
+            atexit.register(_cleanup_proxy_extensions)
+        
+        # Ghi ra file tạm rồi rename để không có driver nào đọc phải file zip dở dang
+        pluginfile = os.path.join(_proxy_extension_dir, f'proxy_auth_{cache_key}.zip')
+        tmp_file = f"{pluginfile}.tmp"
+        create_proxy_auth_extension(proxy_auth, proxy['host'], proxy['port'], pluginfile=tmp_file)
+        os.replace(tmp_file, pluginfile)
+        
+        _proxy_extension_cache[cache_key] = pluginfile
+        logger.info(f"🧩 Đã tạo proxy extension: {pluginfile}")
+        return pluginfile
+
+
+
 
 def opened_link_chroome(url_search, use_proxy=True, retry_count=0):
     """
     Mở Chrome driver với proxy support và rotation
+    url_search = None: chỉ khởi tạo driver, không mở trang nào
     """
     options = webdriver.ChromeOptions()
     options.add_argument('--headless')
@@ -108,7 +253,6 @@ def opened_link_chroome(url_search, use_proxy=True, retry_count=0):
     options.add_argument('--disable-blink-features=AutomationControlled')
     options.add_argument('--disable-extensions')
     options.add_argument('--disable-plugins')
-    options.add_argument('--disable-images')
     options.add_argument('--disable-web-security')
     options.add_argument('--allow-running-insecure-content')
     options.add_argument('--disable-features=VizDisplayCompositor')
@@ -120,20 +264,22 @@ def opened_link_chroome(url_search, use_proxy=True, retry_count=0):
     options.add_experimental_option('useAutomationExtension', False)
     options.add_argument("--disable-blink-features=AutomationControlled")
     
+    # Chặn ảnh thật sự + bật performance log cho thống kê tài nguyên bị chặn
+    configure_blocking_options(options)
+    
     # Thêm proxy nếu được yêu cầu
     current_proxy = None
     if use_proxy:
         current_proxy = proxy_manager.get_current_proxy()
         if current_proxy:
             proxy_string = proxy_manager.get_proxy_string(current_proxy)
-            proxy_auth = proxy_manager.get_proxy_auth(current_proxy)
             
             # Sử dụng format đúng cho proxy authentication
             options.add_argument(f'--proxy-server=http://{proxy_string}')
             
             # Thêm proxy authentication extension
             try:
-                extension_path = create_proxy_auth_extension(proxy_auth)
+                extension_path = get_proxy_auth_extension(current_proxy)
                 options.add_extension(extension_path)
                 logger.info(f"🔒 Sử dụng proxy: {proxy_string}")
             except Exception as ext_error:
@@ -142,10 +288,10 @@ def opened_link_chroome(url_search, use_proxy=True, retry_count=0):
         else:
             raise Exception("❌ BẮT BUỘC phải có proxy!")
     
+    driver = None
     try:
-        # Tải ChromeDriver trước (không qua proxy)
-        logger.info("📥 Đang tải ChromeDriver...")
-        service = Service(ChromeDriverManager().install())
+        # ChromeDriver đã được resolve một lần cho cả process
+        service = Service(resolve_chromedriver_path())
         
         # Tạo driver
         driver = webdriver.Chrome(service=service, options=options)
@@ -157,27 +303,12 @@ def opened_link_chroome(url_search, use_proxy=True, retry_count=0):
         driver.execute_script("Object.defineProperty(navigator, 'languages', {get: () => ['en-US', 'en']})")
         driver.execute_script("window.chrome = { runtime: {} }")
         
-        logger.info(f"🌐 Đang mở URL: {url_search}")
-        driver.get(url_search)
+        # Chặn tài nguyên nặng (tile, ảnh, font, analytics) ở tầng network
+        apply_resource_blocking(driver)
         
-        # Chờ trang load
-        WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
-        time.sleep(5)  # Tăng thời gian chờ
-        
-        # Debug: Kiểm tra title và URL
-        try:
-            title = driver.title
-            current_url = driver.current_url
-            logger.info(f"📄 Page title: {title}")
-            logger.info(f"🔗 Current URL: {current_url}")
-            
-            # Kiểm tra xem có bị chặn không
-            if "blocked" in title.lower() or "access denied" in title.lower() or "captcha" in title.lower():
-                logger.warning("⚠️ Có thể bị chặn bởi Google Maps")
-        except Exception as debug_error:
-            logger.warning(f"⚠️ Lỗi debug: {debug_error}")
+        # Mở URL nếu có (DriverPool tạo driver trống rồi điều hướng sau)
+        if url_search:
+            load_search_page(driver, url_search)
         
         # Reset retry count nếu thành công
         proxy_manager.reset_retry()
@@ -186,6 +317,13 @@ def opened_link_chroome(url_search, use_proxy=True, retry_count=0):
     except Exception as e:
         logger.warning(f"⚠️ Lỗi khởi tạo driver: {e}")
         
+        # Đóng driver dở dang để không để lại process Chrome mồ côi
+        if driver is not None:
+            try:
+                driver.quit()
+            except:
+                pass
+        
         # Đánh dấu proxy fail nếu có
         if current_proxy:
             proxy_manager.mark_proxy_failed(current_proxy)
@@ -208,194 +346,31 @@ def opened_link_chroome(url_search, use_proxy=True, retry_count=0):
             # Không cho phép chạy không proxy
             logger.error("❌ Proxy fail - BẮT BUỘC phải dùng proxy!")
             raise Exception("❌ BẮT BUỘC phải dùng proxy!")
-def Scrap_data(driver):
+def Scrap_data(driver, fetcher=None, url_search=None, max_scrolls=10):
+    """
+    Scrape danh sách cửa hàng từ trang kết quả tìm kiếm qua fetcher của giai đoạn list
+    Mặc định SeleniumFetcher trên driver: mở url_search (None: trang đang mở) và scroll tối đa max_scrolls lần;
+    fetcher không render JS (HTTP) chỉ parse phần kết quả có sẵn trong HTML (không scroll được)
+    """
     logger.info("🔍 Bắt đầu scraping data từ Google Maps...")
     
-    # Các selectors mới cho Google Maps hiện tại
-    store_selectors = [
-        "a.hfpxzc",  # Link cửa hàng chính
-        "a[aria-label*='·']",  # Cửa hàng có dấu ·
-        "div[role='main'] a[jsaction]",  # Link trong main area
-        "div[data-value] a[href*='/place/']",  # Link đến place
-        "a[jslog*='track:click']",  # Có jslog track click
-        "div[class*='Nv2PK'] a",  # Link trong container Nv2PK
-        "div[class*='Q2HXcd'] a",  # Link trong container Q2HXcd
-        "a[href*='/maps/place/']",  # Link trực tiếp đến place
-        "div[class*='THOPZb'] a",  # Link trong container THOPZb
-        "div[class*='VkpGBb'] a",  # Link trong container VkpGBb
-        "a[data-value]",  # Link có data-value
-        "div[jsaction] a",  # Link trong div có jsaction
-    ]
-    
-    # Tìm elements để scroll
-    scroll_elements = []
-    for selector in store_selectors:
-        try:
-            elements = driver.find_elements(By.CSS_SELECTOR, selector)
-            if elements:
-                scroll_elements.extend(elements)
-                logger.info(f"✅ Tìm thấy {len(elements)} elements với selector: {selector}")
-        except Exception as e:
-            logger.warning(f"⚠️ Lỗi với selector {selector}: {e}")
-    
-    if not scroll_elements:
-        logger.warning("⚠️ Không tìm thấy elements để scroll, thử cách khác...")
-        # Fallback: tìm tất cả thẻ a
-        scroll_elements = driver.find_elements(By.TAG_NAME, "a")
-        logger.info(f"📋 Tìm thấy {len(scroll_elements)} thẻ <a>")
-    
-    action = ActionChains(driver)
-    scroll_count = 0
-    max_scrolls = 10  # Giảm số lần scroll để tăng tốc độ
-    
-    while scroll_count < max_scrolls:
-        try:
-            logger.info(f"📜 Scroll lần {scroll_count + 1}/{max_scrolls}")
-            
-            # Scroll xuống
-            if scroll_elements:
-                last_element = scroll_elements[-1]
-                Scroll_origin = ScrollOrigin.from_element(last_element)
-                action.scroll_from_origin(Scroll_origin, 0, 1000).perform()
-            else:
-                # Fallback scroll
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            
-            time.sleep(1)  # Giảm thời gian chờ giữa các lần scroll
-            
-            # Kiểm tra xem có thêm elements mới không
-            new_elements = []
-            for selector in store_selectors:
-                try:
-                    elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                    new_elements.extend(elements)
-                except:
-                    continue
-            
-            if len(new_elements) > len(scroll_elements):
-                scroll_elements = new_elements
-                logger.info(f"🔄 Tìm thấy thêm elements, tổng: {len(scroll_elements)}")
-            else:
-                logger.info("✅ Không có thêm elements mới, dừng scroll")
-                break
-                
-            scroll_count += 1
-            
-        except Exception as e:
-            logger.warning(f"⚠️ Lỗi khi scroll: {e}")
-            break
-    
-    # Parse HTML và extract data
-    content = driver.page_source
-    data = BeautifulSoup(content, 'html.parser')
+    fetcher = fetcher or SeleniumFetcher(driver)
+    if not fetcher.renders_js:
+        logger.info(f"🌐 Tải trang kết quả qua {fetcher.name} fetcher (không scroll)")
+    html = fetcher.fetch_list(url_search, max_scrolls=max_scrolls)
     
+    # Parse HTML và extract data - một lượt duyệt, mỗi card một record (trong parse pool nếu bật)
+    return _build_store_dataframe(parse_pool.parse_list(html))
+
+def _build_store_dataframe(res):
+    """Loại bỏ duplicate theo tên và tạo DataFrame danh sách cửa hàng"""
+    return pd.DataFrame(dedupe_stores_by_name(res))
+
+def dedupe_stores_by_name(res):
+    """Loại bỏ cửa hàng trùng tên (chuẩn hóa) trong danh sách record đã parse"""
     logger.info("📋 Bắt đầu parse data...")
-    res = []
-    
-    # Các selectors để tìm thông tin cửa hàng
-    store_containers = [
-        "div[class*='Nv2PK']",
-        "div[class*='Q2HXcd']", 
-        "div[class*='THOPZb']",
-        "div[role='main'] > div",
-        "div[data-value]"
-    ]
-    
-    for container_selector in store_containers:
-        try:
-            containers = data.find_all('div', class_=lambda x: x and any(cls in x for cls in ['Nv2PK', 'Q2HXcd', 'THOPZb']))
-            logger.info(f"🔍 Tìm thấy {len(containers)} containers với selector: {container_selector}")
-            
-            for i, area in enumerate(containers):
-                try:
-                    # Khởi tạo biến link trước
-                    link = "Link Not Found"
-                    
-                    # Tìm link trước
-                    link_selectors = [
-                        "a[href*='/maps/place/']",
-                        "a[href*='google.com/maps']",
-                        "a[data-value]",
-                        "a[jsaction*='pane']"
-                    ]
-                    
-                    for link_selector in link_selectors:
-                        try:
-                            link_elem = area.select_one(link_selector)
-                            if link_elem and link_elem.get('href'):
-                                link = link_elem.get('href')
-                                break
-                        except:
-                            continue
-                    
-                    # Tạo ID duy nhất dựa trên link thay vì timestamp
-                    import hashlib
-                    if link != "Link Not Found":
-                        store_id = hashlib.md5(link.encode()).hexdigest()[:16]
-                    else:
-                        # Fallback nếu không có link
-                        current_datetime = datetime.datetime.now()
-                        merge_date = current_datetime.strftime("%Y%m%d%H%M%S%f")
-                        store_id = f"{merge_date}{i+1}"
-                    
-                    # Tìm tên cửa hàng
-                    nama = "Nama Not Found"
-                    name_selectors = [
-                        "div[class*='qBF1Pd']",
-                        "div[class*='fontHeadlineSmall']", 
-                        "h1", "h2", "h3",
-                        "span[class*='fontHeadlineSmall']",
-                        "div[class*='fontBodyMedium']"
-                    ]
-                    
-                    for name_selector in name_selectors:
-                        try:
-                            name_elem = area.select_one(name_selector)
-                            if name_elem and name_elem.get_text().strip():
-                                nama = name_elem.get_text().strip()
-                                break
-                        except:
-                            continue
-                    
-                    # Tìm rating
-                    rating = "Rating Not Found"
-                    rating_selectors = [
-                        "span[class*='MW4etd']",
-                        "span[class*='fontBodyMedium']",
-                        "div[class*='fontBodyMedium']",
-                        "span[class*='rating']"
-                    ]
-                    
-                    for rating_selector in rating_selectors:
-                        try:
-                            rating_elem = area.select_one(rating_selector)
-                            if rating_elem and rating_elem.get_text().strip():
-                                rating_text = rating_elem.get_text().strip()
-                                if any(char.isdigit() for char in rating_text):
-                                    rating = rating_text
-                                    break
-                        except:
-                            continue
-                    
-                    
-                    # Chỉ thêm nếu có ít nhất tên hoặc link
-                    if nama != "Nama Not Found" or link != "Link Not Found":
-                        res.append({
-                            'id': store_id, 
-                            'nama': nama, 
-                            'rating': rating, 
-                            'link': link
-                        })
-                        logger.info(f"✅ Tìm thấy cửa hàng: {nama[:50]}...")
-                        
-                except Exception as e:
-                    logger.warning(f"⚠️ Lỗi khi parse cửa hàng {i+1}: {e}")
-                    logger.debug(f"   Container HTML: {str(area)[:200]}...")
-                    continue
-                    
-        except Exception as e:
-            logger.warning(f"⚠️ Lỗi với container selector {container_selector}: {e}")
-            continue
+    for item in res:
+        logger.info(f"✅ Tìm thấy cửa hàng: {item['nama'][:50]}...")
     
     # Loại bỏ duplicate dựa trên tên cửa hàng
     unique_res = []
@@ -404,7 +379,6 @@ def Scrap_data(driver):
     
     for item in res:
         # Chuẩn hóa tên để so sánh (bỏ dấu, chuyển thành chữ thường)
-        import re
         normalized_name = re.sub(r'[^\w\s]', '', item['nama'].lower().strip())
         
         if normalized_name not in seen_names:
@@ -416,5 +390,20 @@ def Scrap_data(driver):
     
     logger.info(f"🎉 Hoàn thành scraping! Tìm thấy {len(res)} cửa hàng, {duplicate_count} duplicate, {len(unique_res)} unique")
     
-    df = pd.DataFrame(unique_res)
-    return df
\ No newline at end of file
+    return unique_res
+
+
+def Scrap_data_stream(driver, fetcher=None, url_search=None, max_scrolls=10):
+    """
+    Generator: yield list các cửa hàng mới xuất hiện sau mỗi bước tải danh sách của fetcher
+    Mặc định SeleniumFetcher trên driver (mỗi lần scroll một bước, url_search=None: trang đang mở)
+    """
+    logger.info("🔍 Bắt đầu scraping data (streaming) từ Google Maps...")
+    
+    fetcher = fetcher or SeleniumFetcher(driver)
+    total = 0
+    for batch in fetcher.stream_list(url_search, max_scrolls=max_scrolls):
+        total += len(batch)
+        yield batch
+    
+    logger.info(f"🎉 Hoàn thành scraping (streaming)! Tìm thấy {total} cửa hàng")
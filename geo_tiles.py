@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Geo tiles cho Google Maps Crawler
+Google Maps chỉ trả tối đa ~120 kết quả cho một danh sách, nên một lần tìm 'keyword in thành phố'
+chỉ thấy một phần nhỏ. Chia khung tọa độ thành tile, tìm theo viewport (@lat,lng,zoom) từng tile
+và chia tư (quadtree) tile nào chạm trần kết quả, dừng chia khi tile chỉ trả về địa điểm đã có từ trước
+"""
+
+import math
+import logging
+import urllib.parse
+from collections import deque
+from job_planner import canonical_location
+from config import GEO_SATURATION, GEO_MAX_DEPTH, GEO_MAX_TILES
+
+logger = logging.getLogger(__name__)
+
+# Khung tọa độ (south, west, north, east) theo tên địa điểm chuẩn của job planner
+CITY_BOUNDS = {
+    'ho chi minh': (10.37, 106.36, 11.16, 107.03),
+    'ha noi': (20.56, 105.28, 21.39, 106.02),
+    'da nang': (15.92, 107.82, 16.20, 108.32),
+}
+BBOX_PREFIX = 'bbox:'
+
+# Phần bản đồ nhìn thấy trong cửa sổ 1920x1080 (trừ panel danh sách kết quả bên trái)
+VIEWPORT_WIDTH = 1920 - 430
+VIEWPORT_HEIGHT = 1080
+MIN_ZOOM, MAX_ZOOM = 3, 21
+
+def resolve_bounds(location):
+    """
+    Khung tọa độ cho location của job: 'bbox:south,west,north,east' hoặc tên thành phố trong CITY_BOUNDS
+    Trả về None nếu không xác định được
+    """
+    text = location.strip()
+    if text.lower().startswith(BBOX_PREFIX):
+        try:
+            south, west, north, east = (float(value) for value in text[len(BBOX_PREFIX):].split(','))
+        except ValueError:
+            logger.warning(f"⚠️ Khung tọa độ không hợp lệ: {location} (cần bbox:south,west,north,east)")
+            return None
+        if south >= north or west >= east:
+            logger.warning(f"⚠️ Khung tọa độ không hợp lệ: {location} (south < north, west < east)")
+            return None
+        return south, west, north, east
+    return CITY_BOUNDS.get(canonical_location(text))
+
+class GeoTile:
+    """Một ô tọa độ trong quadtree"""
+
+    def __init__(self, south, west, north, east, depth=0):
+        self.south = south
+        self.west = west
+        self.north = north
+        self.east = east
+        self.depth = depth
+
+    @property
+    def center(self):
+        return (self.south + self.north) / 2, (self.west + self.east) / 2
+
+    @property
+    def zoom(self):
+        """Zoom lớn nhất mà viewport vẫn chứa trọn tile (Web Mercator, tile 256px)"""
+        latitude = math.radians(self.center[0])
+        zoom_lng = math.log2(360 * VIEWPORT_WIDTH / (256 * (self.east - self.west)))
+        zoom_lat = math.log2(360 * VIEWPORT_HEIGHT * math.cos(latitude) / (256 * (self.north - self.south)))
+        return max(MIN_ZOOM, min(MAX_ZOOM, int(math.floor(min(zoom_lng, zoom_lat)))))
+
+    def children(self):
+        """Chia tư tile"""
+        middle_lat, middle_lng = self.center
+        depth = self.depth + 1
+        return [
+            GeoTile(middle_lat, self.west, self.north, middle_lng, depth),
+            GeoTile(middle_lat, middle_lng, self.north, self.east, depth),
+            GeoTile(self.south, self.west, middle_lat, middle_lng, depth),
+            GeoTile(self.south, middle_lng, middle_lat, self.east, depth),
+        ]
+
+    def label(self):
+        return f"{self.south:.4f},{self.west:.4f},{self.north:.4f},{self.east:.4f}"
+
+def build_tile_url(keyword, tile):
+    """URL tìm kiếm Google Maps giới hạn trong viewport của tile"""
+    latitude, longitude = tile.center
+    encoded_keyword = urllib.parse.quote(keyword)
+    return f"https://www.google.com/maps/search/{encoded_keyword}/@{latitude:.6f},{longitude:.6f},{tile.zoom}z"
+
+class QuadtreeSearch:
+    """Duyệt tile theo chiều rộng: next_tile() lấy tile kế tiếp, report() báo kết quả để quyết định chia tư
+
+    Tile được chia khi số kết quả >= saturation (chạm trần danh sách) và còn địa điểm chưa có trong database,
+    chưa quá max_depth; tổng số tile tìm kiếm không vượt max_tiles
+    """
+
+    def __init__(self, bounds, saturation=GEO_SATURATION, max_depth=GEO_MAX_DEPTH, max_tiles=GEO_MAX_TILES):
+        self.saturation = saturation
+        self.max_depth = max_depth
+        self.max_tiles = max_tiles
+        self.queue = deque([GeoTile(*bounds)])
+        self.stats = {
+            'tiles': 0,
+            'subdivided': 0,
+            'saturated_known': 0,  # Chạm trần nhưng chỉ có địa điểm đã biết - không chia
+            'saturated_max_depth': 0,  # Chạm trần ở độ sâu tối đa - có thể còn sót
+            'skipped_tiles': 0,  # Tile chưa tìm do chạm max_tiles
+            'max_depth': 0
+        }
+
+    def next_tile(self):
+        if not self.queue:
+            return None
+        if self.stats['tiles'] >= self.max_tiles:
+            self.stats['skipped_tiles'] += len(self.queue)
+            logger.warning(f"⚠️ Đã tìm {self.max_tiles} tile (GEO_MAX_TILES), bỏ {len(self.queue)} tile còn lại")
+            self.queue.clear()
+            return None
+        tile = self.queue.popleft()
+        self.stats['tiles'] += 1
+        self.stats['max_depth'] = max(self.stats['max_depth'], tile.depth)
+        return tile
+
+    def report(self, tile, found, unknown):
+        """found: số kết quả của tile, unknown: số địa điểm của tile chưa có trong database trước khi job bắt đầu"""
+        if found < self.saturation:
+            return
+        if unknown == 0:
+            self.stats['saturated_known'] += 1
+            logger.info(f"🧭 Tile {tile.label()} chạm trần nhưng chỉ có địa điểm đã biết, không chia nhỏ")
+            return
+        if tile.depth >= self.max_depth:
+            self.stats['saturated_max_depth'] += 1
+            logger.info(f"🧭 Tile {tile.label()} chạm trần ở độ sâu tối đa {self.max_depth}")
+            return
+        self.stats['subdivided'] += 1
+        self.queue.extend(tile.children())
+        logger.info(f"🧭 Tile {tile.label()} chạm trần ({found} kết quả, {unknown} mới), chia thành 4 tile")
+
+    def summary(self):
+        stats = self.stats
+        return (f"{stats['tiles']} tile (sâu nhất {stats['max_depth']}), {stats['subdivided']} lần chia, "
+                f"{stats['saturated_known']} tile dừng vì chỉ có địa điểm đã biết, "
+                f"{stats['saturated_max_depth']} tile chạm trần ở độ sâu tối đa, {stats['skipped_tiles']} tile bỏ qua")
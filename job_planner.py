@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Job planner cho batch crawl
+Chuẩn hóa + gộp job trùng / gần trùng trong list_jobs.txt (alias địa điểm, địa điểm lặp lại trong từ khóa),
+ước lượng độ mới của job từ kết quả các lần chạy trước (crawl_jobs) và xếp job nhiều cửa hàng mới lên trước
+"""
+
+import re
+import logging
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+# Các cách viết của cùng một thành phố -> tên chuẩn (đã bỏ dấu, chữ thường)
+LOCATION_ALIASES = {
+    'ho chi minh': ['ho chi minh', 'ho chi minh city', 'hcm', 'hcmc', 'sai gon', 'saigon'],
+    'ha noi': ['ha noi', 'hanoi'],
+    'da nang': ['da nang', 'danang'],
+}
+CITY_PREFIXES = ('thanh pho ', 'tp ')
+DISTRICT_PATTERN = re.compile(r'^(?:quan|q|district)\s*(\d+)$')
+DISTRICT_PREFIX = 'quan '
+# Job chưa từng chạy: coi như toàn cửa hàng mới để được chạy sớm
+UNKNOWN_NOVELTY = 1.0
+
+def normalize_text(text):
+    """Bỏ dấu tiếng Việt, chữ thường, bỏ dấu câu, gộp khoảng trắng"""
+    text = unicodedata.normalize('NFD', text.replace('đ', 'd').replace('Đ', 'D'))
+    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn').lower()
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+def _city_alias(text):
+    for city, aliases in LOCATION_ALIASES.items():
+        if text in aliases:
+            return city
+    return None
+
+def canonical_location(location):
+    """'TP.HCM', 'Thành phố Hồ Chí Minh', 'Ho Chi Minh City' -> 'ho chi minh'; 'Q1' -> 'quan 1'; 'Quận Bình Thạnh' -> 'binh thanh'"""
+    text = normalize_text(location)
+    for prefix in CITY_PREFIXES:
+        if text.startswith(prefix):
+            text = text[len(prefix):]
+            break
+    text = _city_alias(text) or text
+
+    district = DISTRICT_PATTERN.match(text)
+    if district:
+        return f"{DISTRICT_PREFIX}{int(district.group(1))}"
+    if text.startswith(DISTRICT_PREFIX):
+        return text[len(DISTRICT_PREFIX):]  # Quận có tên: 'quan binh thanh' -> 'binh thanh'
+    return text
+
+def _location_phrases(location):
+    """Các cách viết địa điểm có thể bị lặp lại trong từ khóa (dài trước, để xóa cụm dài nhất)"""
+    canonical = canonical_location(location)
+    phrases = {normalize_text(location), canonical}
+    if canonical in LOCATION_ALIASES:
+        for alias in LOCATION_ALIASES[canonical]:
+            phrases.update({alias, *(prefix + alias for prefix in CITY_PREFIXES)})
+    district = re.match(r'^quan (\d+)$', canonical)
+    if district:
+        number = district.group(1)
+        phrases.update({f"quan {number}", f"q{number}", f"q {number}", f"district {number}"})
+    elif not canonical.isdigit():
+        phrases.add(DISTRICT_PREFIX + canonical)
+    return sorted(phrases, key=len, reverse=True)
+
+def canonical_keyword(keyword, location):
+    """Từ khóa chuẩn: bỏ dấu, bỏ phần địa điểm lặp lại ('shop hoa Quận 1' tại 'Quận 1' -> 'shop hoa')"""
+    text = normalize_text(keyword)
+    stripped = text
+    for phrase in _location_phrases(location):
+        stripped = re.sub(rf'\b{re.escape(phrase)}\b', ' ', stripped)
+    stripped = re.sub(r'\s+', ' ', stripped).strip()
+    return stripped or text
+
+def plan_key(job):
+    return canonical_keyword(job['keyword'], job['location']), canonical_location(job['location'])
+
+class JobPlanner:
+    """Lập kế hoạch chạy job: gộp trùng, ước lượng độ mới, sắp xếp"""
+
+    def __init__(self, db=None):
+        self.db = db
+        self.merged = []  # [(job bị gộp, job giữ lại, 'trùng' | 'gần trùng')]
+        self.input_count = 0
+        self.novelty = {}  # {plan_key: (tỉ lệ cửa hàng mới, số cửa hàng tìm thấy) của lần chạy gần nhất}
+
+    def load_history(self):
+        """Độ mới của mỗi job (theo plan key) từ lần chạy hoàn thành gần nhất"""
+        if self.db is None:
+            return
+        totals = {}
+        for keyword, location, stores_found, new_stores in self.db.get_job_history():
+            key = (canonical_keyword(keyword, location), canonical_location(location))
+            found, new = totals.get(key, (0, 0))
+            totals[key] = (found + (stores_found or 0), new + (new_stores or 0))
+        self.novelty = {key: (new / found, found) for key, (found, new) in totals.items() if found}
+
+    def plan(self, jobs):
+        """Trả về danh sách job đã gộp trùng và xếp theo độ mới giảm dần (id đánh lại theo thứ tự chạy)"""
+        self.input_count = len(jobs)
+        self.merged = []
+        self.load_history()
+
+        planned = {}
+        for job in jobs:
+            key = plan_key(job)
+            kept = planned.get(key)
+            if kept is None:
+                planned[key] = job
+                continue
+            exact = (normalize_text(job['keyword']), normalize_text(job['location'])) == \
+                    (normalize_text(kept['keyword']), normalize_text(kept['location']))
+            self.merged.append((job, kept, 'trùng' if exact else 'gần trùng'))
+            # Giữ giới hạn rộng hơn (0 = không giới hạn)
+            if kept['max_stores'] > 0 and (job['max_stores'] == 0 or job['max_stores'] > kept['max_stores']):
+                kept['max_stores'] = job['max_stores']
+
+        ordered = list(planned.items())
+        for position, (key, job) in enumerate(ordered):
+            novelty, found = self.novelty.get(key, (None, 0))
+            job['novelty'] = novelty
+            job['history_found'] = found
+            job['plan_order'] = position
+        # Độ mới cao trước, cùng độ mới giữ thứ tự trong file
+        ordered.sort(key=lambda item: (-(UNKNOWN_NOVELTY if item[1]['novelty'] is None else item[1]['novelty']),
+                                       item[1]['plan_order']))
+
+        result = []
+        for job_id, (_, job) in enumerate(ordered, start=1):
+            job['id'] = job_id
+            job.pop('plan_order', None)
+            result.append(job)
+        return result
+
+    def print_plan(self, jobs):
+        exact = sum(1 for _, _, kind in self.merged if kind == 'trùng')
+        print(f"\n🗺️ Kế hoạch crawl: {self.input_count} dòng → {len(jobs)} job "
+              f"({exact} trùng, {len(self.merged) - exact} gần trùng được gộp)")
+        for job in jobs:
+            limit = f"tối đa {job['max_stores']}" if job['max_stores'] > 0 else "không giới hạn"
+            if job.get('novelty') is None:
+                novelty = "chưa chạy"
+            else:
+                novelty = f"~{job['novelty']:.0%} mới (lần trước {job['history_found']} cửa hàng)"
+            print(f"  {job['id']}. '{job['keyword']}' tại '{job['location']}' ({limit}) - {novelty}")
+        for job, kept, kind in self.merged:
+            print(f"  🔁 Gộp ({kind}): '{job['keyword']}|{job['location']}' → job {kept['id']} "
+                  f"'{kept['keyword']}|{kept['location']}'")
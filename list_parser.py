@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+List parser cho Google Maps Crawler
+Parse trang kết quả tìm kiếm trong một lượt duyệt, mỗi card kết quả -> một record
+Dùng lxml với XPath biên dịch sẵn, fallback BeautifulSoup nếu chưa cài lxml
+"""
+
+import re
+import datetime
+import logging
+from bs4 import BeautifulSoup
+from place_key import canonical_place_key, store_id_for
+
+try:
+    from lxml import etree, html as lxml_html
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+logger = logging.getLogger(__name__)
+
+# Class của container một card kết quả
+CARD_CLASSES = ['Nv2PK', 'Q2HXcd', 'THOPZb']
+
+# Thứ tự ưu tiên giống selectors CSS cũ: [class*='x'] tương đương contains(@class, 'x')
+LINK_SELECTORS = [
+    "a[href*='/maps/place/']",
+    "a[href*='google.com/maps']",
+    "a[data-value]",
+    "a[jsaction*='pane']"
+]
+NAME_SELECTORS = [
+    "div[class*='qBF1Pd']",
+    "div[class*='fontHeadlineSmall']",
+    "h1", "h2", "h3",
+    "span[class*='fontHeadlineSmall']",
+    "div[class*='fontBodyMedium']"
+]
+RATING_SELECTORS = [
+    "span[class*='MW4etd']",
+    "span[class*='fontBodyMedium']",
+    "div[class*='fontBodyMedium']",
+    "span[class*='rating']"
+]
+
+# Các dòng thông tin trong card: "Danh mục · Địa chỉ", "Giờ mở cửa · Số điện thoại"
+INFO_ROW_CLASS = 'W4Efsd'
+PHONE_CLASS = 'UsdlK'
+RATING_CLASS = 'MW4etd'
+PHONE_PATTERN = re.compile(r'^(?:\+\d{1,3}|0)[\d\s.\-()]{7,16}\d$')
+HOURS_MARKERS = ('Mở cửa', 'Đóng cửa', 'đóng cửa', 'mở cửa', 'Open', 'Closed', 'Closes', 'Opens', '24 giờ')
+
+if HAS_LXML:
+    _card_match = " or ".join(f"contains(@class, '{cls}')" for cls in CARD_CLASSES)
+    # Chỉ lấy card ngoài cùng để card lồng nhau không bị parse hai lần
+    CARD_XPATH = etree.XPath(f"//div[{_card_match}][not(ancestor::div[{_card_match}])]")
+    LINK_XPATHS = [etree.XPath(xpath) for xpath in [
+        ".//a[contains(@href, '/maps/place/')]/@href",
+        ".//a[contains(@href, 'google.com/maps')]/@href",
+        ".//a[@data-value]/@href",
+        ".//a[contains(@jsaction, 'pane')]/@href",
+    ]]
+    NAME_XPATHS = [etree.XPath(xpath) for xpath in [
+        ".//div[contains(@class, 'qBF1Pd')]",
+        ".//div[contains(@class, 'fontHeadlineSmall')]",
+        ".//h1", ".//h2", ".//h3",
+        ".//span[contains(@class, 'fontHeadlineSmall')]",
+        ".//div[contains(@class, 'fontBodyMedium')]",
+    ]]
+    RATING_XPATHS = [etree.XPath(xpath) for xpath in [
+        ".//span[contains(@class, 'MW4etd')]",
+        ".//span[contains(@class, 'fontBodyMedium')]",
+        ".//div[contains(@class, 'fontBodyMedium')]",
+        ".//span[contains(@class, 'rating')]",
+    ]]
+    PHONE_XPATH = etree.XPath(f".//span[contains(@class, '{PHONE_CLASS}')]")
+    # Dòng thông tin lá (không chứa dòng con) và không phải dòng rating
+    INFO_ROW_XPATH = etree.XPath(
+        f".//div[contains(@class, '{INFO_ROW_CLASS}')]"
+        f"[not(.//div[contains(@class, '{INFO_ROW_CLASS}')])]"
+        f"[not(.//span[contains(@class, '{RATING_CLASS}')])]"
+    )
+
+def make_store_id(link, index=0):
+    """Tạo ID duy nhất dựa trên place key của link (cùng địa điểm ở các job khác nhau -> cùng ID)"""
+    place_key = canonical_place_key(link)
+    if place_key:
+        return store_id_for(place_key)
+    # Fallback nếu không có link
+    merge_date = datetime.datetime.now().strftime("%Y%m%d%H%M%S%f")
+    return f"{merge_date}{index+1}"
+
+def extract_listing_fields(info_rows, phone_text=None):
+    """
+    Lấy thêm dữ liệu có sẵn trên card kết quả (không cần mở trang chi tiết): địa chỉ rút gọn, số điện thoại
+    Đoạn đầu của dòng đầu là danh mục - bỏ qua để không nhầm thành địa chỉ
+    """
+    fields = {
+        'phone': 'Not Found',
+        'address': 'Not Found'
+    }
+
+    phone_text = (phone_text or '').strip()
+    if phone_text and PHONE_PATTERN.match(phone_text):
+        fields['phone'] = phone_text
+
+    for row_index, row_text in enumerate(info_rows):
+        segments = [segment.strip() for segment in row_text.split('·')]
+        segments = [segment for segment in segments if segment]
+        for segment_index, segment in enumerate(segments):
+            if PHONE_PATTERN.match(segment):
+                if fields['phone'] == 'Not Found':
+                    fields['phone'] = segment
+            elif any(marker in segment for marker in HOURS_MARKERS) or (row_index == 0 and segment_index == 0):
+                continue
+            elif fields['address'] == 'Not Found' and any(char.isdigit() for char in segment):
+                fields['address'] = segment
+
+    return fields
+
+def _build_record(link, nama, rating, index, info_rows=(), phone_text=None):
+    # Chỉ thêm nếu có ít nhất tên hoặc link
+    if nama == "Nama Not Found" and link == "Link Not Found":
+        return None
+    record = {
+        'id': make_store_id(link, index),
+        'nama': nama,
+        'rating': rating,
+        'link': link,
+        'place_key': canonical_place_key(link)
+    }
+    record.update(extract_listing_fields(info_rows, phone_text))
+    return record
+
+def _first_text(card, xpaths, require_digit=False):
+    for xpath in xpaths:
+        for elem in xpath(card):
+            text = elem.text_content().strip()
+            if text and (not require_digit or any(char.isdigit() for char in text)):
+                return text
+            # select_one chỉ xét phần tử đầu tiên khớp selector
+            break
+    return None
+
+def _parse_card_lxml(card, index=0):
+    link = "Link Not Found"
+    for xpath in LINK_XPATHS:
+        hrefs = xpath(card)
+        if hrefs and hrefs[0]:
+            link = hrefs[0]
+            break
+
+    nama = _first_text(card, NAME_XPATHS) or "Nama Not Found"
+    rating = _first_text(card, RATING_XPATHS, require_digit=True) or "Rating Not Found"
+
+    phones = PHONE_XPATH(card)
+    phone_text = phones[0].text_content() if phones else None
+    info_rows = [' '.join(row.text_content().split()) for row in INFO_ROW_XPATH(card)]
+    return _build_record(link, nama, rating, index, info_rows, phone_text)
+
+def parse_store_card(area, index=0):
+    """Parse một card kết quả tìm kiếm (BeautifulSoup element) thành dict cửa hàng, None nếu không đủ dữ liệu"""
+    link = "Link Not Found"
+    for link_selector in LINK_SELECTORS:
+        link_elem = area.select_one(link_selector)
+        if link_elem and link_elem.get('href'):
+            link = link_elem.get('href')
+            break
+
+    nama = "Nama Not Found"
+    for name_selector in NAME_SELECTORS:
+        name_elem = area.select_one(name_selector)
+        if name_elem and name_elem.get_text().strip():
+            nama = name_elem.get_text().strip()
+            break
+
+    rating = "Rating Not Found"
+    for rating_selector in RATING_SELECTORS:
+        rating_elem = area.select_one(rating_selector)
+        if rating_elem and rating_elem.get_text().strip():
+            rating_text = rating_elem.get_text().strip()
+            if any(char.isdigit() for char in rating_text):
+                rating = rating_text
+                break
+
+    phone_elem = area.select_one(f"span[class*='{PHONE_CLASS}']")
+    phone_text = phone_elem.get_text() if phone_elem else None
+    info_rows = [
+        ' '.join(row.get_text().split())
+        for row in area.select(f"div[class*='{INFO_ROW_CLASS}']")
+        if not row.select_one(f"div[class*='{INFO_ROW_CLASS}']") and not row.select_one(f"span[class*='{RATING_CLASS}']")
+    ]
+    return _build_record(link, nama, rating, index, info_rows, phone_text)
+
+def _iter_cards_bs4(html):
+    data = BeautifulSoup(html, 'html.parser')
+    cards = data.find_all('div', class_=lambda x: x and any(cls in x for cls in CARD_CLASSES))
+    for card in cards:
+        # Bỏ card lồng trong card khác (giống CARD_XPATH)
+        if card.find_parent('div', class_=lambda x: x and any(cls in x for cls in CARD_CLASSES)):
+            continue
+        yield card
+
+def parse_list_html(html, engine=None):
+    """
+    Parse HTML trang kết quả tìm kiếm, trả về list dict cửa hàng (mỗi card một record, không trùng place key)
+    engine: 'lxml' | 'bs4' | None (tự chọn lxml nếu có)
+    """
+    engine = engine or ('lxml' if HAS_LXML else 'bs4')
+    if engine == 'lxml':
+        cards = CARD_XPATH(lxml_html.fromstring(html))
+        parse_card = _parse_card_lxml
+    else:
+        cards = _iter_cards_bs4(html)
+        parse_card = parse_store_card
+
+    records = []
+    seen_keys = set()
+    for index, card in enumerate(cards):
+        try:
+            record = parse_card(card, index)
+        except Exception as e:
+            logger.warning(f"⚠️ Lỗi khi parse cửa hàng {index+1}: {e}")
+            continue
+        if not record:
+            continue
+        if record['place_key']:
+            if record['place_key'] in seen_keys:
+                continue
+            seen_keys.add(record['place_key'])
+        records.append(record)
+
+    return records
+
+def parse_card_html(card_html, index=0, engine=None):
+    """Parse HTML của riêng một card (dùng cho chế độ streaming)"""
+    engine = engine or ('lxml' if HAS_LXML else 'bs4')
+    if engine == 'lxml':
+        return _parse_card_lxml(lxml_html.fromstring(card_html), index)
+    area = BeautifulSoup(card_html, 'html.parser').find()
+    return parse_store_card(area, index) if area else None
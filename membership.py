@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Membership filter cho Google Maps Crawler
+Nạp sẵn số điện thoại chuẩn hóa và place key đã có trong bảng stores lúc khởi động,
+để cửa hàng trùng được nhận ra bằng tra cứu trong RAM thay vì một round trip database
+"""
+
+import sys
+import math
+import hashlib
+import logging
+import threading
+from config import MEMBERSHIP_FILTER, MEMBERSHIP_FP_RATE
+
+logger = logging.getLogger(__name__)
+
+class BloomFilter:
+    """Bloom filter trên bytearray - không có false negative, false positive ~ fp_rate - Thread Safe"""
+
+    exact = False
+
+    def __init__(self, capacity, fp_rate=MEMBERSHIP_FP_RATE):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        # Số bit và số hàm hash tối ưu cho capacity phần tử
+        self.size = max(8, int(math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2))))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        positions = self._positions(key)
+        with self.lock:
+            for position in positions:
+                self.bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def memory_bytes(self):
+        return sys.getsizeof(self.bits)
+
+    def estimated_fp_rate(self):
+        """Tỉ lệ false positive lý thuyết với số phần tử hiện tại"""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+class SetFilter:
+    """Set Python - chính xác tuyệt đối, tốn RAM hơn Bloom filter - Thread Safe"""
+
+    exact = True
+
+    def __init__(self, capacity=0, fp_rate=0.0):
+        self.items = set()
+        self.lock = threading.Lock()
+
+    @property
+    def count(self):
+        return len(self.items)
+
+    def add(self, key):
+        with self.lock:
+            self.items.add(key)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def memory_bytes(self):
+        return sys.getsizeof(self.items) + sum(sys.getsizeof(item) for item in list(self.items))
+
+    def estimated_fp_rate(self):
+        return 0.0
+
+FILTER_TYPES = {
+    'bloom': BloomFilter,
+    'set': SetFilter,
+}
+
+class KnownStores:
+    """Cửa hàng đã có trong database: số điện thoại chuẩn hóa + place key - Thread Safe
+
+    might_exist() trả về False thì chắc chắn là cửa hàng mới; True với Bloom filter thì
+    cần hỏi lại database (confirm) - tỉ lệ hỏi thừa được thống kê làm false positive thực tế
+    """
+
+    def __init__(self, kind=MEMBERSHIP_FILTER, fp_rate=MEMBERSHIP_FP_RATE):
+        self.kind = kind
+        self.fp_rate = fp_rate
+        self.phones = None
+        self.place_keys = None
+        self.lock = threading.Lock()
+        self.stats = {'lookups': 0, 'possible_hits': 0, 'confirmed': 0, 'false_positives': 0}
+
+    @property
+    def enabled(self):
+        return self.phones is not None
+
+    @property
+    def exact(self):
+        return self.enabled and self.phones.exact
+
+    def load(self, db):
+        """Nạp số điện thoại + place key từ bảng stores (chừa chỗ cho cửa hàng mới trong batch)"""
+        if self.kind not in FILTER_TYPES:
+            logger.info("ℹ️ Membership filter tắt, lọc trùng hoàn toàn bằng database")
+            return
+
+        capacity = max(int(db.get_store_count() * 1.5), 10000)
+        self.phones = FILTER_TYPES[self.kind](capacity, self.fp_rate)
+        self.place_keys = FILTER_TYPES[self.kind](capacity, self.fp_rate)
+
+        for place_key, phone_normalized in db.iter_known_store_keys():
+            if place_key:
+                self.place_keys.add(place_key)
+            if phone_normalized:
+                self.phones.add(phone_normalized)
+
+        logger.info(f"🧠 Đã nạp membership filter ({self.kind}): {self.place_keys.count} địa điểm, "
+                    f"{self.phones.count} số điện thoại, ~{self.memory_bytes() / 1024:.0f} KB")
+
+    def might_exist(self, place_key, phone_normalized):
+        """False: chắc chắn chưa có trong database. True: có thể đã có (Bloom) hoặc chắc chắn có (set)"""
+        if not self.enabled:
+            return True
+        hit = (bool(place_key and place_key in self.place_keys)
+               or bool(phone_normalized and phone_normalized in self.phones))
+        with self.lock:
+            self.stats['lookups'] += 1
+            if hit:
+                self.stats['possible_hits'] += 1
+        return hit
+
+    def record_confirmation(self, exists):
+        """Kết quả database cho một possible hit (để đo false positive thực tế)"""
+        with self.lock:
+            if exists:
+                self.stats['confirmed'] += 1
+            else:
+                self.stats['false_positives'] += 1
+
+    def add(self, place_key, phone_normalized):
+        """Cửa hàng vừa insert thành công"""
+        if not self.enabled:
+            return
+        if place_key:
+            self.place_keys.add(place_key)
+        if phone_normalized:
+            self.phones.add(phone_normalized)
+
+    def memory_bytes(self):
+        if not self.enabled:
+            return 0
+        return self.phones.memory_bytes() + self.place_keys.memory_bytes()
+
+    def print_summary(self):
+        if not self.enabled:
+            return
+        with self.lock:
+            stats = dict(self.stats)
+        negatives = stats['lookups'] - stats['confirmed']
+        observed = stats['false_positives'] / negatives if negatives else 0.0
+        estimated = max(self.phones.estimated_fp_rate(), self.place_keys.estimated_fp_rate())
+        print(f"🧠 Membership filter ({self.kind}): {stats['lookups']} lần tra, {stats['possible_hits']} có thể trùng, "
+              f"{stats['confirmed']} trùng thật, {stats['false_positives']} false positive "
+              f"(thực tế {observed:.4%}, lý thuyết {estimated:.4%}), RAM ~{self.memory_bytes() / 1024:.0f} KB")
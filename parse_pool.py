@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Parse pool cho Google Maps Crawler
+Gửi HTML thô sang một ProcessPoolExecutor để parse, nhận lại record dạng dict:
+parse là việc CPU thuần Python nên trong thread bị GIL tuần tự hóa, chạy ở process riêng
+thì tận dụng được nhiều core khi nhiều browser cùng chạy
+"""
+
+import atexit
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from list_parser import parse_list_html
+from detail_parser import extract_store_details, FIELD_RULES
+from config import PARSE_PROCESSES
+
+logger = logging.getLogger(__name__)
+
+def _init_worker(rules):
+    """Initializer của process con: spawn chỉ có luật mặc định, nhận luật hiện tại (gồm luật thêm bằng register_field_rule)"""
+    FIELD_RULES[:] = rules
+
+class ParsePool:
+    """Process pool parse HTML dùng chung cho cả process - Thread Safe
+
+    processes=0: parse ngay trong luồng gọi (như trước, không tạo process)
+    Luật trích xuất gửi sang process con một lần khi tạo pool, luật đổi sau đó thì pool được tạo lại
+    """
+
+    def __init__(self, processes=PARSE_PROCESSES):
+        self.processes = max(0, processes)
+        self.executor = None
+        self.rules = None  # Luật trích xuất process con của executor hiện tại đang dùng
+        self.lock = threading.Lock()
+        self.stats = {'tasks': 0, 'fallbacks': 0}
+
+    @property
+    def enabled(self):
+        return self.processes > 0
+
+    def _get_executor(self):
+        with self.lock:
+            if self.executor is not None and self.rules != FIELD_RULES:
+                # register_field_rule sau khi tạo pool: task đang chạy làm nốt với luật cũ, task mới sang pool mới
+                logger.info("🧮 Luật trích xuất đã thay đổi, tạo lại parse pool")
+                self.executor.shutdown(wait=False)
+                self.executor = None
+            if self.executor is None:
+                self.rules = list(FIELD_RULES)
+                # spawn: process con không kế thừa thread/lock của Selenium như khi fork
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.rules,)
+                )
+                logger.info(f"🧮 Đã khởi tạo parse pool {self.processes} process")
+            return self.executor
+
+    def run(self, func, *args):
+        """Chạy func(*args) trong process pool, trả về kết quả (func phải ở cấp module)"""
+        if not self.enabled:
+            return func(*args)
+        with self.lock:
+            self.stats['tasks'] += 1
+        try:
+            return self._get_executor().submit(func, *args).result()
+        except BrokenProcessPool as e:
+            # Process con chết (OOM, bị kill) - tạo lại pool lần sau, lần này parse tại chỗ
+            logger.warning(f"⚠️ Parse pool lỗi, parse trong luồng hiện tại: {e}")
+            with self.lock:
+                self.stats['fallbacks'] += 1
+                self.executor = None
+            return func(*args)
+
+    def parse_list(self, html):
+        """HTML trang kết quả tìm kiếm → list dict cửa hàng"""
+        return self.run(parse_list_html, html)
+
+    def parse_details(self, html):
+        """HTML trang chi tiết → dict phone/address/website/plus_code"""
+        return self.run(extract_store_details, html)
+
+    def close(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+# Global parse pool instance
+parse_pool = ParsePool()
+atexit.register(parse_pool.close)
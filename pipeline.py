@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Crawl pipeline cho Google Maps Crawler
+Chia batch crawl thành các stage search → list → detail → parse → persist,
+nối với nhau bằng queue giới hạn: mỗi stage có số worker riêng, stage sau chậm
+thì stage trước bị chặn lại (backpressure) thay vì dồn dữ liệu vào RAM
+"""
+
+import time
+import queue
+import logging
+import threading
+from run_program import build_search_url, parse_store_details
+from function import dedupe_stores_by_name
+from parse_pool import parse_pool
+from fetchers import SeleniumFetcher
+from resource_blocker import collect_blocking_stats
+from config import LIST_FETCHER, DETAIL_FETCHER, PIPELINE_SEARCH_WORKERS, PIPELINE_LIST_WORKERS, PIPELINE_DETAIL_WORKERS
+from config import PIPELINE_PARSE_WORKERS, PIPELINE_PERSIST_WORKERS, PIPELINE_QUEUE_SIZE, PIPELINE_MONITOR_INTERVAL, STORE_DELAY
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()  # Sentinel báo worker dừng
+
+class Stage:
+    """Một stage của pipeline: queue đầu vào giới hạn + nhóm worker cùng xử lý
+
+    handler(item, context): xử lý một item, context là trạng thái riêng của worker
+    (ví dụ driver) do worker_init tạo và worker_close dọn khi worker dừng
+    """
+
+    def __init__(self, name, handler, workers=1, queue_size=PIPELINE_QUEUE_SIZE, worker_init=None, worker_close=None):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self.worker_init = worker_init
+        self.worker_close = worker_close
+        self.threads = []
+        self.lock = threading.Lock()
+        self.stats = {'processed': 0, 'errors': 0, 'busy_time': 0.0, 'max_depth': 0}
+
+    def put(self, item):
+        # Block khi queue đầy - backpressure cho stage phía trước
+        self.queue.put(item)
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run_worker, name=f"{self.name}-{index + 1}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        """Gửi sentinel sau các item đang chờ và đợi mọi worker xử lý xong"""
+        for _ in self.threads:
+            self.queue.put(_STOP)
+        for thread in self.threads:
+            thread.join()
+
+    def _run_worker(self):
+        context = {}
+        try:
+            if self.worker_init:
+                context = self.worker_init()
+            while True:
+                item = self.queue.get()
+                if item is _STOP:
+                    break
+                started_at = time.monotonic()
+                try:
+                    self.handler(item, context)
+                    with self.lock:
+                        self.stats['processed'] += 1
+                except Exception as e:
+                    logger.error(f"❌ Lỗi stage '{self.name}': {e}")
+                    with self.lock:
+                        self.stats['errors'] += 1
+                finally:
+                    with self.lock:
+                        self.stats['busy_time'] += time.monotonic() - started_at
+        finally:
+            if self.worker_close:
+                try:
+                    self.worker_close(context)
+                except Exception as e:
+                    logger.warning(f"⚠️ Lỗi dọn worker stage '{self.name}': {e}")
+
+class CrawlPipeline:
+    """Pipeline batch crawl dùng BatchCrawler cho cache, driver pool, lưu database và thống kê"""
+
+    def __init__(self, crawler, batch_session):
+        self.crawler = crawler
+        self.batch_session = batch_session
+        self.jobs_lock = threading.Condition()  # Báo khi cửa hàng của job đã được ghi xong
+        self.monitor_stop = threading.Event()
+
+        self.search_stage = Stage('search', self._search, PIPELINE_SEARCH_WORKERS)
+        self.list_stage = Stage('list', self._extract_list, PIPELINE_LIST_WORKERS)
+        self.detail_stage = Stage('detail', self._fetch_detail, PIPELINE_DETAIL_WORKERS,
+                                  worker_init=self._init_detail_worker, worker_close=self._close_detail_worker)
+        self.parse_stage = Stage('parse', self._parse_detail, PIPELINE_PARSE_WORKERS)
+        self.persist_stage = Stage('persist', self._persist, PIPELINE_PERSIST_WORKERS)
+        # Thứ tự quan trọng: item chỉ chảy về các stage phía sau
+        self.stages = [self.search_stage, self.list_stage, self.detail_stage, self.parse_stage, self.persist_stage]
+
+    @staticmethod
+    def required_drivers():
+        """Số driver tối đa pipeline giữ cùng lúc (search + detail nếu tải chi tiết bằng Selenium)"""
+        drivers = PIPELINE_SEARCH_WORKERS if LIST_FETCHER != 'http' else 0
+        if DETAIL_FETCHER != 'http':
+            drivers += PIPELINE_DETAIL_WORKERS
+        return drivers
+
+    def queue_depths(self):
+        """Độ sâu hiện tại của queue vào từng stage"""
+        return {stage.name: stage.depth() for stage in self.stages}
+
+    def stage_stats(self):
+        summary = {}
+        for stage in self.stages:
+            with stage.lock:
+                summary[stage.name] = dict(stage.stats, workers=stage.workers)
+        return summary
+
+    def print_summary(self):
+        for name, stat in self.stage_stats().items():
+            print(f"🔗 Stage '{name}': {stat['workers']} worker, {stat['processed']} item, {stat['errors']} lỗi, "
+                  f"bận {stat['busy_time']:.1f}s, queue sâu nhất {stat['max_depth']}")
+
+    def run(self, jobs):
+        """Chạy toàn bộ jobs qua pipeline, trả về jobs khi mọi stage đã xử lý xong"""
+        for stage in self.stages:
+            stage.start()
+
+        monitor = threading.Thread(target=self._monitor, name='pipeline-monitor', daemon=True)
+        monitor.start()
+
+        try:
+            for job in jobs:
+                job['pending_stores'] = 0
+                job['list_done'] = False
+                self.search_stage.put(job)
+
+            # Dừng lần lượt từng stage: khi các stage trước đã xong thì không còn item mới đổ vào
+            for stage in self.stages:
+                stage.stop()
+                self._sample_depths()
+            
+            # Stage persist chỉ đưa cửa hàng vào batch writer - chờ các nhóm đang ghi dở
+            with self.jobs_lock:
+                self.jobs_lock.wait_for(lambda: all(job['pending_stores'] <= 0 for job in jobs))
+        finally:
+            self.monitor_stop.set()
+            monitor.join()
+
+        for job in jobs:
+            job.pop('pending_stores', None)
+            job.pop('list_done', None)
+        return jobs
+
+    def _sample_depths(self):
+        depths = self.queue_depths()
+        for stage in self.stages:
+            with stage.lock:
+                stage.stats['max_depth'] = max(stage.stats['max_depth'], depths[stage.name])
+        return depths
+
+    def _monitor(self):
+        """Theo dõi độ sâu queue, log định kỳ để thấy stage nào đang nghẽn"""
+        last_log = time.monotonic()
+        while not self.monitor_stop.wait(0.5):
+            depths = self._sample_depths()
+            if PIPELINE_MONITOR_INTERVAL > 0 and time.monotonic() - last_log >= PIPELINE_MONITOR_INTERVAL:
+                last_log = time.monotonic()
+                logger.info("📊 Queue: " + ", ".join(f"{name}={depth}" for name, depth in depths.items()))
+
+    # --- Stage search: tải danh sách kết quả qua list fetcher (browser: mở + scroll, trả driver về pool ngay sau đó) ---
+    def _search(self, job, context):
+        crawler = self.crawler
+        logger.info(f"📋 === JOB {job['id']}: '{job['keyword']}' tại '{job['location']}' ===")
+        crawler._job_started(job)
+        search_url = build_search_url(job['keyword'], job['location'])
+
+        try:
+            if crawler.list_fetcher is not None:
+                html = crawler.list_fetcher.fetch_list(search_url)
+            else:
+                # Pool mở sẵn URL tìm kiếm (driver lỗi khi mở URL được khởi tạo lại), fetcher scroll trang đang mở
+                driver = crawler.driver_pool.acquire(search_url)
+                driver_broken = False
+                try:
+                    html = SeleniumFetcher(driver).fetch_list(None)
+                except Exception:
+                    driver_broken = True
+                    raise
+                finally:
+                    crawler._release_job_driver(job, driver, driver_broken)
+        except Exception as e:
+            logger.error(f"❌ Lỗi job {job['id']}: {e}")
+            job['status'] = 'error'
+            job['error'] = str(e)
+            return
+
+        self.list_stage.put((job, html))
+
+    # --- Stage list: parse danh sách kết quả, chia cửa hàng sang detail hoặc thẳng tới persist ---
+    def _extract_list(self, item, context):
+        job, html = item
+        rows = dedupe_stores_by_name(parse_pool.parse_list(html))
+
+        if not rows:
+            logger.warning(f"⚠️ Không tìm thấy cửa hàng nào cho '{job['keyword']}' tại '{job['location']}'")
+            job['status'] = 'no_results'
+            return
+
+        if job['max_stores'] > 0 and len(rows) > job['max_stores']:
+            rows = rows[:job['max_stores']]
+            logger.info(f"🔢 Giới hạn: {job['max_stores']} cửa hàng")
+
+        job['stores_found'] = len(rows)
+        # Tổng cửa hàng tìm thấy tính cả cửa hàng bỏ qua khi resume (giống chế độ luồng)
+        with self.crawler.stats_lock:
+            self.crawler.stats['total_stores'] += len(rows)
+        logger.info(f"✅ Tìm thấy {len(rows)} cửa hàng")
+        # Resume: cửa hàng đã xử lý ở lần chạy trước không đi qua pipeline nữa
+        rows = self.crawler._skip_processed_rows(rows, job)
+        job['new_stores'] = 0
+        job['duplicate_stores'] = 0
+        job['skipped_stores'] = 0
+        with self.jobs_lock:
+            job['pending_stores'] += len(rows)
+
+        rows, known_rows, stale_rows = self.crawler._split_known_rows(rows, job)
+        for row in known_rows:
+            self.persist_stage.put((job, row, None, 'known'))
+        for row in stale_rows:
+            # Cửa hàng quá hạn (incremental) luôn load lại trang chi tiết
+            self.detail_stage.put((job, row))
+
+        for row in rows:
+            resolved = self.crawler._resolve_without_detail(row)
+            if resolved:
+                details, source = resolved
+                if source == 'list':
+                    with self.jobs_lock:
+                        job['detail_loads_avoided'] = job.get('detail_loads_avoided', 0) + 1
+                self.persist_stage.put((job, row, details, source))
+            else:
+                self.detail_stage.put((job, row))
+
+        with self.jobs_lock:
+            job['list_done'] = True
+        self._maybe_complete(job)
+
+    # --- Stage detail: tải HTML trang chi tiết (mỗi worker giữ một driver hoặc dùng HTTP fetcher) ---
+    def _init_detail_worker(self):
+        if self.crawler.detail_fetcher is not None:
+            return {'fetcher': self.crawler.detail_fetcher, 'driver': None}
+        return {'fetcher': None, 'driver': None}
+
+    def _close_detail_worker(self, context):
+        if context.get('driver') is not None:
+            self._release_detail_driver(context, broken=context.get('broken', False))
+
+    def _release_detail_driver(self, context, broken=False):
+        """Cộng tài nguyên đã chặn của driver trang chi tiết vào thống kê rồi trả driver về pool"""
+        block_stats = collect_blocking_stats(context['driver'])
+        with self.crawler.stats_lock:
+            self.crawler.stats['blocked_requests'] += block_stats['blocked_requests']
+            self.crawler.stats['bytes_saved'] += block_stats['bytes_saved']
+        self.crawler.driver_pool.release(context['driver'], broken=broken)
+        context['driver'] = None
+        context['fetcher'] = None
+
+    def _fetch_detail(self, item, context):
+        job, row = item
+        try:
+            if context['fetcher'] is None:
+                # Lấy driver lúc cần lần đầu, giữ tới khi worker dừng
+                context['driver'] = self.crawler.driver_pool.acquire(None)
+                context['fetcher'] = SeleniumFetcher(context['driver'])
+            logger.info(f"🔍 Đang tải chi tiết: {row['link'][:50]}...")
+            html = context['fetcher'].fetch(row['link'])
+        except Exception as e:
+            logger.warning(f"⚠️ Lỗi scrape chi tiết: {e}")
+            if context.get('driver') is not None:
+                # Driver có thể đã hỏng - trả về pool để khởi tạo lại ở item sau
+                self._release_detail_driver(context, broken=True)
+            details = {'phone': 'Error', 'address': 'Error', 'website': 'Error', 'plus_code': 'Error'}
+            self.persist_stage.put((job, row, details, 'detail'))
+        else:
+            self.parse_stage.put((job, row, html))
+
+        # Delay tùy chọn giữa các cửa hàng của mỗi worker (như chế độ luồng)
+        if STORE_DELAY > 0:
+            time.sleep(STORE_DELAY)
+
+    # --- Stage parse: HTML trang chi tiết → dict chi tiết ---
+    def _parse_detail(self, item, context):
+        job, row, html = item
+        try:
+            details = parse_store_details(html)
+        except Exception as e:
+            logger.warning(f"⚠️ Lỗi parse chi tiết: {e}")
+            details = {'phone': 'Error', 'address': 'Error', 'website': 'Error', 'plus_code': 'Error'}
+        self.persist_stage.put((job, row, details, 'detail'))
+
+    # --- Stage persist: cache + database (ghi theo nhóm qua batch writer, không chờ commit) ---
+    def _persist(self, item, context):
+        job, row, details, source = item
+        try:
+            future = self.crawler._save_store(row, details, source, job, self.batch_session)
+        except Exception:
+            self._store_done(job, None)
+            raise
+        self.crawler._track_progress(job, row, future)
+        future.add_done_callback(lambda done: self._store_done(job, self.crawler._write_outcome(done)))
+
+    def _store_done(self, job, outcome):
+        with self.jobs_lock:
+            if outcome == 'new':
+                job['new_stores'] += 1
+            elif outcome == 'duplicate':
+                job['duplicate_stores'] += 1
+            elif outcome == 'skipped':
+                job['skipped_stores'] += 1
+            elif outcome in ('refreshed', 'unchanged'):
+                job[f'{outcome}_stores'] = job.get(f'{outcome}_stores', 0) + 1
+            job['pending_stores'] -= 1
+            self.jobs_lock.notify_all()
+        self._maybe_complete(job)
+
+    def _maybe_complete(self, job):
+        """Đánh dấu job hoàn thành khi list đã xong và mọi cửa hàng đã được lưu"""
+        with self.jobs_lock:
+            if not job['list_done'] or job['pending_stores'] > 0 or job['status'] == 'completed':
+                return
+            job['status'] = 'completed'
+        with self.crawler.stats_lock:
+            self.crawler.stats['completed_jobs'] += 1
+        self.crawler._job_finished(job)
+        logger.info(f"✅ Hoàn thành job {job['id']}: {job['new_stores']} mới, {job['duplicate_stores']} trùng lặp, "
+                    f"{job.get('detail_loads_avoided', 0) + job.get('precheck_skipped', 0)} trang chi tiết không cần load")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Place key cho Google Maps Crawler
+Rút định danh ổn định của địa điểm từ link Google Maps: cùng một cửa hàng xuất hiện ở nhiều job
+với tham số URL khác nhau (ngữ cảnh tìm kiếm, tọa độ, !16s...) nhưng vẫn cho ra cùng một key
+"""
+
+import re
+import hashlib
+from urllib.parse import unquote, urlsplit, parse_qs
+
+# Feature ID trong data=...!1s0x<hex>:0x<hex>, nửa sau chính là CID của địa điểm
+FEATURE_ID_PATTERN = re.compile(r'(0x[0-9a-f]+):(0x[0-9a-f]+)', re.IGNORECASE)
+# Knowledge graph ID: !16s/g/11xxxx hoặc !16s/m/0xxxx
+MID_PATTERN = re.compile(r'!16s(/[gm]/[0-9a-z_]+)', re.IGNORECASE)
+PLACE_NAME_PATTERN = re.compile(r'/maps/place/([^/@?]+)')
+COORDINATES_PATTERN = re.compile(r'!3d(-?\d+(?:\.\d+)?)!4d(-?\d+(?:\.\d+)?)')
+
+NO_LINK = "Link Not Found"
+
+def canonical_place_key(link):
+    """
+    Key chuẩn của địa điểm từ link Google Maps, None nếu không có link
+    Ưu tiên: CID (từ feature ID 0x..:0x.. hoặc tham số cid/ludocid) -> knowledge graph ID
+    -> tên địa điểm + tọa độ làm tròn -> hash của link đã bỏ query
+    """
+    if not link or link == NO_LINK:
+        return None
+    text = unquote(link)
+
+    feature_id = FEATURE_ID_PATTERN.search(text)
+    if feature_id:
+        return f"cid:{int(feature_id.group(2), 16)}"
+
+    query = parse_qs(urlsplit(text).query)
+    for param in ('cid', 'ludocid'):
+        value = query.get(param, [''])[0]
+        if value.isdigit():
+            return f"cid:{int(value)}"
+
+    mid = MID_PATTERN.search(text)
+    if mid:
+        return f"mid:{mid.group(1).lower()}"
+
+    name = PLACE_NAME_PATTERN.search(text)
+    coordinates = COORDINATES_PATTERN.search(text)
+    if name and coordinates:
+        latitude, longitude = float(coordinates.group(1)), float(coordinates.group(2))
+        basis = f"{name.group(1).replace('+', ' ').lower()}@{latitude:.5f},{longitude:.5f}"
+    else:
+        parts = urlsplit(text)
+        basis = f"{parts.netloc.lower()}{parts.path}"
+    return f"url:{hashlib.md5(basis.encode()).hexdigest()[:16]}"
+
+def store_id_for(place_key):
+    """ID cửa hàng (16 ký tự hex) suy ra từ place key - cùng địa điểm luôn cùng ID"""
+    return hashlib.md5(place_key.encode()).hexdigest()[:16]
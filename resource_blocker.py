@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Resource Blocker cho Google Maps Crawler
+Chặn tài nguyên nặng ở tầng network qua Chrome DevTools và thống kê lượng đã chặn
+"""
+
+import json
+import logging
+from config import BLOCK_RESOURCES, BLOCKED_RESOURCE_TYPES, BLOCKED_URL_PATTERNS
+
+logger = logging.getLogger(__name__)
+
+# Network.setBlockedURLs chỉ nhận URL pattern nên mỗi loại tài nguyên được quy về pattern tương ứng
+RESOURCE_TYPE_PATTERNS = {
+    'Image': [
+        '*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.webp*', '*.svg*', '*.ico*',
+        '*googleusercontent.com/p/*',  # Ảnh cửa hàng
+        '*googleusercontent.com/gps-cs*',
+        '*streetviewpixels*',  # Ảnh street view
+        '*/maps/vt?*', '*/maps/vt/*', '*khms*.google.com*',  # Tile bản đồ
+    ],
+    'Font': ['*.woff*', '*.ttf*', '*.otf*', '*fonts.gstatic.com*', '*fonts.googleapis.com*'],
+    'Media': ['*.mp4*', '*.webm*', '*.mp3*', '*.m3u8*'],
+}
+
+# Analytics/quảng cáo luôn bị chặn vì không ảnh hưởng tới dữ liệu cần lấy
+DEFAULT_BLOCKED_PATTERNS = [
+    '*google-analytics.com*',
+    '*googletagmanager.com*',
+    '*doubleclick.net*',
+    '*/gen_204*',
+    '*/log?format=*',
+]
+
+# Dung lượng trung bình ước tính (bytes) khi chưa đo được request cùng loại
+DEFAULT_RESOURCE_SIZES = {
+    'Image': 25000,
+    'Font': 40000,
+    'Media': 200000,
+}
+DEFAULT_RESOURCE_SIZE = 5000
+
+def build_blocked_patterns(resource_types=None, extra_patterns=None):
+    """Tạo danh sách URL pattern bị chặn từ loại tài nguyên và pattern bổ sung"""
+    resource_types = BLOCKED_RESOURCE_TYPES if resource_types is None else resource_types
+    extra_patterns = BLOCKED_URL_PATTERNS if extra_patterns is None else extra_patterns
+
+    patterns = list(DEFAULT_BLOCKED_PATTERNS)
+    for resource_type in resource_types:
+        type_patterns = RESOURCE_TYPE_PATTERNS.get(resource_type)
+        if type_patterns is None:
+            logger.warning(f"⚠️ Loại tài nguyên không hỗ trợ chặn: {resource_type}")
+            continue
+        patterns.extend(type_patterns)
+    patterns.extend(extra_patterns)
+
+    # Giữ thứ tự, bỏ trùng
+    return list(dict.fromkeys(patterns))
+
+def configure_blocking_options(options):
+    """Thêm Chrome options cần thiết cho việc chặn tài nguyên và đo lường"""
+    if not BLOCK_RESOURCES:
+        return options
+
+    # Content setting thật sự chặn ảnh (Chrome bỏ qua --disable-images)
+    if 'Image' in BLOCKED_RESOURCE_TYPES:
+        options.add_experimental_option('prefs', {'profile.managed_default_content_settings.images': 2})
+
+    # Bật performance log để đọc event Network.* phục vụ thống kê
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return options
+
+def apply_resource_blocking(driver, patterns=None):
+    """Áp dụng danh sách chặn cho tab hiện tại của driver (gọi lại cho mỗi tab mới)"""
+    if not BLOCK_RESOURCES:
+        return False
+
+    patterns = build_blocked_patterns() if patterns is None else patterns
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+        logger.info(f"🚫 Đã bật chặn {len(patterns)} URL pattern qua DevTools")
+        return True
+    except Exception as e:
+        logger.warning(f"⚠️ Không thể bật chặn tài nguyên: {e}")
+        return False
+
+class ResourceBlockStats:
+    """Đọc performance log của driver và tính số request/bytes đã tiết kiệm"""
+
+    def __init__(self):
+        self.blocked_requests = 0
+        self.blocked_by_type = {}
+        self.transferred_requests = 0
+        self.transferred_bytes = 0
+        self.size_by_type = {}  # {type: [tổng bytes, số request]} của request đã tải thật
+
+    def _estimated_size(self, resource_type):
+        measured = self.size_by_type.get(resource_type)
+        if measured and measured[1]:
+            return measured[0] / measured[1]
+        return DEFAULT_RESOURCE_SIZES.get(resource_type, DEFAULT_RESOURCE_SIZE)
+
+    @property
+    def estimated_bytes_saved(self):
+        return int(sum(count * self._estimated_size(resource_type)
+                       for resource_type, count in self.blocked_by_type.items()))
+
+    def consume(self, driver):
+        """Đọc (và làm rỗng) performance log của driver"""
+        try:
+            entries = driver.get_log('performance')
+        except Exception as e:
+            logger.debug(f"Không đọc được performance log: {e}")
+            return self
+
+        request_types = {}
+        for entry in entries:
+            try:
+                message = json.loads(entry['message'])['message']
+            except (KeyError, ValueError, TypeError):
+                continue
+
+            method = message.get('method')
+            params = message.get('params', {})
+
+            if method in ('Network.requestWillBeSent', 'Network.responseReceived'):
+                if params.get('type'):
+                    request_types[params.get('requestId')] = params['type']
+            elif method == 'Network.loadingFinished':
+                resource_type = request_types.get(params.get('requestId'), 'Other')
+                size = int(params.get('encodedDataLength', 0))
+                self.transferred_requests += 1
+                self.transferred_bytes += size
+                measured = self.size_by_type.setdefault(resource_type, [0, 0])
+                measured[0] += size
+                measured[1] += 1
+            elif method == 'Network.loadingFailed' and params.get('blockedReason') == 'inspector':
+                resource_type = params.get('type') or request_types.get(params.get('requestId'), 'Other')
+                self.blocked_requests += 1
+                self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + 1
+
+        return self
+
+    def to_dict(self):
+        return {
+            'blocked_requests': self.blocked_requests,
+            'blocked_by_type': dict(self.blocked_by_type),
+            'bytes_saved': self.estimated_bytes_saved,
+            'transferred_requests': self.transferred_requests,
+            'transferred_bytes': self.transferred_bytes
+        }
+
+def collect_blocking_stats(driver):
+    """Thống kê tài nguyên đã chặn kể từ lần đọc trước (dùng cuối mỗi job)"""
+    if not BLOCK_RESOURCES:
+        return ResourceBlockStats().to_dict()
+    return ResourceBlockStats().consume(driver).to_dict()
@@ -1,7 +1,9 @@
 import pandas as pd
-from bs4 import BeautifulSoup
 from function import Scrap_data, opened_link_chroome
 from database import DatabaseHandler
+from fetchers import SeleniumFetcher
+from parse_pool import parse_pool
+from config import STORE_DELAY
 import logging
 import time
 
@@ -9,77 +11,20 @@ import time
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def scrape_store_details(driver, store_link):
-    """Scrape chi tiết cửa hàng từ link"""
+def parse_store_details(html):
+    """Parse thông tin chi tiết cửa hàng từ HTML trang chi tiết (một lượt duyệt, xem detail_parser)
+    Chạy trong parse pool nếu PARSE_PROCESSES > 0"""
+    return parse_pool.parse_details(html)
+
+def scrape_store_details(driver, store_link, fetcher=None):
+    """Scrape chi tiết cửa hàng từ link - mặc định qua driver, hoặc qua fetcher (ví dụ HTTP)"""
     try:
         logger.info(f"🔍 Đang scrape chi tiết: {store_link[:50]}...")
         
-        driver.get(store_link)
-        time.sleep(2)  # Giảm thời gian chờ
-        
-        data = BeautifulSoup(driver.page_source, 'html.parser')
-        
-        # Tìm thông tin chi tiết với selectors mới
-        details = {
-            'phone': 'Not Found',
-            'address': 'Not Found', 
-            'website': 'Not Found',
-            'plus_code': 'Not Found'
-        }
-        
-        # Debug: In ra tất cả text có thể
-        all_text_elements = data.find_all(['div', 'span', 'a'], class_=lambda x: x and any(cls in str(x) for cls in ['Io6YTe', 'fontBodyMedium', 'fontBodySmall']))
-        logger.info(f"🔍 Tìm thấy {len(all_text_elements)} text elements")
-        
-        # Tìm phone - tìm text có số điện thoại
-        phone_patterns = [
-            r'\+\d{1,3}[\s\-]?\d{1,4}[\s\-]?\d{1,4}[\s\-]?\d{1,4}',  # +62 123 456 789
-            r'\d{3,4}[\s\-]?\d{3,4}[\s\-]?\d{3,4}',  # 123 456 789
-            r'\(\d{3,4}\)[\s\-]?\d{3,4}[\s\-]?\d{3,4}',  # (123) 456 789
-        ]
-        
-        import re
-        for elem in all_text_elements:
-            text = elem.get_text().strip()
-            if text and len(text) > 5:
-                for pattern in phone_patterns:
-                    if re.search(pattern, text):
-                        details['phone'] = text
-                        logger.info(f"📞 Tìm thấy phone: {text}")
-                        break
-                if details['phone'] != 'Not Found':
-                    break
-        
-        # Tìm address - tìm text dài có vẻ là địa chỉ
-        for elem in all_text_elements:
-            text = elem.get_text().strip()
-            if (text and len(text) > 20 and len(text) < 200 and 
-                not text.startswith(('Phone', 'Website', 'Hours', 'Reviews', 'Rating')) and
-                not any(char.isdigit() for char in text[:5]) and
-                ('Street' in text or 'Road' in text or 'Avenue' in text or 'Jl.' in text or 'Đường' in text)):
-                details['address'] = text
-                logger.info(f"📍 Tìm thấy address: {text}")
-                break
-        
-        # Tìm website
-        website_links = data.find_all('a', href=True)
-        for link in website_links:
-            href = link.get('href', '')
-            if (href.startswith('http') and 
-                'google.com' not in href and 
-                'maps.google.com' not in href and
-                not href.startswith('https://www.google.com/maps')):
-                details['website'] = href
-                logger.info(f"🌐 Tìm thấy website: {href}")
-                break
-        
-        # Tìm plus code
-        for elem in all_text_elements:
-            text = elem.get_text().strip()
-            if text and '+' in text and len(text) > 8 and len(text) < 20:
-                details['plus_code'] = text
-                logger.info(f"📍 Tìm thấy plus code: {text}")
-                break
+        # SeleniumFetcher chờ panel chi tiết render (tên + phone/địa chỉ) trước khi lấy HTML
+        if fetcher is None:
+            fetcher = SeleniumFetcher(driver)
+        details = parse_store_details(fetcher.fetch(store_link))
         
         logger.info(f"✅ Hoàn thành scrape chi tiết: {details}")
         return details
@@ -231,8 +176,9 @@ def main():
                 
                 logger.info(f"✅ Hoàn thành cửa hàng {index+1}")
                 
-                # Nghỉ một chút để tránh bị block
-                time.sleep(1)
+                # Delay tùy chọn để tránh bị block (trang chi tiết đã được chờ theo trạng thái)
+                if STORE_DELAY > 0:
+                    time.sleep(STORE_DELAY)
                 
             except KeyboardInterrupt:
                 logger.info("⏹️ Người dùng dừng chương trình")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Wait engine cho Google Maps Crawler
+Chờ theo trạng thái thực của trang (feed kết quả, số kết quả, panel chi tiết)
+thay vì sleep cố định, có timeout theo từng giai đoạn và thống kê thời gian chờ
+"""
+
+import time
+import logging
+import threading
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+from config import WAIT_TIMEOUT_SEARCH, WAIT_TIMEOUT_SCROLL, WAIT_TIMEOUT_DETAIL
+
+logger = logging.getLogger(__name__)
+
+# Selectors dùng để nhận biết trạng thái trang Google Maps
+RESULT_LINK_SELECTOR = "a.hfpxzc, a[href*='/maps/place/']"
+RESULTS_FEED_SELECTOR = "div[role='feed']"
+DETAIL_TITLE_SELECTOR = "h1.DUwDvf, h1"
+DETAIL_INFO_SELECTOR = "[data-item-id^='phone'], [data-item-id='address'], [data-item-id='oloc'], [data-item-id='authority']"
+
+STAGE_TIMEOUTS = {
+    'search': WAIT_TIMEOUT_SEARCH,
+    'scroll': WAIT_TIMEOUT_SCROLL,
+    'detail': WAIT_TIMEOUT_DETAIL,
+}
+
+# Trang tìm kiếm sẵn sàng khi có feed kết quả, hoặc Google chuyển thẳng tới trang một cửa hàng
+SEARCH_READY_JS = f"""
+if (document.readyState === 'loading') return false;
+return !!(document.querySelector("{RESULTS_FEED_SELECTOR}") ||
+          document.querySelector("{RESULT_LINK_SELECTOR}") ||
+          document.querySelector("{DETAIL_INFO_SELECTOR}"));
+"""
+
+# Panel chi tiết sẵn sàng khi đã có tên và khối phone/địa chỉ/website/plus code
+DETAIL_READY_JS = f"""
+return !!(document.querySelector("{DETAIL_TITLE_SELECTOR}") &&
+          document.querySelector("{DETAIL_INFO_SELECTOR}"));
+"""
+
+class WaitStats:
+    """Thống kê thời gian chờ thực tế theo từng giai đoạn - Thread Safe"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}  # {stage: {'count', 'total', 'max', 'timeouts'}}
+
+    def record(self, stage, seconds, timed_out=False):
+        with self.lock:
+            stat = self.stages.setdefault(stage, {'count': 0, 'total': 0.0, 'max': 0.0, 'timeouts': 0})
+            stat['count'] += 1
+            stat['total'] += seconds
+            stat['max'] = max(stat['max'], seconds)
+            if timed_out:
+                stat['timeouts'] += 1
+
+    def summary(self):
+        with self.lock:
+            return {
+                stage: dict(stat, avg=stat['total'] / stat['count'] if stat['count'] else 0.0)
+                for stage, stat in self.stages.items()
+            }
+
+    def print_summary(self):
+        for stage, stat in self.summary().items():
+            print(f"⏱️ Chờ '{stage}': {stat['count']} lần, TB {stat['avg']:.2f}s, "
+                  f"max {stat['max']:.2f}s, tổng {stat['total']:.1f}s, timeout {stat['timeouts']}")
+
+def wait_until(driver, stage, condition, timeout=None, poll_interval=0.2):
+    """
+    Chờ tới khi condition(driver) trả về giá trị truthy hoặc hết timeout của giai đoạn
+    Trả về giá trị của condition, hoặc None nếu timeout (không raise)
+    """
+    timeout = STAGE_TIMEOUTS.get(stage, WAIT_TIMEOUT_SEARCH) if timeout is None else timeout
+    started_at = time.monotonic()
+    try:
+        result = WebDriverWait(driver, timeout, poll_frequency=poll_interval).until(condition)
+        wait_stats.record(stage, time.monotonic() - started_at)
+        return result
+    except TimeoutException:
+        elapsed = time.monotonic() - started_at
+        wait_stats.record(stage, elapsed, timed_out=True)
+        logger.debug(f"⏰ Hết thời gian chờ '{stage}' sau {elapsed:.1f}s")
+        return None
+
+def search_results_ready(driver):
+    return driver.execute_script(SEARCH_READY_JS)
+
+def detail_panel_ready(driver):
+    return driver.execute_script(DETAIL_READY_JS)
+
+# Global wait stats instance
+wait_stats = WaitStats()